@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.gis import admin as gis_admin
-from .models import POI, Item, ItemRequest
+from .models import POI, Item, ItemRequest, GeocodeResult
 
 
 @admin.register(POI)
@@ -25,3 +25,10 @@ class ItemRequestAdmin(admin.ModelAdmin):
     list_display = ['name', 'requested_by', 'status', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['name', 'description']
+
+
+@admin.register(GeocodeResult)
+class GeocodeResultAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'key', 'hits', 'expires_at', 'updated_at']
+    list_filter = ['kind']
+    search_fields = ['key']
@@ -0,0 +1,499 @@
+"""
+Cache backends shared by every gunicorn worker (selected with CACHE_BACKEND in settings).
+
+SQLiteCache keeps entries in one SQLite file (WAL mode): all workers of the container
+see the same entries, they survive restarts and no external service is needed.
+RespCache speaks the Redis protocol (RESP2) over a plain socket, for deployments that
+already run Redis, Valkey or KeyDB; no client library is required.
+
+Both count hits and misses (get_stats(), `manage.py cache_stats`). Counters are kept
+in memory and written to the shared store every few seconds, not on every lookup.
+"""
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+STATS_FLUSH_INTERVAL = 5  # seconds between writes of the hit/miss counters
+STATS_NAMES = ('hits', 'misses')
+
+
+class StatsMixin:
+    """Per-process hit/miss counters periodically added to the shared totals."""
+
+    def _init_stats(self):
+        self._pending_stats = dict.fromkeys(STATS_NAMES, 0)
+        self._stats_flushed_at = time.monotonic()
+
+    def _count(self, name, amount=1):
+        self._pending_stats[name] += amount
+
+    def _flush_stats(self, force=False):
+        if not force and time.monotonic() - self._stats_flushed_at < STATS_FLUSH_INTERVAL:
+            return
+        pending = {name: value for name, value in self._pending_stats.items() if value}
+        self._pending_stats = dict.fromkeys(STATS_NAMES, 0)
+        self._stats_flushed_at = time.monotonic()
+        if pending:
+            self._write_stats(pending)
+
+    def close(self, **kwargs):
+        # Called by Django at the end of every request
+        self._flush_stats()
+
+
+class SQLiteCache(StatsMixin, BaseCache):
+    """
+    LOCATION is the database file (its directory is created if missing).
+    Bounded by OPTIONS['MAX_ENTRIES'] (default 300): past it, expired entries and then
+    the least recently used 1/CULL_FREQUENCY of the entries are evicted.
+    """
+    # Last-access time (for LRU eviction) is refreshed at most this often per key,
+    # so cache hits rarely need the write lock.
+    TOUCH_INTERVAL = 60
+
+    # cache_count.entries is kept equal to COUNT(*) by triggers, so bounding the
+    # table does not scan it on every write. The script runs in one transaction:
+    # the count of an existing file is seeded before any other writer fires the triggers.
+    SCHEMA = """
+        BEGIN IMMEDIATE;
+        CREATE TABLE IF NOT EXISTS cache_entry (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires REAL,
+            accessed REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+        CREATE TABLE IF NOT EXISTS cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS cache_count (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            entries INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO cache_count (id, entries) SELECT 1, COUNT(*) FROM cache_entry;
+        CREATE TRIGGER IF NOT EXISTS cache_entry_inserted AFTER INSERT ON cache_entry
+        BEGIN UPDATE cache_count SET entries = entries + 1; END;
+        CREATE TRIGGER IF NOT EXISTS cache_entry_deleted AFTER DELETE ON cache_entry
+        BEGIN UPDATE cache_count SET entries = entries - 1; END;
+        COMMIT;
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._connection = None
+        self._pid = None
+        self._lock = threading.RLock()
+        self._init_stats()
+
+    def _db(self):
+        # Reconnect after fork: SQLite connections must not cross processes
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=10, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(self.SCHEMA)
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _write(self, callback):
+        """Run callback(db) in a write transaction (serialized across processes)."""
+        with self._lock:
+            db = self._db()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                result = callback(db)
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+            return result
+
+    @staticmethod
+    def _live(expires, now):
+        return expires is None or expires > now
+
+    def _store(self, db, key, value, timeout):
+        db.execute(
+            'INSERT INTO cache_entry (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+            'accessed = excluded.accessed',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout), time.time()),
+        )
+        self._cull(db)
+
+    @staticmethod
+    def _entries(db):
+        return db.execute('SELECT entries FROM cache_count').fetchone()[0]
+
+    def _cull(self, db):
+        if not self._max_entries:
+            return
+        count = self._entries(db)
+        if count <= self._max_entries:
+            return
+        db.execute('DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        count = self._entries(db)
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache_entry')
+            return
+        db.execute(
+            'DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+            (max(1, count // self._cull_frequency),),
+        )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute('SELECT value, expires, accessed FROM cache_entry WHERE key = ?', (key,)).fetchone()
+            if row is None or not self._live(row[1], now):
+                self._count('misses')
+                return default
+            if now - row[2] > self.TOUCH_INTERVAL:
+                db.execute('UPDATE cache_entry SET accessed = ? WHERE key = ?', (now, key))
+            self._count('hits')
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(key_map))
+        with self._lock:
+            rows = self._db().execute(
+                f'SELECT key, value, expires FROM cache_entry WHERE key IN ({placeholders})', list(key_map)
+            ).fetchall()
+            found = {key_map[key]: pickle.loads(value) for key, value, expires in rows if self._live(expires, now)}
+            self._count('hits', len(found))
+            self._count('misses', len(key_map) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        with self._lock:
+            row = self._db().execute('SELECT expires FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        return row is not None and self._live(row[0], time.time())
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        self._write(lambda db: self._store(db, key, value, timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+
+        def add_entry(db):
+            row = db.execute('SELECT expires FROM cache_entry WHERE key = ?', (key,)).fetchone()
+            if row is not None and self._live(row[0], time.time()):
+                return False
+            self._store(db, key, value, timeout)
+            return True
+
+        return self._write(add_entry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        return self._write(lambda db: db.execute(
+            'UPDATE cache_entry SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (expires, key, time.time()),
+        ).rowcount > 0)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version)
+
+        def increment(db):
+            row = db.execute('SELECT value, expires FROM cache_entry WHERE key = ?', (key,)).fetchone()
+            if row is None or not self._live(row[1], time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache_entry SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+            return value
+
+        return self._write(increment)
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._write(lambda db: db.execute('DELETE FROM cache_entry WHERE key = ?', (key,)).rowcount > 0)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version) for key in keys]
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._write(lambda db: db.execute(f'DELETE FROM cache_entry WHERE key IN ({placeholders})', keys))
+
+    def clear(self):
+        self._write(lambda db: db.execute('DELETE FROM cache_entry'))
+
+    def _write_stats(self, pending):
+        self._write(lambda db: db.executemany(
+            'INSERT INTO cache_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            list(pending.items()),
+        ))
+
+    def get_stats(self):
+        """Shared totals: hits, misses, entries and the configured bound."""
+        self._flush_stats(force=True)
+        with self._lock:
+            db = self._db()
+            stats = dict.fromkeys(STATS_NAMES, 0)
+            stats.update(db.execute('SELECT name, value FROM cache_stats').fetchall())
+            stats['entries'] = self._entries(db)
+        stats['max_entries'] = self._max_entries
+        return stats
+
+    def reset_stats(self):
+        self._init_stats()
+        self._write(lambda db: db.execute('DELETE FROM cache_stats'))
+
+
+class RespError(Exception):
+    """Error reply from the server."""
+
+
+def _encode_command(args):
+    out = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, int):
+            arg = str(arg).encode('ascii')
+        out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(out)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Connection closed by cache server')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode('utf-8')
+    if kind == b'-':
+        # Returned, not raised, so the rest of a pipeline is still read
+        return RespError(rest.decode('utf-8'))
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError('Connection closed by cache server')
+        return data[:-2]
+    if kind == b'*':
+        length = int(rest)
+        if length < 0:
+            return None
+        return [_read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f'Unexpected reply from cache server: {line!r}')
+
+
+# INCRBY only when the key exists (nil otherwise), keeping its TTL
+INCR_EXISTING_SCRIPT = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then return redis.call('INCRBY', KEYS[1], ARGV[1]) end return false"
+)
+
+
+class RespCache(StatsMixin, BaseCache):
+    """
+    LOCATION: redis://[:password@]host[:port][/db]. The database is assumed to be
+    dedicated to this cache (clear() flushes it). Size bounds and eviction are the
+    server's: configure maxmemory with an allkeys-lru policy.
+    OPTIONS['SOCKET_TIMEOUT'] (seconds, default 1) bounds every call.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urllib.parse.urlsplit(server if '://' in server else f'redis://{server}')
+        self._host = url.hostname or 'localhost'
+        self._port = url.port or 6379
+        self._password = urllib.parse.unquote(url.password) if url.password else None
+        self._db_index = int(url.path.lstrip('/') or 0)
+        self._socket_timeout = params.get('OPTIONS', {}).get('SOCKET_TIMEOUT', 1.0)
+        self._socket = None
+        self._reader = None
+        self._pid = None
+        self._lock = threading.RLock()
+        self._init_stats()
+
+    def _connect(self):
+        sock = socket.create_connection((self._host, self._port), timeout=self._socket_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket, self._reader, self._pid = sock, sock.makefile('rb'), os.getpid()
+        setup = []
+        if self._password:
+            setup.append(('AUTH', self._password))
+        if self._db_index:
+            setup.append(('SELECT', self._db_index))
+        if setup:
+            self._send(setup)
+
+    def _disconnect(self):
+        if self._socket is not None:
+            try:
+                self._reader.close()
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = self._reader = None
+
+    def _send(self, commands):
+        self._socket.sendall(b''.join(_encode_command(command) for command in commands))
+        replies = [_read_reply(self._reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def _execute(self, *commands):
+        """Send the commands in one pipeline and return their replies."""
+        with self._lock:
+            if self._socket is None or self._pid != os.getpid():
+                self._connect()
+            try:
+                return self._send(commands)
+            except (OSError, ConnectionError):
+                self._disconnect()
+                raise
+
+    @staticmethod
+    def _dumps(value):
+        # Plain ints are stored as digits so INCRBY works on them
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode('ascii')
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def _expiry_ms(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(1, int(timeout * 1000))
+
+    def _set_command(self, key, value, timeout, only_new=False):
+        command = ['SET', key, self._dumps(value)]
+        expiry = self._expiry_ms(timeout)
+        if expiry is not None:
+            command += ['PX', expiry]
+        if only_new:
+            command.append('NX')
+        return command
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version)
+        value, = self._execute(('GET', key))
+        if value is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return self._loads(value)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+        values, = self._execute(['MGET', *key_map])
+        found = {key_map[key]: self._loads(value) for key, value in zip(key_map, values) if value is not None}
+        self._count('hits', len(found))
+        self._count('misses', len(key_map) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._execute(('EXISTS', key))[0] > 0
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        if timeout == 0:
+            self._execute(('DEL', key))
+        else:
+            self._execute(self._set_command(key, value, timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            if timeout == 0:
+                self.delete_many(data, version=version)
+            else:
+                self._execute(*[
+                    self._set_command(self.make_and_validate_key(key, version), value, timeout)
+                    for key, value in data.items()
+                ])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._execute(self._set_command(key, value, timeout, only_new=True))[0] == 'OK'
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version)
+        expiry = self._expiry_ms(timeout)
+        if expiry is None:
+            return self._execute(('PERSIST', key), ('EXISTS', key))[1] > 0
+        return self._execute(('PEXPIRE', key, expiry))[0] > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version)
+        # One atomic step: with EXISTS then INCRBY, a key expiring in between would
+        # be recreated by INCRBY without a TTL
+        value, = self._execute(('EVAL', INCR_EXISTING_SCRIPT, 1, key, delta))
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version)
+        return self._execute(('DEL', key))[0] > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version) for key in keys]
+        if keys:
+            self._execute(['DEL', *keys])
+
+    def clear(self):
+        self._execute(('FLUSHDB',))
+
+    def _stats_key(self, name):
+        return f'{self.key_prefix}:cache_stats:{name}'
+
+    def _write_stats(self, pending):
+        self._execute(*[('INCRBY', self._stats_key(name), value) for name, value in pending.items()])
+
+    def get_stats(self):
+        """Shared totals: hits, misses and the number of keys in the database."""
+        self._flush_stats(force=True)
+        counters, entries = self._execute(['MGET', *(self._stats_key(name) for name in STATS_NAMES)], ('DBSIZE',))
+        stats = {name: int(value or 0) for name, value in zip(STATS_NAMES, counters)}
+        stats['entries'] = entries
+        stats['max_entries'] = None
+        return stats
+
+    def reset_stats(self):
+        self._init_stats()
+        self._execute(['DEL', *(self._stats_key(name) for name in STATS_NAMES)])
@@ -0,0 +1,164 @@
+"""
+Conditional GET and response caching for the public POI endpoints.
+
+Each collection ('pois', 'items') has a change counter in CollectionVersion that
+api.signals bumps on every write. A list response's ETag is derived from those
+counters and the request URL, so a revalidation costs one small query and a 304
+is returned before the queryset is evaluated or serialized.
+
+Serialized responses of public actions are kept in the shared cache: lists under
+their ETag (a write changes the ETag, so old pages are simply never read again),
+POI detail and poi_items under a per-POI token that api.signals deletes when the
+POI, one of its POIItems or one of its Items changes.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import CollectionVersion
+
+POIS = 'pois'
+ITEMS = 'items'
+
+# Stampede guard: one request rebuilds a missing entry, the others wait for it
+RESPONSE_LOCK_TIMEOUT = 30
+RESPONSE_LOCK_WAIT = 5
+RESPONSE_LOCK_POLL = 0.05
+
+
+def bump_collection_version(*names):
+    """Mark collections as changed (new ETag, new Last-Modified)."""
+    now = timezone.now()
+    for name in names:
+        updated = CollectionVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+        if not updated:
+            CollectionVersion.objects.get_or_create(name=name, defaults={'version': 1})
+
+
+def _request_fingerprint(request):
+    """What a cached representation depends on: host (absolute URLs), path + query, format."""
+    return [request.get_host(), request.get_full_path(), getattr(request, 'accepted_media_type', '')]
+
+
+def collection_validators(request, names):
+    """(etag, last_modified timestamp or None) for the collections and this request's URL/format."""
+    versions = dict(
+        (name, (version, updated_at))
+        for name, version, updated_at in CollectionVersion.objects.filter(name__in=names).values_list(
+            'name', 'version', 'updated_at'
+        )
+    )
+    parts = _request_fingerprint(request)
+    last_modified = None
+    for name in sorted(names):
+        version, updated_at = versions.get(name, (0, None))
+        parts.append(f'{name}:{version}:{updated_at.timestamp() if updated_at else ""}')
+        if updated_at is not None:
+            timestamp = int(updated_at.timestamp())
+            last_modified = max(last_modified or 0, timestamp)
+    etag = '"%s"' % hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+    return etag, last_modified
+
+
+def conditional_collection_response(request, names, build_response, cache_prefix=None):
+    """
+    Return 304 if the client's If-None-Match / If-Modified-Since still matches
+    the collections, otherwise build_response() with ETag and Last-Modified set.
+    With cache_prefix the response data is cached under the ETag.
+    Clients must revalidate (no-cache) so edits show up on the next visit.
+    """
+    etag, last_modified = collection_validators(request, names)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if cache_prefix:
+            response = cached_response(request, f'{cache_prefix}:{etag[1:-1]}', build_response)
+        else:
+            response = build_response()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cached_response(request, key, build_response):
+    """
+    Serve response data cached under key, or build_response() and cache it (200 only).
+    Only JSON responses are cached (not the browsable API). On a miss one request
+    takes a short lock and rebuilds; concurrent requests for the same key wait up to
+    RESPONSE_LOCK_WAIT seconds for its result instead of all hitting the database.
+    """
+    if not isinstance(getattr(request, 'accepted_renderer', None), JSONRenderer):
+        return build_response()
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+
+    lock_key = f'{key}:lock'
+    locked = cache.add(lock_key, 1, RESPONSE_LOCK_TIMEOUT)
+    if not locked:
+        deadline = time.monotonic() + RESPONSE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(RESPONSE_LOCK_POLL)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+        # The rebuilding request is too slow or died: build without the lock
+    try:
+        response = build_response()
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return response
+
+
+def poi_token_key(poi_id):
+    return f'poi-response:{poi_id}:token'
+
+
+def poi_response_key(request, poi_id, action):
+    """Cache key for a per-POI response; changes when api.signals evicts the POI."""
+    token_key = poi_token_key(poi_id)
+    token = cache.get(token_key)
+    if token is None:
+        cache.add(token_key, uuid.uuid4().hex, None)
+        token = cache.get(token_key)
+    fingerprint = hashlib.sha256('|'.join(_request_fingerprint(request)).encode('utf-8')).hexdigest()[:32]
+    return f'poi-response:{poi_id}:{token}:{action}:{fingerprint}'
+
+
+def evict_poi_responses(*poi_ids):
+    """Drop the cached detail/poi_items responses of these POIs."""
+    keys = [poi_token_key(poi_id) for poi_id in poi_ids if poi_id is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
+class ConditionalListMixin:
+    """
+    ViewSet mixin: list answers conditional GETs from the version of `collections`;
+    with response_cache_prefix set, list data is also cached per ETag.
+    """
+    collections = ()
+    response_cache_prefix = None
+
+    def list(self, request, *args, **kwargs):
+        return conditional_collection_response(
+            request,
+            self.collections,
+            lambda: super(ConditionalListMixin, self).list(request, *args, **kwargs),
+            cache_prefix=self.response_cache_prefix,
+        )
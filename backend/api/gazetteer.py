@@ -0,0 +1,192 @@
+"""
+Offline place search from a local gazetteer (GeoNames dump loaded by `manage.py load_gazetteer`).
+
+The index is one read-only file opened with mmap, so every gunicorn worker shares the
+same page-cache pages instead of holding its own copy:
+
+    header   MAGIC, entry count, offset of the string area
+    entries  fixed 16-byte rows sorted by normalized name:
+             key offset (u32), key length (u16), unused (u16), record offset (u32), population (u32)
+    strings  keys (normalized names, UTF-8) and records:
+             latitude, longitude (i32, micro-degrees), display name length (u16) + UTF-8
+
+A prefix lookup binary-searches the rows and scans the matching range (capped at
+MAX_SCAN rows), keeping the most populated places.
+"""
+import heapq
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+from .geocoder import normalize_query
+
+MAGIC = b'BFGAZ001'
+HEADER = struct.Struct('<8sII')
+ENTRY = struct.Struct('<IHHII')
+RECORD = struct.Struct('<iiH')
+MAX_SCAN = 20000
+RELOAD_CHECK_INTERVAL = 30  # seconds between checks for a re-loaded index file
+
+
+def write_index(path, places):
+    """
+    Write places [(names, latitude, longitude, population, display_name)] as an index
+    file; every name of a place (e.g. local and ASCII spelling) is searchable.
+    Written next to path and renamed into place, so running workers keep their
+    mapping of the old file until they notice the new one.
+    """
+    entries = []
+    strings = bytearray()
+    for names, latitude, longitude, population, display_name in places:
+        display = display_name.encode('utf-8')[:0xFFFF]
+        record_offset = len(strings)
+        strings += RECORD.pack(round(latitude * 1e6), round(longitude * 1e6), len(display)) + display
+        keys = {normalize_query(name) for name in names} - {''}
+        for key in keys:
+            key_bytes = key.encode('utf-8')[:0xFFFF]
+            entries.append((key_bytes, -population, record_offset))
+
+    # Most populated first among equal names
+    entries.sort()
+    keys_at = {}
+    rows = bytearray()
+    for key_bytes, negative_population, record_offset in entries:
+        if key_bytes not in keys_at:
+            keys_at[key_bytes] = len(strings)
+            strings += key_bytes
+        rows += ENTRY.pack(keys_at[key_bytes], len(key_bytes), 0, record_offset, -negative_population)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(entries), HEADER.size + len(rows)))
+        f.write(rows)
+        f.write(strings)
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class Gazetteer:
+    """Read-only view of an index file (see module docstring)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self._strings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a gazetteer index')
+
+    def __len__(self):
+        return self._count
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+
+    def _key(self, i):
+        key_offset, key_length, _, _, _ = self._entry(i)
+        start = self._strings + key_offset
+        return self._map[start:start + key_length]
+
+    def _record(self, record_offset):
+        start = self._strings + record_offset
+        latitude, longitude, length = RECORD.unpack_from(self._map, start)
+        start += RECORD.size
+        display_name = self._map[start:start + length].decode('utf-8')
+        return {'lat': latitude / 1e6, 'lon': longitude / 1e6, 'display_name': display_name}
+
+    def _lower_bound(self, prefix):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_matches(self, prefix):
+        """Yield (population, record offset) of the places whose name starts with prefix."""
+        prefix = prefix.encode('utf-8')
+        i = self._lower_bound(prefix)
+        end = min(self._count, i + MAX_SCAN)
+        while i < end and self._key(i).startswith(prefix):
+            _, _, _, record_offset, population = self._entry(i)
+            yield population, record_offset
+            i += 1
+
+    def search(self, normalized, limit=5):
+        """
+        Most populated places for a normalized query. The longest run of leading words
+        that prefixes a place name is used ('barcelona catal' -> names starting with
+        'barcelona catal', then 'barcelona'); the remaining words must prefix words of
+        the display name (region or country).
+        """
+        tokens = normalized.split(' ')
+        for n in range(len(tokens), 0, -1):
+            rest = tokens[n:]
+            # Extra candidates for duplicates (several names of one place) and the word filter
+            candidates = heapq.nlargest(limit * 4, self.prefix_matches(' '.join(tokens[:n])))
+            results = []
+            seen = set()
+            for _, record_offset in candidates:
+                if record_offset in seen:
+                    continue
+                seen.add(record_offset)
+                result = self._record(record_offset)
+                if rest:
+                    words = re.findall(r'\w+', normalize_query(result['display_name']))
+                    if not all(any(word.startswith(token) for word in words) for token in rest):
+                        continue
+                results.append(result)
+                if len(results) == limit:
+                    break
+            if results:
+                return results
+        return []
+
+    def is_current(self):
+        """False once the file has been replaced (re-run of load_gazetteer)."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+
+_lock = threading.Lock()
+_loaded = {'gazetteer': None, 'path': None, 'checked_at': None}
+
+
+def get_gazetteer():
+    """The process-wide Gazetteer for settings.GAZETTEER_PATH, or None if no index is loaded."""
+    path = settings.GAZETTEER_PATH
+    now = time.monotonic()
+    with _lock:
+        if _loaded['path'] == path and now - _loaded['checked_at'] < RELOAD_CHECK_INTERVAL:
+            return _loaded['gazetteer']
+        _loaded['path'], _loaded['checked_at'] = path, now
+        current = _loaded['gazetteer']
+        if current is not None and current.path == path and current.is_current():
+            return current
+        try:
+            _loaded['gazetteer'] = Gazetteer(path)
+        except (OSError, ValueError):
+            _loaded['gazetteer'] = None
+        return _loaded['gazetteer']
+
+
+def search(normalized, limit=5):
+    """Local results for a normalized query ([] when no index is loaded)."""
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return []
+    return gazetteer.search(normalized, limit)
@@ -0,0 +1,212 @@
+"""Geographic helpers for the POI map endpoints (viewport parsing and filtering)."""
+import math
+
+from django.contrib.gis.geos import Polygon
+from django.db.models import ExpressionWrapper, FloatField, Func, Q
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from rest_framework.exceptions import ValidationError
+
+BBOX_PARAMS = ('south', 'west', 'north', 'east')
+WGS84_SRID = 4326
+
+# Web map zoom levels (Leaflet/OSM tiles are 256 px)
+MIN_ZOOM = 0
+MAX_ZOOM = 22
+TILE_SIZE = 256
+# Server-side clusters are grid cells of roughly this many screen pixels
+CLUSTER_CELL_PX = 60
+# Web Mercator cannot represent the poles
+MERCATOR_MAX_LAT = 85.0511287798
+# Mean Earth radius and length of one degree of latitude, in metres
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+
+
+def parse_bbox(query_params, required=False):
+    """
+    Read the south/west/north/east viewport from query params.
+    Returns a (south, west, north, east) tuple of floats, or None when no bbox
+    param is present and required is False.
+    Raises ValidationError (400) for partial, non-numeric or out-of-range values.
+    west > east is accepted and means the viewport crosses the antimeridian.
+    """
+    present = [p for p in BBOX_PARAMS if query_params.get(p) not in (None, '')]
+    if not present and not required:
+        return None
+    missing = [p for p in BBOX_PARAMS if p not in present]
+    if missing:
+        raise ValidationError({p: 'This parameter is required with a bounding box.' for p in missing})
+
+    values = {}
+    errors = {}
+    for p in BBOX_PARAMS:
+        try:
+            values[p] = float(query_params[p])
+        except (TypeError, ValueError):
+            errors[p] = 'A valid number is required.'
+            continue
+        if not math.isfinite(values[p]):
+            errors[p] = 'A valid number is required.'
+    if errors:
+        raise ValidationError(errors)
+
+    south, west, north, east = (values[p] for p in BBOX_PARAMS)
+    for p in ('south', 'north'):
+        if not -90 <= values[p] <= 90:
+            errors[p] = 'Latitude must be between -90 and 90.'
+    for p in ('west', 'east'):
+        if not -180 <= values[p] <= 180:
+            errors[p] = 'Longitude must be between -180 and 180.'
+    if not errors and south > north:
+        errors['south'] = 'south must be less than or equal to north.'
+    if errors:
+        raise ValidationError(errors)
+    return south, west, north, east
+
+
+def bbox_filter(bbox, field='location'):
+    """
+    Q object matching points inside the bbox.
+    Uses the `contained` lookup (MBRWithin on MariaDB, `@` on PostGIS) so the
+    spatial index on the column is used; for points the MBR test is exact.
+    """
+    south, west, north, east = bbox
+    lookup = f'{field}__contained'
+    if west <= east:
+        return Q(**{lookup: bbox_polygon(west, south, east, north)})
+    # Viewport crosses the antimeridian: split into two boxes
+    return (
+        Q(**{lookup: bbox_polygon(west, south, 180.0, north)})
+        | Q(**{lookup: bbox_polygon(-180.0, south, east, north)})
+    )
+
+
+def bbox_polygon(xmin, ymin, xmax, ymax):
+    """WGS84 rectangle polygon for lookups against POI.location."""
+    polygon = Polygon.from_bbox((xmin, ymin, xmax, ymax))
+    polygon.srid = WGS84_SRID
+    return polygon
+
+
+def parse_number(query_params, param, default=None, min_value=None, max_value=None, integer=False):
+    """
+    Read a numeric query param, falling back to default when absent.
+    Raises ValidationError (400) when required and missing, not a number or out of range.
+    """
+    raw = query_params.get(param)
+    if raw in (None, ''):
+        if default is None:
+            raise ValidationError({param: 'This parameter is required.'})
+        return default
+    try:
+        value = int(raw) if integer else float(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({param: 'A valid integer is required.' if integer else 'A valid number is required.'})
+    if not math.isfinite(value):
+        raise ValidationError({param: 'A valid number is required.'})
+    if min_value is not None and value < min_value:
+        raise ValidationError({param: f'Must be greater than or equal to {min_value}.'})
+    if max_value is not None and value > max_value:
+        raise ValidationError({param: f'Must be less than or equal to {max_value}.'})
+    return value
+
+
+def parse_lat_lng(query_params, lat_param='lat', lng_param='lng'):
+    """Read a required WGS84 coordinate pair; raises ValidationError (400) when invalid."""
+    lat = parse_number(query_params, lat_param, min_value=-90, max_value=90)
+    lng = parse_number(query_params, lng_param, min_value=-180, max_value=180)
+    return lat, lng
+
+
+def parse_zoom(query_params, param='zoom'):
+    """Read an integer map zoom level; raises ValidationError (400) when missing or invalid."""
+    return parse_number(query_params, param, min_value=MIN_ZOOM, max_value=MAX_ZOOM, integer=True)
+
+
+def cluster_cell_size(zoom):
+    """Grid cell size in degrees so one cell covers ~CLUSTER_CELL_PX pixels at this zoom."""
+    return 360.0 * CLUSTER_CELL_PX / (TILE_SIZE * 2 ** zoom)
+
+
+class PointX(Func):
+    """Longitude (X) of a point column, computed in the database."""
+    function = 'ST_X'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='X', **extra_context)
+
+
+class PointY(Func):
+    """Latitude (Y) of a point column, computed in the database."""
+    function = 'ST_Y'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, function='Y', **extra_context)
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) in degrees of the XYZ (slippy map) tile z/x/y."""
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west, south, east, north
+
+
+def lonlat_to_tile_fraction(lon, lat, z):
+    """Fractional XYZ tile coordinates of a WGS84 point at zoom z (Web Mercator)."""
+    lat = max(-MERCATOR_MAX_LAT, min(MERCATOR_MAX_LAT, lat))
+    n = 2 ** z
+    fx = (lon + 180.0) / 360.0 * n
+    fy = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return fx, fy
+
+
+def lonlat_to_tile(lon, lat, z):
+    """Integer XYZ tile (x, y) containing a WGS84 point at zoom z."""
+    n = 2 ** z
+    fx, fy = lonlat_to_tile_fraction(lon, lat, z)
+    return min(int(fx), n - 1), min(int(fy), n - 1)
+
+
+def radius_bbox(lat, lng, radius_m):
+    """
+    (south, west, north, east) box enclosing a circle of radius_m around a point,
+    used to pre-filter distance queries through the spatial index.
+    """
+    dlat = radius_m / METERS_PER_DEGREE
+    south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if cos_lat < 1e-6 or radius_m / (METERS_PER_DEGREE * cos_lat) >= 180:
+        return south, -180.0, north, 180.0
+    dlng = radius_m / (METERS_PER_DEGREE * cos_lat)
+    west, east = lng - dlng, lng + dlng
+    # Wrap across the antimeridian (bbox_filter handles west > east)
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+
+def distance_expression(lat, lng, field='location'):
+    """
+    Great-circle distance in metres from (lat, lng) to a point column.
+    Haversine built from standard SQL math functions, so it works on MariaDB,
+    PostGIS and SpatiaLite alike.
+    """
+    lat_r = math.radians(lat)
+    lng_r = math.radians(lng)
+    point_lat = Radians(PointY(field))
+    point_lng = Radians(PointX(field))
+    a = (
+        Power(Sin((point_lat - lat_r) / 2), 2)
+        + math.cos(lat_r) * Cos(point_lat) * Power(Sin((point_lng - lng_r) / 2), 2)
+    )
+    return ExpressionWrapper(
+        2 * EARTH_RADIUS_M * ASin(Sqrt(Least(a, 1.0))),
+        output_field=FloatField(),
+    )
@@ -1,76 +1,74 @@
-import hashlib
-import json
-import logging
-import urllib.error
-import urllib.parse
-import urllib.request
-
-from django.conf import settings
-from django.core.cache import cache
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-logger = logging.getLogger(__name__)
+from . import gazetteer
+from .geo import parse_lat_lng
+from .geocoder import (
+    GeocoderError, RateLimited, lookup, normalize_query, prefix_results, reverse, reverse_bucket, search,
+)
+from .models import GeocodeResult
+
 
-NOMINATIM_SEARCH = 'https://nominatim.openstreetmap.org/search'
+def upstream_response(kind, key, fetch):
+    """Stored/cached/coalesced upstream payload, or the 429 / 502 error response."""
+    try:
+        return Response(lookup(kind, key, fetch))
+    except RateLimited as e:
+        return Response(
+            {'detail': 'Geocoding is busy, please retry shortly.'},
+            status=429,
+            headers={'Retry-After': str(e.retry_after)},
+        )
+    except GeocoderError as e:
+        return Response({'detail': e.detail}, status=502)
 
 
 class GeocodeSearchView(APIView):
-    """Proxy Nominatim search with caching. Respect https://operations.osmfoundation.org/policies/nominatim/"""
+    """
+    Place search: answered from the local gazetteer index when it has matches
+    (api/gazetteer.py, `manage.py load_gazetteer`), otherwise proxied to Nominatim
+    with caching. Respect https://operations.osmfoundation.org/policies/nominatim/
+    Queries are cached by their normalized form (case, accents, whitespace), and a
+    query extending a cached one by more words is answered from its results when
+    that is safe. Identical concurrent misses share one upstream call and calls are
+    rate limited across workers (api/geocoder.py); when the queue is full the
+    answer is a fast 429.
+    """
 
     permission_classes = [AllowAny]
 
     def get(self, request):
-        q = (request.query_params.get('q') or '').strip()
-        if len(q) < 3:
-            return Response({'results': []})
+        q = ' '.join((request.query_params.get('q') or '').split())
         if len(q) > 256:
             return Response({'detail': 'Query too long.'}, status=400)
+        normalized = normalize_query(q)
+        if len(normalized) < 3:
+            return Response({'results': []})
 
-        cache_key = 'geocode:' + hashlib.sha256(q.encode('utf-8')).hexdigest()[:48]
-        cached = cache.get(cache_key)
-        if cached is not None:
-            return Response(cached)
+        results = gazetteer.search(normalized)
+        if results:
+            return Response({'results': results})
+
+        payload = prefix_results(normalized)
+        if payload is None:
+            response = upstream_response(GeocodeResult.KIND_SEARCH, normalized, lambda: search(q))
+            if response.status_code != 200:
+                return response
+            payload = response.data
+        return Response({'results': payload['results']})
 
-        params = urllib.parse.urlencode(
-            {
-                'q': q,
-                'format': 'json',
-                'limit': '5',
-                'addressdetails': '0',
-            }
-        )
-        url = f'{NOMINATIM_SEARCH}?{params}'
-        req = urllib.request.Request(
-            url,
-            headers={'User-Agent': settings.NOMINATIM_USER_AGENT},
-        )
-        try:
-            with urllib.request.urlopen(req, timeout=12) as resp:
-                raw = json.load(resp)
-        except urllib.error.HTTPError as e:
-            logger.warning('Nominatim HTTPError: %s', e)
-            return Response({'detail': 'Geocoding service error.'}, status=502)
-        except (urllib.error.URLError, TimeoutError, json.JSONDecodeError) as e:
-            logger.warning('Nominatim error: %s', e)
-            return Response({'detail': 'Geocoding unavailable.'}, status=502)
 
-        results = []
-        for item in raw:
-            try:
-                lat = float(item['lat'])
-                lon = float(item['lon'])
-            except (KeyError, TypeError, ValueError):
-                continue
-            results.append(
-                {
-                    'lat': lat,
-                    'lon': lon,
-                    'display_name': item.get('display_name', ''),
-                }
-            )
+class GeocodeReverseView(APIView):
+    """
+    Address of a coordinate (?lat=&lon=) from Nominatim reverse, e.g. for a dropped pin.
+    Coordinates are snapped to ~10 m cells so nearby clicks share one cache entry;
+    upstream calls go through the same coalescing and rate limiter as search.
+    """
 
-        payload = {'results': results}
-        cache.set(cache_key, payload, 3600)
-        return Response(payload)
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        lat, lng = parse_lat_lng(request.query_params, 'lat', 'lon')
+        lat, lng, cell = reverse_bucket(lat, lng)
+        return upstream_response(GeocodeResult.KIND_REVERSE, cell, lambda: reverse(lat, lng))
@@ -0,0 +1,316 @@
+"""
+Nominatim client shared by all gunicorn workers through the cache.
+
+Nominatim allows at most 1 request/s (https://operations.osmfoundation.org/policies/nominatim/):
+- coalesced(): concurrent identical cache misses make one upstream call; the other
+  requests wait for its cached result instead of calling Nominatim themselves.
+- RateLimiter: upstream calls are spaced by reserving time slots with cache.add,
+  so the limit holds across processes. A request queues for a free slot at most
+  NOMINATIM_MAX_WAIT seconds, otherwise RateLimited is raised (HTTP 429).
+
+Search results are cached by normalized query (normalize_query), and a query that
+only adds words to a cached query with a complete result set is answered from it
+(prefix_results). Reverse lookups are cached per ~10 m grid cell (reverse_bucket).
+
+Behind the cache, answers are kept in the GeocodeResult table for
+GEOCODE_RESULT_TTL seconds (lookup), so they survive deploys; the most requested
+ones are preloaded into the cache by `manage.py warm_geocode_cache`.
+"""
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+import unicodedata
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .geo import METERS_PER_DEGREE
+from .models import GeocodeResult
+
+logger = logging.getLogger(__name__)
+
+INFLIGHT_POLL = 0.05
+SEARCH_LIMIT = 5
+SEARCH_CACHE_TIMEOUT = 3600
+REVERSE_BUCKET_M = 10
+REVERSE_CACHE_TIMEOUT = 24 * 3600
+CACHE_TIMEOUTS = {
+    GeocodeResult.KIND_SEARCH: SEARCH_CACHE_TIMEOUT,
+    GeocodeResult.KIND_REVERSE: REVERSE_CACHE_TIMEOUT,
+}
+# Request counts are added to GeocodeResult.hits in batches of this size
+HIT_FLUSH_EVERY = 10
+HIT_COUNTER_TIMEOUT = 24 * 3600
+
+
+class GeocoderError(Exception):
+    """Upstream failure, reported to the client as 502."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class RateLimited(Exception):
+    """No upstream slot free within the allowed wait, reported as 429."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    At most `rate` calls per second across workers. Time is divided into slots of
+    1/rate seconds; a caller reserves the first free slot that has not started yet
+    (cache.add is atomic) and sleeps until it begins, so calls are never closer
+    than one interval. Only slots within max_wait seconds are considered.
+    """
+
+    def __init__(self, name, rate, max_wait):
+        self.name = name
+        self.interval = 1.0 / rate
+        self.max_wait = max_wait
+
+    def acquire(self):
+        now = time.time()
+        first = math.ceil(now / self.interval)
+        last = first + int(self.max_wait / self.interval)
+        expiry = math.ceil(self.max_wait + 2 * self.interval)
+        for slot in range(first, last + 1):
+            if cache.add(f'ratelimit:{self.name}:{slot}', 1, expiry):
+                delay = slot * self.interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                return
+        raise RateLimited(retry_after=max(1, math.ceil(self.max_wait + self.interval)))
+
+
+def nominatim_limiter():
+    return RateLimiter('nominatim', settings.NOMINATIM_RATE, settings.NOMINATIM_MAX_WAIT)
+
+
+def inflight_timeout():
+    """Longest time an upstream call can take: queueing for a slot plus the HTTP timeout."""
+    return settings.NOMINATIM_MAX_WAIT + 1.0 / settings.NOMINATIM_RATE + settings.NOMINATIM_TIMEOUT + 1
+
+
+def coalesced(cache_key, fetch, ttl):
+    """
+    Return the value cached under cache_key, or fetch() it and cache it for ttl seconds.
+    Only one caller at a time runs fetch() for a key (in-flight marker set with
+    cache.add); the others poll the cache for its result, and one of them takes
+    over if the running fetch fails. Raises RateLimited / GeocoderError from fetch().
+    """
+    value = cache.get(cache_key)
+    if value is not None:
+        return value
+
+    inflight_key = f'{cache_key}:inflight'
+    timeout = inflight_timeout()
+    deadline = time.monotonic() + timeout
+    while True:
+        if cache.add(inflight_key, 1, math.ceil(timeout)):
+            try:
+                value = fetch()
+                cache.set(cache_key, value, ttl)
+                return value
+            finally:
+                cache.delete(inflight_key)
+        if time.monotonic() >= deadline:
+            raise GeocoderError('Geocoding unavailable.')
+        time.sleep(INFLIGHT_POLL)
+        value = cache.get(cache_key)
+        if value is not None:
+            return value
+
+
+def nominatim_get(path, params):
+    """GET a Nominatim endpoint (rate limited) and return the decoded JSON."""
+    url = f"{settings.NOMINATIM_BASE_URL.rstrip('/')}/{path}?{urllib.parse.urlencode(params)}"
+    req = urllib.request.Request(
+        url,
+        headers={'User-Agent': settings.NOMINATIM_USER_AGENT},
+    )
+    nominatim_limiter().acquire()
+    try:
+        with urllib.request.urlopen(req, timeout=settings.NOMINATIM_TIMEOUT) as resp:
+            return json.load(resp)
+    except urllib.error.HTTPError as e:
+        logger.warning('Nominatim HTTPError: %s', e)
+        raise GeocoderError('Geocoding service error.')
+    except (urllib.error.URLError, TimeoutError, json.JSONDecodeError) as e:
+        logger.warning('Nominatim error: %s', e)
+        raise GeocoderError('Geocoding unavailable.')
+
+
+def normalize_query(q):
+    """Casefold, drop accents and collapse whitespace/commas: ' Barceloná,  ES' -> 'barcelona es'."""
+    text = unicodedata.normalize('NFKD', q.casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[\s,;]+', ' ', text).strip()
+
+
+def search_cache_key(normalized):
+    return 'geocode:search:' + hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:48]
+
+
+def result_cache_key(kind, key):
+    """Cache key of a GeocodeResult (kind, key) pair."""
+    if kind == GeocodeResult.KIND_SEARCH:
+        return search_cache_key(key)
+    return f'geocode:{kind}:{key}'
+
+
+def record_hit(kind, key):
+    """Count a request for popularity; written to GeocodeResult.hits every HIT_FLUSH_EVERY requests."""
+    counter = 'geocode:hits:' + result_cache_key(kind, key)
+    if cache.add(counter, 1, HIT_COUNTER_TIMEOUT):
+        return
+    try:
+        count = cache.incr(counter)
+    except ValueError:
+        return
+    if count >= HIT_FLUSH_EVERY:
+        cache.delete(counter)
+        GeocodeResult.objects.filter(kind=kind, key=key).update(hits=F('hits') + count)
+
+
+def lookup(kind, key, fetch):
+    """
+    Geocode payload for (kind, key): fast cache, then the GeocodeResult table, then
+    fetch() upstream (coalesced and rate limited). Raises RateLimited / GeocoderError.
+    """
+    record_hit(kind, key)
+
+    def load():
+        now = timezone.now()
+        stored = (
+            GeocodeResult.objects.filter(kind=kind, key=key, expires_at__gt=now)
+            .values_list('payload', flat=True)
+            .first()
+        )
+        if stored is not None:
+            return stored
+        payload = fetch()
+        GeocodeResult.objects.update_or_create(
+            kind=kind,
+            key=key,
+            defaults={'payload': payload, 'expires_at': now + timedelta(seconds=settings.GEOCODE_RESULT_TTL)},
+        )
+        return payload
+
+    return coalesced(result_cache_key(kind, key), load, CACHE_TIMEOUTS[kind])
+
+
+def _words(text):
+    return re.findall(r'\w+', normalize_query(text))
+
+
+def prefix_results(normalized):
+    """
+    Answer a query from the cached results of a shorter query it extends by whole
+    words ('barcelona' -> 'barcelona gracia'). Only safe when the shorter query's
+    result set was complete (fewer than SEARCH_LIMIT results): a search for more
+    words can then only return a subset, filtered here by matching every added
+    word (the last one may be partly typed) against the result names.
+    Returns None when no cached query applies or nothing matches, so the caller
+    asks upstream instead of answering with an empty list.
+    """
+    tokens = normalized.split(' ')
+    prefixes = [' '.join(tokens[:i]) for i in range(len(tokens) - 1, 0, -1)]
+    cached = cache.get_many([search_cache_key(prefix) for prefix in prefixes])
+    for n, prefix in zip(range(len(tokens) - 1, 0, -1), prefixes):
+        payload = cached.get(search_cache_key(prefix))
+        if payload is None or not payload.get('complete'):
+            continue
+        added = tokens[n:]
+        results = [
+            result for result in payload['results']
+            if all(any(word.startswith(token) for word in _words(result['display_name'])) for token in added)
+        ]
+        return {'results': results, 'complete': True} if results else None
+    return None
+
+
+def search(q):
+    """
+    Nominatim search as {'results': [{'lat', 'lon', 'display_name'}], 'complete': bool};
+    complete means Nominatim returned fewer results than the limit (see prefix_results).
+    """
+    raw = nominatim_get(
+        'search',
+        {
+            'q': q,
+            'format': 'json',
+            'limit': str(SEARCH_LIMIT),
+            'addressdetails': '0',
+        },
+    )
+    results = []
+    for item in raw:
+        try:
+            lat = float(item['lat'])
+            lon = float(item['lon'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        results.append(
+            {
+                'lat': lat,
+                'lon': lon,
+                'display_name': item.get('display_name', ''),
+            }
+        )
+    return {'results': results, 'complete': len(raw) < SEARCH_LIMIT}
+
+
+def reverse_bucket(lat, lng):
+    """
+    Snap a coordinate to the centre of its ~REVERSE_BUCKET_M grid cell.
+    Returns (lat, lng, cell key): clicks in the same cell share one upstream call
+    and one cached address.
+    """
+    lat_step = REVERSE_BUCKET_M / METERS_PER_DEGREE
+    row = round(lat / lat_step)
+    center_lat = max(-90.0, min(90.0, row * lat_step))
+    # Cells stay ~square: longitude degrees shrink with cos(latitude)
+    lng_step = lat_step / max(math.cos(math.radians(center_lat)), 0.01)
+    col = round(lng / lng_step)
+    center_lng = max(-180.0, min(180.0, col * lng_step))
+    return center_lat, center_lng, f'{row}:{col}'
+
+
+def reverse(lat, lng):
+    """Nominatim reverse lookup as {'result': {'lat', 'lon', 'display_name'} or None}."""
+    raw = nominatim_get(
+        'reverse',
+        {
+            'lat': f'{lat:.6f}',
+            'lon': f'{lng:.6f}',
+            'format': 'json',
+            'zoom': '18',
+            'addressdetails': '0',
+        },
+    )
+    # Nominatim answers 200 {"error": "Unable to geocode"} for the open sea
+    if not isinstance(raw, dict) or 'error' in raw:
+        return {'result': None}
+    try:
+        result = {
+            'lat': float(raw['lat']),
+            'lon': float(raw['lon']),
+            'display_name': raw.get('display_name', ''),
+        }
+    except (KeyError, TypeError, ValueError):
+        return {'result': None}
+    return {'result': result}
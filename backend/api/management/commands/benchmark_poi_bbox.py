@@ -0,0 +1,56 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from api.geo import bbox_filter
+from api.models import POI
+
+
+class Command(BaseCommand):
+    help = 'Time viewport (bbox) POI queries and show the query plan, to check the spatial index is used'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help='Number of random viewports to query')
+        parser.add_argument('--span', type=float, default=0.05, help='Viewport size in degrees (0.05 ~ city zoom)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for reproducible viewports')
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        span = options['span']
+        rng = random.Random(options['seed'])
+
+        total = POI.objects.count()
+        if not total:
+            self.stdout.write(self.style.ERROR('No POIs found. Please run seed_pois first.'))
+            return
+
+        # Centre viewports on existing POIs so results are not always empty
+        centres = list(POI.objects.order_by('?').values_list('location', flat=True)[:runs])
+
+        sample = centres[0]
+        bbox = (sample.y - span / 2, sample.x - span / 2, sample.y + span / 2, sample.x + span / 2)
+        queryset = POI.objects.filter(bbox_filter(bbox)).values_list('id', flat=True)
+        plan = queryset.explain()
+        self.stdout.write(f'Query plan ({connection.vendor}):\n{plan}\n')
+        if connection.vendor == 'mysql' and 'beerfinder_poi_location_id' not in plan:
+            self.stdout.write(self.style.WARNING('Spatial index not used; run migrate (0010_poi_location_spatial_index).'))
+
+        timings = []
+        hits = []
+        for _ in range(runs):
+            centre = rng.choice(centres)
+            bbox = (centre.y - span / 2, centre.x - span / 2, centre.y + span / 2, centre.x + span / 2)
+            start = time.perf_counter()
+            ids = list(POI.objects.filter(bbox_filter(bbox)).values_list('id', flat=True))
+            timings.append((time.perf_counter() - start) * 1000)
+            hits.append(len(ids))
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f'{runs} viewports of {span} deg over {total} POIs: '
+            f'mean {statistics.mean(timings):.2f} ms, p95 {p95:.2f} ms, '
+            f'mean {statistics.mean(hits):.1f} POIs per viewport'
+        ))
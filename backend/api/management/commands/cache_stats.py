@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the shared cache (CACHE_BACKEND=sqlite or redis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'get_stats'):
+            self.stdout.write(self.style.WARNING(
+                f'CACHE_BACKEND={settings.CACHE_BACKEND} keeps no shared statistics; use sqlite or redis.'
+            ))
+            return
+
+        stats = cache.get_stats()
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+        bound = stats['max_entries'] if stats['max_entries'] is not None else 'server maxmemory'
+        self.stdout.write(self.style.SUCCESS(
+            f'{settings.CACHE_BACKEND}: {stats["hits"]} hits, {stats["misses"]} misses '
+            f'({hit_rate:.1f}% hit rate), {stats["entries"]} entries (bound: {bound})'
+        ))
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write('Counters reset.')
@@ -0,0 +1,83 @@
+import csv
+import io
+import sys
+import zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.gazetteer import write_index
+
+# GeoNames "geoname" table columns (https://download.geonames.org/export/dump/readme.txt)
+NAME, ASCIINAME, ALTERNATENAMES, LATITUDE, LONGITUDE, FEATURE_CLASS = 1, 2, 3, 4, 5, 6
+COUNTRY_CODE, ADMIN1_CODE, POPULATION = 8, 10, 14
+
+
+def open_tsv(path):
+    """Text stream of a .txt dump, or of the .txt inside a GeoNames .zip."""
+    if path.endswith('.zip'):
+        archive = zipfile.ZipFile(path)
+        member = next(name for name in archive.namelist() if name.endswith('.txt') and 'readme' not in name)
+        return io.TextIOWrapper(archive.open(member), encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_lookup(path, value_column):
+    """{code: name} from a GeoNames side table (countryInfo.txt: ES, admin1CodesASCII.txt: ES.56)."""
+    lookup = {}
+    with open_tsv(path) as f:
+        for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+            if row and not row[0].startswith('#') and len(row) > value_column:
+                lookup[row[0]] = row[value_column]
+    return lookup
+
+
+class Command(BaseCommand):
+    help = 'Build the offline geocoding index (GAZETTEER_PATH) from a GeoNames dump, e.g. cities1000.zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='GeoNames dump (.txt or .zip), e.g. cities1000.zip or ES.zip')
+        parser.add_argument('--countries', help='countryInfo.txt, for country names in display names')
+        parser.add_argument('--admin1', help='admin1CodesASCII.txt, for region names in display names')
+        parser.add_argument('--min-population', type=int, default=0, help='Skip smaller places')
+        parser.add_argument('--alternate-names', action='store_true',
+                            help='Also index alternate names (much larger index)')
+        parser.add_argument('--output', default=None, help='Index file (default: settings.GAZETTEER_PATH)')
+
+    def handle(self, *args, **options):
+        output = options['output'] or settings.GAZETTEER_PATH
+        countries = read_lookup(options['countries'], 4) if options['countries'] else {}
+        regions = read_lookup(options['admin1'], 1) if options['admin1'] else {}
+
+        places = []
+        skipped = 0
+        try:
+            with open_tsv(options['source']) as f:
+                csv.field_size_limit(sys.maxsize)
+                for row in csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+                    try:
+                        population = int(row[POPULATION] or 0)
+                        latitude = float(row[LATITUDE])
+                        longitude = float(row[LONGITUDE])
+                    except (IndexError, ValueError):
+                        skipped += 1
+                        continue
+                    # Populated places and administrative areas only
+                    if row[FEATURE_CLASS] not in ('P', 'A') or population < options['min_population']:
+                        continue
+                    names = [row[NAME], row[ASCIINAME]]
+                    if options['alternate_names'] and row[ALTERNATENAMES]:
+                        names.extend(row[ALTERNATENAMES].split(','))
+                    country = row[COUNTRY_CODE]
+                    region = regions.get(f'{country}.{row[ADMIN1_CODE]}')
+                    display = ', '.join(part for part in (row[NAME], region, countries.get(country, country)) if part)
+                    places.append((names, latitude, longitude, population, display))
+        except (OSError, zipfile.BadZipFile, StopIteration) as e:
+            raise CommandError(f'Cannot read {options["source"]}: {e}')
+
+        if not places:
+            raise CommandError('No places found; is this a GeoNames geoname dump?')
+
+        entries = write_index(output, places)
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {skipped} malformed rows'))
+        self.stdout.write(self.style.SUCCESS(f'Indexed {len(places)} places ({entries} names) into {output}'))
@@ -0,0 +1,55 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from api.thumbnail_jobs import claim_jobs, process_jobs
+
+
+class Command(BaseCommand):
+    help = 'Compress queued thumbnail uploads in a process pool (long-running worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Pool processes (0 = compress in this process)',
+        )
+        parser.add_argument('--batch', type=int, default=16, help='Jobs claimed at a time')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between checks of an empty queue')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def start_pool(self, workers):
+        if workers <= 0:
+            return None
+        # Pool processes must not inherit open database connections
+        connections.close_all()
+        return ProcessPoolExecutor(max_workers=workers)
+
+    def handle(self, *args, **options):
+        executor = self.start_pool(options['workers'])
+        processed = 0
+        # Claims left to make one job at a time after a pool process died, so a
+        # requeued upload that kills processes again is the only one in flight
+        isolate = 0
+        try:
+            while True:
+                jobs = claim_jobs(1 if isolate else options['batch'])
+                if jobs:
+                    isolate = max(isolate - 1, 0)
+                    try:
+                        processed += process_jobs(jobs, executor)
+                    except BrokenProcessPool as e:
+                        self.stderr.write(f'{e}; starting a new pool')
+                        executor.shutdown(wait=False)
+                        executor = self.start_pool(options['workers'])
+                        isolate = options['batch']
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} thumbnail jobs'))
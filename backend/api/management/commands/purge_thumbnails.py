@@ -0,0 +1,52 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from api import thumbnail_store
+from api.models import ThumbnailBlob
+
+
+class Command(BaseCommand):
+    help = 'Delete stored thumbnail files that no POI, item or item request references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Keep files unreferenced for less than this many seconds (uploads in progress)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        cutoff_time = time.time() - options['grace']
+        with transaction.atomic():
+            # Locked: a concurrent save re-referencing a hash waits, then re-creates its row
+            candidates = (
+                ThumbnailBlob.objects.select_for_update()
+                .filter(ref_count=0, updated_at__lt=cutoff)
+                .values_list('hash', flat=True)
+            )
+            unused = []
+            for content_hash in candidates:
+                modified = thumbnail_store.modified_at(content_hash)
+                # A fresh mtime means the image was just uploaded again (put() touches it)
+                if modified is not None and modified >= cutoff_time:
+                    continue
+                thumbnail_store.delete(content_hash)
+                unused.append(content_hash)
+            ThumbnailBlob.objects.filter(hash__in=unused, ref_count=0).delete()
+
+        # Files written for rows that were never saved
+        old_files = [content_hash for content_hash, mtime in thumbnail_store.stored_files() if mtime < cutoff_time]
+        known = set()
+        for start in range(0, len(old_files), 1000):
+            batch = old_files[start:start + 1000]
+            known.update(ThumbnailBlob.objects.filter(hash__in=batch).values_list('hash', flat=True))
+        orphans = [content_hash for content_hash in old_files if content_hash not in known]
+        for content_hash in orphans:
+            thumbnail_store.delete(content_hash)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {len(unused)} unreferenced and {len(orphans)} orphaned thumbnail files'
+        ))
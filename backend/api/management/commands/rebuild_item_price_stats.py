@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Item
+from api.summaries import REFRESH_BATCH_SIZE, refresh_item_price_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the ItemPriceStats row of every item (periodic repair, e.g. nightly from cron)'
+
+    def handle(self, *args, **options):
+        item_ids = list(Item.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(item_ids), REFRESH_BATCH_SIZE):
+            with transaction.atomic():
+                refresh_item_price_stats(*item_ids[start:start + REFRESH_BATCH_SIZE])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt price statistics of {len(item_ids)} items'))
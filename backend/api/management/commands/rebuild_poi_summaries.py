@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import POI
+from api.summaries import REFRESH_BATCH_SIZE, refresh_poi_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the POISummary row of every POI (repair after bulk imports or manual SQL)'
+
+    def handle(self, *args, **options):
+        poi_ids = list(POI.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(poi_ids), REFRESH_BATCH_SIZE):
+            with transaction.atomic():
+                refresh_poi_summaries(*poi_ids[start:start + REFRESH_BATCH_SIZE])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt summaries of {len(poi_ids)} POIs'))
@@ -0,0 +1,32 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.geocoder import CACHE_TIMEOUTS, result_cache_key
+from api.models import GeocodeResult
+
+
+class Command(BaseCommand):
+    help = 'Preload the most requested stored geocode results into the cache (run on deploy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=500, help='Number of results to preload')
+        parser.add_argument('--purge-expired', action='store_true', help='Also delete expired results')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options['purge_expired']:
+            deleted, _ = GeocodeResult.objects.filter(expires_at__lte=now).delete()
+            self.stdout.write(f'Deleted {deleted} expired geocode results')
+
+        rows = (
+            GeocodeResult.objects.filter(expires_at__gt=now)
+            .order_by('-hits', '-updated_at')
+            .values_list('kind', 'key', 'payload', 'expires_at')[:options['top']]
+        )
+        loaded = 0
+        for kind, key, payload, expires_at in rows:
+            timeout = min(CACHE_TIMEOUTS[kind], int((expires_at - now).total_seconds()))
+            # add, not set: never overwrite a fresher entry already in a shared cache
+            if cache.add(result_cache_key(kind, key), payload, timeout):
+                loaded += 1
+        self.stdout.write(self.style.SUCCESS(f'Preloaded {loaded} geocode results into the cache'))
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1
+
+from django.db import migrations
+
+
+POI_TABLE = 'beerfinder_poi'
+LOCATION_INDEX = 'beerfinder_poi_location_id'
+
+
+def create_location_spatial_index(apps, schema_editor):
+    """
+    Ensure a SPATIAL INDEX exists on beerfinder_poi.location (MariaDB/MySQL).
+    Django only logs an error when it cannot create it with the table, so the
+    index may be missing on databases created before InnoDB supported it.
+    PostGIS and SpatiaLite always create the index together with the column.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'mysql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+            "AND COLUMN_NAME = %s AND INDEX_TYPE = 'SPATIAL'",
+            [POI_TABLE, 'location'],
+        )
+        if cursor.fetchone()[0]:
+            return
+        cursor.execute(f'CREATE SPATIAL INDEX {LOCATION_INDEX} ON {POI_TABLE} (location)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_add_volumen_to_item_request'),
+    ]
+
+    operations = [
+        # Reverse is a no-op: the index may have existed before this migration
+        migrations.RunPython(create_location_spatial_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_thumbnail_hash(apps, schema_editor):
+    POI = apps.get_model('api', 'POI')
+    for poi in POI.objects.exclude(thumbnail__isnull=True).only('id', 'thumbnail').iterator(chunk_size=100):
+        if poi.thumbnail:
+            POI.objects.filter(pk=poi.pk).update(thumbnail_hash=hashlib.sha256(poi.thumbnail).hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_poi_location_spatial_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poi',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_thumbnail_hash, migrations.RunPython.noop),
+    ]
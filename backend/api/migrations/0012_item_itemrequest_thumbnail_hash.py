@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_thumbnail_hash(apps, schema_editor):
+    for model_name in ('Item', 'ItemRequest'):
+        model = apps.get_model('api', model_name)
+        rows = model.objects.exclude(thumbnail__isnull=True).only('id', 'thumbnail')
+        for row in rows.iterator(chunk_size=100):
+            if row.thumbnail:
+                model.objects.filter(pk=row.pk).update(thumbnail_hash=hashlib.sha256(row.thumbnail).hexdigest())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_poi_thumbnail_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='itemrequest',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_thumbnail_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_item_itemrequest_thumbnail_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name', 'id'], name='beerfinder_item_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poi',
+            index=models.Index(fields=['created_at', 'id'], name='beerfinder_poi_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrequest',
+            index=models.Index(fields=['created_at', 'id'], name='beerfinder_ir_created_id_idx'),
+        ),
+    ]
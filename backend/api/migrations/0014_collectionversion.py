@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    CollectionVersion = apps.get_model('api', 'CollectionVersion')
+    for name in ('pois', 'items'):
+        CollectionVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'beerfinder_collection_version',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
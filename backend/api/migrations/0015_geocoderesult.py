@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_collectionversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('search', 'Search'), ('reverse', 'Reverse')], max_length=10)),
+                ('key', models.CharField(help_text='Normalized query, or grid cell for reverse lookups', max_length=300)),
+                ('payload', models.JSONField(help_text='Response body as returned by the geocode endpoints')),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'beerfinder_geocode_result',
+                'indexes': [models.Index(fields=['hits'], name='beerfinder_geocode_hits_idx')],
+                'unique_together': {('kind', 'key')},
+            },
+        ),
+    ]
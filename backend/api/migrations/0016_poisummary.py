@@ -0,0 +1,66 @@
+# Generated by Django 5.0.1
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    POI = apps.get_model('api', 'POI')
+    POIItem = apps.get_model('api', 'POIItem')
+    POISummary = apps.get_model('api', 'POISummary')
+    totals = {poi_id: {'count': 0, 'prices': [], 'flavors': set(), 'brands': set()}
+              for poi_id in POI.objects.values_list('id', flat=True)}
+    rows = POIItem.objects.values_list('poi_id', 'local_price', 'item__flavor_type', 'item__brand')
+    for poi_id, local_price, flavor_type, brand in rows.iterator():
+        total = totals[poi_id]
+        total['count'] += 1
+        if local_price is not None:
+            total['prices'].append(local_price)
+        if flavor_type:
+            total['flavors'].add(flavor_type)
+        if brand:
+            total['brands'].add(brand)
+    POISummary.objects.bulk_create(
+        [
+            POISummary(
+                poi_id=poi_id,
+                item_count=total['count'],
+                min_price=min(total['prices'], default=None),
+                max_price=max(total['prices'], default=None),
+                flavor_types=sorted(total['flavors']),
+                brands=sorted(total['brands']),
+            )
+            for poi_id, total in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_geocoderesult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='POISummary',
+            fields=[
+                ('poi', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.poi')),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('flavor_types', models.JSONField(blank=True, default=list, help_text='Distinct flavor_type of the items, sorted')),
+                ('brands', models.JSONField(blank=True, default=list, help_text='Distinct non-empty brands of the items, sorted')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'beerfinder_poi_summary',
+                'indexes': [
+                    models.Index(fields=['min_price'], name='beerfinder_poisum_min_idx'),
+                    models.Index(fields=['max_price'], name='beerfinder_poisum_max_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
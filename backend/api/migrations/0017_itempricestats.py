@@ -0,0 +1,69 @@
+# Generated by Django 5.0.1
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_price_stats(apps, schema_editor):
+    Item = apps.get_model('api', 'Item')
+    POIItem = apps.get_model('api', 'POIItem')
+    ItemPriceStats = apps.get_model('api', 'ItemPriceStats')
+    prices = {item_id: [] for item_id in Item.objects.values_list('id', flat=True)}
+    rows = (
+        POIItem.objects.filter(local_price__isnull=False)
+        .order_by('item_id', 'local_price')
+        .values_list('item_id', 'local_price')
+    )
+    for item_id, local_price in rows.iterator():
+        prices[item_id].append(local_price)
+
+    def median(values):
+        middle = len(values) // 2
+        if len(values) % 2:
+            return values[middle]
+        return ((values[middle - 1] + values[middle]) / 2).quantize(Decimal('0.01'))
+
+    ItemPriceStats.objects.bulk_create(
+        [
+            ItemPriceStats(
+                item_id=item_id,
+                price_count=len(values),
+                min_price=values[0] if values else None,
+                median_price=median(values) if values else None,
+                max_price=values[-1] if values else None,
+            )
+            for item_id, values in prices.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_poisummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poiitem',
+            index=models.Index(fields=['item', 'local_price'], name='beerfinder_poiitem_price_idx'),
+        ),
+        migrations.CreateModel(
+            name='ItemPriceStats',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_stats', serialize=False, to='api.item')),
+                ('price_count', models.PositiveIntegerField(default=0, help_text='POIs listing the item with a local price')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('median_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'beerfinder_item_price_stats',
+            },
+        ),
+        migrations.RunPython(build_price_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1
+
+from django.db import migrations
+
+# FULLTEXT indexes read by api/search.py; MariaDB/MySQL only (other databases use
+# the substring fallback)
+FULLTEXT_INDEXES = [
+    ('beerfinder_item', 'beerfinder_item_search_ft', ('name', 'brand', 'description')),
+    ('beerfinder_poi', 'beerfinder_poi_search_ft', ('name', 'description')),
+]
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote = schema_editor.quote_name
+    for table, name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX {quote(name)} ON {quote(table)} ({', '.join(quote(c) for c in columns)})"
+        )
+
+
+def remove_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote = schema_editor.quote_name
+    for table, name, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(f'DROP INDEX {quote(name)} ON {quote(table)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_itempricestats'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_indexes, remove_fulltext_indexes),
+    ]
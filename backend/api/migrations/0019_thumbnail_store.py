@@ -0,0 +1,77 @@
+# Generated by Django 5.0.1
+
+from collections import Counter
+
+from django.db import migrations, models
+
+from api import thumbnail_store
+
+THUMBNAIL_MODELS = ('Item', 'POI', 'ItemRequest')
+
+
+def move_thumbnails_to_store(apps, schema_editor):
+    ThumbnailBlob = apps.get_model('api', 'ThumbnailBlob')
+    references = Counter()
+    for model_name in THUMBNAIL_MODELS:
+        model = apps.get_model('api', model_name)
+        rows = model.objects.exclude(thumbnail__isnull=True).only('id', 'thumbnail')
+        for row in rows.iterator(chunk_size=100):
+            if not row.thumbnail:
+                continue
+            content_hash = thumbnail_store.put(row.thumbnail)
+            model.objects.filter(pk=row.pk).update(thumbnail_hash=content_hash)
+            references[content_hash] += 1
+    ThumbnailBlob.objects.bulk_create(
+        [
+            ThumbnailBlob(hash=content_hash, size=thumbnail_store.size(content_hash), ref_count=count)
+            for content_hash, count in references.items()
+        ],
+        batch_size=500,
+    )
+
+
+def restore_thumbnails_from_store(apps, schema_editor):
+    for model_name in THUMBNAIL_MODELS:
+        model = apps.get_model('api', model_name)
+        rows = model.objects.exclude(thumbnail_hash='').values_list('id', 'thumbnail_hash')
+        for pk, content_hash in rows.iterator(chunk_size=100):
+            model.objects.filter(pk=pk).update(thumbnail=thumbnail_store.read(content_hash))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_search_fulltext_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailBlob',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'beerfinder_thumbnail_blob',
+                'indexes': [
+                    models.Index(fields=['ref_count', 'updated_at'], name='beerfinder_blob_unused_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(move_thumbnails_to_store, restore_thumbnails_from_store),
+        migrations.RemoveField(
+            model_name='item',
+            name='thumbnail',
+        ),
+        migrations.RemoveField(
+            model_name='poi',
+            name='thumbnail',
+        ),
+        migrations.RemoveField(
+            model_name='itemrequest',
+            name='thumbnail',
+        ),
+    ]
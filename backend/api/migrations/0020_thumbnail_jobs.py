@@ -0,0 +1,59 @@
+# Generated by Django 5.0.1
+
+from django.db import migrations, models
+
+STATUS_CHOICES = [('', 'None'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')]
+
+
+def mark_existing_thumbnails_ready(apps, schema_editor):
+    for model_name in ('Item', 'POI', 'ItemRequest'):
+        model = apps.get_model('api', model_name)
+        model.objects.exclude(thumbnail_hash='').update(thumbnail_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_thumbnail_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='thumbnail_status',
+            field=models.CharField(blank=True, choices=STATUS_CHOICES, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='poi',
+            name='thumbnail_status',
+            field=models.CharField(blank=True, choices=STATUS_CHOICES, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='itemrequest',
+            name='thumbnail_status',
+            field=models.CharField(blank=True, choices=STATUS_CHOICES, default='', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('item', 'Item'), ('poi', 'POI'), ('item_request', 'Item request')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('source_hash', models.CharField(help_text='Raw upload in the thumbnail store', max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'beerfinder_thumbnail_job',
+                'indexes': [
+                    models.Index(fields=['status', 'id'], name='beerfinder_thumbjob_queue_idx'),
+                    models.Index(fields=['target', 'object_id'], name='beerfinder_thumbjob_target_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(mark_existing_thumbnails_ready, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.contrib.gis.db import models
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from . import thumbnail_store
 
 
 # Flavor type choices shared by Item and ItemRequest models
@@ -38,13 +42,73 @@ FLAVOR_CHOICES = [
 ]
 
 
-class Item(models.Model):
+# Processing state of the last uploaded thumbnail (api.thumbnail_jobs)
+THUMBNAIL_PENDING = 'pending'
+THUMBNAIL_READY = 'ready'
+THUMBNAIL_FAILED = 'failed'
+THUMBNAIL_STATUS_CHOICES = [
+    ('', 'None'),
+    (THUMBNAIL_PENDING, 'Pending'),
+    (THUMBNAIL_READY, 'Ready'),
+    (THUMBNAIL_FAILED, 'Failed'),
+]
+
+
+class ThumbnailMixin:
+    """
+    Thumbnail images live in the content-addressed store (api.thumbnail_store); rows
+    keep only thumbnail_hash, so list views and thumbnail ETags never touch image
+    bytes. `thumbnail` reads or writes the image; save() moves the store reference
+    from the previous image to the new one (released on delete by api.signals).
+    """
+    # Hash stored in the database row (None: not loaded)
+    _saved_thumbnail_hash = ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_thumbnail_hash = instance.__dict__.get('thumbnail_hash')
+        return instance
+
+    @property
+    def thumbnail(self):
+        """Image bytes (None without a thumbnail)."""
+        return thumbnail_store.read(self.thumbnail_hash) if self.thumbnail_hash else None
+
+    @thumbnail.setter
+    def thumbnail(self, data):
+        self.thumbnail_hash = thumbnail_store.put(data) if data else ''
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'thumbnail' in update_fields:
+                update_fields = (update_fields - {'thumbnail'}) | {'thumbnail_hash'}
+            kwargs['update_fields'] = update_fields
+        previous = self._saved_thumbnail_hash
+        if previous is None and self.pk is not None:
+            previous = type(self)._base_manager.filter(pk=self.pk).values_list('thumbnail_hash', flat=True).first()
+        previous = previous or ''
+        current = self.__dict__.get('thumbnail_hash', previous)
+        if update_fields is not None and 'thumbnail_hash' not in update_fields:
+            current = previous
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if current != previous:
+                ThumbnailBlob.objects.acquire(current)
+                ThumbnailBlob.objects.release(previous)
+        self._saved_thumbnail_hash = current
+
+
+class Item(ThumbnailMixin, models.Model):
     """Items that can be associated with POIs"""
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     brand = models.CharField(max_length=100, blank=True)
     typical_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    thumbnail = models.BinaryField(null=True, blank=True)
+    thumbnail_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    thumbnail_status = models.CharField(max_length=10, choices=THUMBNAIL_STATUS_CHOICES, blank=True, default='')
     flavor_type = models.CharField(max_length=20, choices=FLAVOR_CHOICES, default='other')
     percentage = models.FloatField(null=True, blank=True)
     volumen = models.CharField(max_length=50, blank=True, help_text='Free text e.g. 33cl, 1 L, 500ml')
@@ -56,17 +120,22 @@ class Item(models.Model):
     class Meta:
         db_table = 'beerfinder_item'
         ordering = ['name']
+        indexes = [
+            # Keyset pagination order (see api.pagination)
+            models.Index(fields=['name', 'id'], name='beerfinder_item_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class POI(models.Model):
+class POI(ThumbnailMixin, models.Model):
     """Point of Interest model with geographic location"""
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     location = models.PointField()  # PostGIS Point field
-    thumbnail = models.BinaryField(null=True, blank=True)
+    thumbnail_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    thumbnail_status = models.CharField(max_length=10, choices=THUMBNAIL_STATUS_CHOICES, blank=True, default='')
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='created_pois')
     last_updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='last_updated_pois')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -76,6 +145,10 @@ class POI(models.Model):
     class Meta:
         db_table = 'beerfinder_poi'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order (see api.pagination)
+            models.Index(fields=['created_at', 'id'], name='beerfinder_poi_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -100,16 +173,21 @@ class POIItem(models.Model):
     class Meta:
         db_table = 'beerfinder_poi_item'
         unique_together = ('poi', 'item')
+        indexes = [
+            # Cheapest POIs of an item (items/{id}/prices/)
+            models.Index(fields=['item', 'local_price'], name='beerfinder_poiitem_price_idx'),
+        ]
 
 
-class ItemRequest(models.Model):
+class ItemRequest(ThumbnailMixin, models.Model):
     """Requests from users without permission to add new items"""
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     brand = models.CharField(max_length=100, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     percentage = models.FloatField(null=True, blank=True)
-    thumbnail = models.BinaryField(null=True, blank=True)
+    thumbnail_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    thumbnail_status = models.CharField(max_length=10, choices=THUMBNAIL_STATUS_CHOICES, blank=True, default='')
     flavor_type = models.CharField(max_length=20, choices=FLAVOR_CHOICES, default='other')
     volumen = models.CharField(max_length=50, blank=True, help_text='Free text e.g. 33cl, 1 L, 500ml')
     requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -129,6 +207,169 @@ class ItemRequest(models.Model):
     class Meta:
         db_table = 'beerfinder_item_request'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order (see api.pagination)
+            models.Index(fields=['created_at', 'id'], name='beerfinder_ir_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.status}"
+
+
+class CollectionVersion(models.Model):
+    """Change counter per API collection, bumped by api.signals (drives list ETags)"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'beerfinder_collection_version'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class GeocodeResult(models.Model):
+    """Geocode answers kept across deploys (api/geocoder.py); popular ones are preloaded into the cache"""
+    KIND_SEARCH = 'search'
+    KIND_REVERSE = 'reverse'
+    KIND_CHOICES = [
+        (KIND_SEARCH, 'Search'),
+        (KIND_REVERSE, 'Reverse'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=300, help_text='Normalized query, or grid cell for reverse lookups')
+    payload = models.JSONField(help_text='Response body as returned by the geocode endpoints')
+    hits = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'beerfinder_geocode_result'
+        unique_together = ('kind', 'key')
+        indexes = [
+            models.Index(fields=['hits'], name='beerfinder_geocode_hits_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.key}"
+
+
+class POISummary(models.Model):
+    """Aggregates of a POI's items for list cards and filters, kept current by api.summaries"""
+    poi = models.OneToOneField(POI, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    item_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    flavor_types = models.JSONField(default=list, blank=True, help_text='Distinct flavor_type of the items, sorted')
+    brands = models.JSONField(default=list, blank=True, help_text='Distinct non-empty brands of the items, sorted')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'beerfinder_poi_summary'
+        indexes = [
+            models.Index(fields=['min_price'], name='beerfinder_poisum_min_idx'),
+            models.Index(fields=['max_price'], name='beerfinder_poisum_max_idx'),
+        ]
+
+    def __str__(self):
+        return f"Summary of POI {self.poi_id}"
+
+
+class ItemPriceStats(models.Model):
+    """local_price statistics of an Item across POIs, kept current by api.summaries"""
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='price_stats')
+    price_count = models.PositiveIntegerField(default=0, help_text='POIs listing the item with a local price')
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    median_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'beerfinder_item_price_stats'
+
+    def __str__(self):
+        return f"Prices of item {self.item_id}"
+
+
+class ThumbnailBlobManager(models.Manager):
+    def acquire(self, content_hash):
+        """Count one more row referencing the stored image."""
+        if not content_hash:
+            return
+        if self.filter(pk=content_hash).update(ref_count=F('ref_count') + 1, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                self.create(hash=content_hash, size=thumbnail_store.size(content_hash), ref_count=1)
+        except IntegrityError:
+            # Created concurrently
+            self.filter(pk=content_hash).update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+    def release(self, content_hash):
+        """Count one row less; unreferenced files are deleted by `manage.py purge_thumbnails`."""
+        if content_hash:
+            self.filter(pk=content_hash, ref_count__gt=0).update(
+                ref_count=F('ref_count') - 1, updated_at=timezone.now()
+            )
+
+
+class ThumbnailBlob(models.Model):
+    """A stored thumbnail file (api.thumbnail_store) and how many rows reference it"""
+    hash = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ThumbnailBlobManager()
+
+    class Meta:
+        db_table = 'beerfinder_thumbnail_blob'
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at'], name='beerfinder_blob_unused_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hash} ({self.ref_count} refs)"
+
+
+class ThumbnailJob(models.Model):
+    """An uploaded image waiting to become the thumbnail of a row (api.thumbnail_jobs)"""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    TARGET_CHOICES = [
+        ('item', 'Item'),
+        ('poi', 'POI'),
+        ('item_request', 'Item request'),
+    ]
+
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    source_hash = models.CharField(max_length=64, help_text='Raw upload in the thumbnail store')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'beerfinder_thumbnail_job'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='beerfinder_thumbjob_queue_idx'),
+            models.Index(fields=['target', 'object_id'], name='beerfinder_thumbjob_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target} {self.object_id}: {self.status}"
@@ -0,0 +1,122 @@
+"""
+Minimal Mapbox Vector Tile (spec v2) encoder for point layers.
+
+Only what the POI tiles need: point features with an id and scalar properties,
+written as protobuf by hand so no extra dependency is required.
+See https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+import struct
+
+DEFAULT_EXTENT = 4096
+
+# Protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH = 2
+
+# vector_tile.proto field numbers
+_TILE_LAYERS = 3
+_LAYER_NAME = 1
+_LAYER_FEATURES = 2
+_LAYER_KEYS = 3
+_LAYER_VALUES = 4
+_LAYER_EXTENT = 5
+_LAYER_VERSION = 15
+_FEATURE_ID = 1
+_FEATURE_TAGS = 2
+_FEATURE_TYPE = 3
+_FEATURE_GEOMETRY = 4
+_VALUE_STRING = 1
+_VALUE_DOUBLE = 3
+_VALUE_UINT = 5
+_VALUE_SINT = 6
+_VALUE_BOOL = 7
+
+GEOM_POINT = 1
+_CMD_MOVE_TO = 1
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field, payload):
+    return _key(field, _LENGTH) + _varint(len(payload)) + payload
+
+
+def _uint_field(field, value):
+    return _key(field, _VARINT) + _varint(value)
+
+
+def _packed(field, values):
+    return _length_delimited(field, b''.join(_varint(v) for v in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _uint_field(_VALUE_BOOL, int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _uint_field(_VALUE_UINT, value)
+        return _uint_field(_VALUE_SINT, _zigzag(value))
+    if isinstance(value, float):
+        return _key(_VALUE_DOUBLE, _FIXED64) + struct.pack('<d', value)
+    return _length_delimited(_VALUE_STRING, str(value).encode('utf-8'))
+
+
+def encode_point_layer(name, features, extent=DEFAULT_EXTENT):
+    """
+    Encode one layer of point features.
+    features: iterable of (id, (x, y), properties) with x/y in tile pixel
+    coordinates (0..extent, y pointing down). None property values are skipped.
+    """
+    keys, values = [], []
+    key_index, value_index = {}, {}
+    encoded_features = []
+    for feature_id, (x, y), properties in features:
+        tags = []
+        for k, v in properties.items():
+            if v is None:
+                continue
+            if k not in key_index:
+                key_index[k] = len(keys)
+                keys.append(k)
+            value_key = (type(v), v)
+            if value_key not in value_index:
+                value_index[value_key] = len(values)
+                values.append(v)
+            tags.extend((key_index[k], value_index[value_key]))
+        geometry = (_CMD_MOVE_TO | (1 << 3), _zigzag(int(round(x))), _zigzag(int(round(y))))
+        feature = _uint_field(_FEATURE_ID, feature_id)
+        if tags:
+            feature += _packed(_FEATURE_TAGS, tags)
+        feature += _uint_field(_FEATURE_TYPE, GEOM_POINT) + _packed(_FEATURE_GEOMETRY, geometry)
+        encoded_features.append(feature)
+
+    layer = _uint_field(_LAYER_VERSION, 2) + _length_delimited(_LAYER_NAME, name.encode('utf-8'))
+    layer += b''.join(_length_delimited(_LAYER_FEATURES, f) for f in encoded_features)
+    layer += b''.join(_length_delimited(_LAYER_KEYS, k.encode('utf-8')) for k in keys)
+    layer += b''.join(_length_delimited(_LAYER_VALUES, _encode_value(v)) for v in values)
+    layer += _uint_field(_LAYER_EXTENT, extent)
+    return layer
+
+
+def encode_tile(layers):
+    """Wrap already encoded layers (see encode_point_layer) into a tile."""
+    return b''.join(_length_delimited(_TILE_LAYERS, layer) for layer in layers)
@@ -0,0 +1,145 @@
+"""Pagination classes for the API viewsets."""
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+# reverse: page backwards (previous links); position: the ordering values of the
+# row the page starts after, one per ordering field (None: from the start or end)
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'position'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination over a composite ordering: the cursor carries every
+    ordering value of the last row seen, and a page is fetched with
+    WHERE key > k OR (key = k AND id > i), a seek on the matching composite index.
+    Equal keys are never skipped with OFFSET, so the cost per page does not grow
+    with depth or with runs of duplicates.
+    The ordering is set per viewset and must end in a unique tiebreak (id).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse, position = self.cursor or (False, None)
+
+        ordering = tuple(_reverse_order(order) for order in self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.seek_filter(ordering, position))
+            except (DjangoValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One extra row tells whether another page follows in this direction
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def seek_filter(ordering, position):
+        """Rows strictly after position: (k1 > p1) OR (k1 = p1 AND k2 > p2) ..., per field direction."""
+        condition = Q()
+        for i, order in enumerate(ordering):
+            term = Q(**{order.lstrip('-') + ('__lt' if order.startswith('-') else '__gt'): position[i]})
+            for previous, value in zip(ordering[:i], position[:i]):
+                term &= Q(**{previous.lstrip('-'): value})
+            condition |= term
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # After the last row shown; an empty page (past the end) starts over
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else None
+        return self.encode_cursor(KeysetCursor(reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        # Before the first row shown; an empty page goes back from the end
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else None
+        return self.encode_cursor(KeysetCursor(reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        position = tokens.get('p')
+        if position is not None and len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return KeysetCursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        if cursor.position is not None:
+            tokens['p'] = cursor.position
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            field = order.lstrip('-')
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return position
+
+
+def _reverse_order(order):
+    return order[1:] if order.startswith('-') else '-' + order
+
+
+class OptionalCursorPaginationMixin:
+    """
+    Keeps the default page-number pagination, but ?paging=cursor (or the ?cursor=
+    of a next/previous link) switches a listing to KeysetPagination over
+    cursor_ordering, which should match a composite index on the model.
+    """
+    cursor_ordering = None
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get('paging') == 'cursor' or 'cursor' in params
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.cursor_ordering and self.use_cursor_pagination():
+                self._paginator = KeysetPagination(self.cursor_ordering)
+            else:
+                return super().paginator
+        return self._paginator
@@ -0,0 +1,116 @@
+"""
+Ranked text search over items and POIs (search/?q=).
+
+On MariaDB the FULLTEXT indexes added by migration 0018 answer the query:
+rows are selected with MATCH ... AGAINST in boolean mode (every word required,
+as a prefix, so type-ahead works) and ranked by natural-language relevance,
+both read from the index. Elsewhere, or with SEARCH_FULLTEXT off, every word
+must be a substring of one of the fields and name matches rank first.
+
+InnoDB only indexes words of at least FULLTEXT_MIN_WORD characters
+(innodb_ft_min_token_size); shorter words are left to the substring fallback
+when nothing else is searchable.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Func, IntegerField, Lookup, Q, Value, When
+
+from .models import POI, Item
+
+ITEM_SEARCH_FIELDS = ('name', 'brand', 'description')
+POI_SEARCH_FIELDS = ('name', 'description')
+FULLTEXT_MIN_WORD = 3
+
+
+class Match(Func):
+    """MATCH (columns) AGAINST (query [IN BOOLEAN MODE]): relevance from a FULLTEXT index."""
+    output_field = FloatField()
+
+    def __init__(self, fields, query, boolean=False):
+        super().__init__(*fields, Value(query))
+        self.boolean = boolean
+
+    def as_sql(self, compiler, connection, **extra_context):
+        *columns, query = self.get_source_expressions()
+        column_sql = []
+        params = []
+        for column in columns:
+            sql, column_params = compiler.compile(column)
+            column_sql.append(sql)
+            params.extend(column_params)
+        query_sql, query_params = compiler.compile(query)
+        mode = ' IN BOOLEAN MODE' if self.boolean else ''
+        return f"MATCH ({', '.join(column_sql)}) AGAINST ({query_sql}{mode})", [*params, *query_params]
+
+
+class FullTextMatch(Lookup):
+    """
+    Filter on a bare MATCH ... AGAINST (boolean mode). A comparison such as
+    `MATCH(...) > 0` would not be answered from the FULLTEXT index.
+    """
+    lookup_name = 'fulltext_match'
+    prepare_rhs = False
+
+    def __init__(self, fields, query):
+        super().__init__(Match(fields, query, boolean=True), True)
+
+    def as_sql(self, compiler, connection):
+        return compiler.compile(self.lhs)
+
+
+def search_words(q):
+    """Words of a query; boolean-mode operators (+ - * " ...) are dropped."""
+    return re.findall(r'\w+', q)
+
+
+def use_fulltext(words):
+    return (
+        settings.SEARCH_FULLTEXT
+        and connection.vendor == 'mysql'
+        and any(len(word) >= FULLTEXT_MIN_WORD for word in words)
+    )
+
+
+def fulltext_search(queryset, fields, words):
+    required = ' '.join(f'+{word}*' for word in words if len(word) >= FULLTEXT_MIN_WORD)
+    return (
+        queryset.filter(FullTextMatch(fields, required))
+        .annotate(score=Match(fields, ' '.join(words)))
+        .order_by('-score', 'name', 'id')
+    )
+
+
+def substring_search(queryset, fields, words, q):
+    for word in words:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(condition)
+    score = Case(
+        When(name__iexact=q, then=Value(3)),
+        When(name__istartswith=q, then=Value(2)),
+        When(name__icontains=q, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return queryset.annotate(score=score).order_by('-score', 'name', 'id')
+
+
+def ranked_search(queryset, fields, q):
+    """queryset filtered to rows matching every word of q, best match first (score annotated)."""
+    words = search_words(q)
+    if not words:
+        return queryset.none()
+    if use_fulltext(words):
+        return fulltext_search(queryset, fields, words)
+    return substring_search(queryset, fields, words, q)
+
+
+def search_items(q, queryset=None):
+    return ranked_search(Item.objects.all() if queryset is None else queryset, ITEM_SEARCH_FIELDS, q)
+
+
+def search_pois(q, queryset=None):
+    return ranked_search(POI.objects.all() if queryset is None else queryset, POI_SEARCH_FIELDS, q)
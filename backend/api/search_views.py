@@ -0,0 +1,65 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .geo import parse_number
+from .models import POI, Item
+from .search import search_items, search_pois
+from .serializers import ItemWithPriceStatsSerializer, POIListSerializer
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_LENGTH = 200
+# Results per kind when no ?type= is given (type-ahead)
+SEARCH_DEFAULT_LIMIT = 5
+SEARCH_MAX_LIMIT = 20
+
+
+class SearchView(APIView):
+    """
+    Ranked search over items (name, brand, description) and POIs (name,
+    description), answered from FULLTEXT indexes on MariaDB (api/search.py).
+    Without ?type= returns the best ?limit= items and POIs; ?type=items or
+    ?type=pois pages through every match of one kind (?page=).
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        q = (request.query_params.get('q') or '').strip()
+        if len(q) < SEARCH_MIN_LENGTH:
+            raise ValidationError({'q': f'Enter at least {SEARCH_MIN_LENGTH} characters.'})
+        if len(q) > SEARCH_MAX_LENGTH:
+            raise ValidationError({'q': f'Enter at most {SEARCH_MAX_LENGTH} characters.'})
+        kind = request.query_params.get('type') or None
+        if kind not in (None, 'items', 'pois'):
+            raise ValidationError({'type': 'Must be items or pois.'})
+
+        # Same representations as the items and POI lists
+        searches = {
+            'items': (
+                search_items(q, Item.objects.select_related('price_stats')),
+                ItemWithPriceStatsSerializer,
+            ),
+            'pois': (
+                search_pois(q, POI.objects.select_related('summary').prefetch_related('items')),
+                POIListSerializer,
+            ),
+        }
+        context = {'request': request}
+
+        if kind is not None:
+            queryset, serializer_class = searches[kind]
+            paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            return paginator.get_paginated_response(serializer_class(page, many=True, context=context).data)
+
+        limit = parse_number(
+            request.query_params, 'limit', default=SEARCH_DEFAULT_LIMIT, min_value=1, max_value=SEARCH_MAX_LIMIT,
+            integer=True,
+        )
+        return Response({
+            name: serializer_class(queryset[:limit], many=True, context=context).data
+            for name, (queryset, serializer_class) in searches.items()
+        })
@@ -2,65 +2,139 @@ from rest_framework import serializers
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
-from .models import POI, Item, ItemRequest, POIItem
-from .utils import compress_thumbnail
+from django.conf import settings
+from .models import POI, Item, ItemPriceStats, ItemRequest, POIItem, POISummary, THUMBNAIL_READY
+from . import thumbnail_store
+from .thumbnail_jobs import enqueue_thumbnail
+from .thumbnails import thumbnail_url
+from .uploads import probe_upload, upload_path
+from .utils import make_thumbnail
 import base64
+import binascii
 
 
-class ItemSerializer(serializers.ModelSerializer):
-    thumbnail = serializers.SerializerMethodField()
-    thumbnail_write = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True)
-    
-    class Meta:
-        model = Item
-        fields = ['id', 'name', 'description', 'brand', 'typical_price', 'thumbnail', 'thumbnail_write', 'flavor_type', 'percentage', 'volumen', 'created_by', 'updated_by', 'created_at', 'updated_at']
-        read_only_fields = ['created_by', 'updated_by', 'created_at', 'updated_at']
-    
-    def get_thumbnail(self, obj):
-        """Convert binary thumbnail to base64 string for JSON serialization"""
-        if obj.thumbnail:
-            try:
-                return base64.b64encode(obj.thumbnail).decode('utf-8')
-            except Exception:
-                return None
-        return None
-    
-    def create(self, validated_data):
-        """Create Item and handle thumbnail conversion"""
+class ThumbnailSerializerMixin:
+    """
+    Thumbnail handling shared by Item, POI and ItemRequest serializers.
+    Reads expose thumbnail_url (served by the model's thumbnail endpoint, never
+    the blob itself); writes accept a multipart file in thumbnail_file (streamed
+    to disk, see api.uploads) or, for older clients, a base64 image in thumbnail_write.
+    With THUMBNAIL_ASYNC the upload is queued for `manage.py process_thumbnails`
+    and thumbnail_status stays 'pending' until the thumbnail is ready.
+    """
+    thumbnail_url_name = None
+
+    def get_thumbnail_url(self, obj):
+        """Versioned URL of the thumbnail endpoint (None when there is no thumbnail)"""
+        return thumbnail_url(self.context.get('request'), self.thumbnail_url_name, obj)
+
+    def validate_thumbnail_file(self, value):
+        """Header-only probe before anything is stored: 413 past the upload budgets, 400 for non-images"""
+        if value:
+            probe_upload(value)
+        return value
+
+    def validate_thumbnail_write(self, value):
+        """Decoded base64 upload, probed like thumbnail_file"""
+        if not value:
+            return value
+        try:
+            raw = base64.b64decode(value)
+        except binascii.Error:
+            raise serializers.ValidationError('Not valid base64.')
+        probe_upload(raw)
+        return raw
+
+    def _set_thumbnail(self, validated_data, creating):
+        """Returns the raw upload to queue once the instance is saved (None otherwise)."""
+        thumbnail_file = validated_data.pop('thumbnail_file', None)
         thumbnail_data = validated_data.pop('thumbnail_write', None)
-        
-        if thumbnail_data:
+        if thumbnail_file or thumbnail_data:
             try:
-                raw = base64.b64decode(thumbnail_data)
-                validated_data['thumbnail'] = compress_thumbnail(raw)
+                raw = thumbnail_file or thumbnail_data
+                if settings.THUMBNAIL_ASYNC:
+                    return raw
+                thumbnail, renditions = make_thumbnail(
+                    upload_path(raw) if thumbnail_file else raw,
+                    settings.THUMBNAIL_MAX_PIXELS,
+                    settings.THUMBNAIL_MAX_FRAMES,
+                )
+                validated_data['thumbnail_hash'] = thumbnail_store.put(thumbnail, renditions)
+                validated_data['thumbnail_status'] = THUMBNAIL_READY
             except Exception:
                 validated_data['thumbnail'] = None
-        else:
+        elif creating:
             validated_data.pop('thumbnail', None)
-        
-        return super().create(validated_data)
-    
+        return None
+
+    def create(self, validated_data):
+        """Create instance and handle thumbnail conversion"""
+        upload = self._set_thumbnail(validated_data, creating=True)
+        instance = super().create(validated_data)
+        if upload:
+            enqueue_thumbnail(instance, upload)
+        return instance
+
     def update(self, instance, validated_data):
-        """Update Item and handle thumbnail conversion"""
-        thumbnail_data = validated_data.pop('thumbnail_write', None)
-        
-        if thumbnail_data:
-            try:
-                raw = base64.b64decode(thumbnail_data)
-                validated_data['thumbnail'] = compress_thumbnail(raw)
-            except Exception:
-                validated_data['thumbnail'] = None
-        
-        return super().update(instance, validated_data)
+        """Update instance and handle thumbnail conversion"""
+        upload = self._set_thumbnail(validated_data, creating=False)
+        instance = super().update(instance, validated_data)
+        if upload:
+            enqueue_thumbnail(instance, upload)
+        return instance
 
 
-class POISerializer(GeoFeatureModelSerializer):
+class ItemSerializer(ThumbnailSerializerMixin, serializers.ModelSerializer):
+    thumbnail_url_name = 'item-thumbnail'
+    thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_write = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True)
+    thumbnail_file = serializers.FileField(write_only=True, required=False, allow_null=True)
+    
+    class Meta:
+        model = Item
+        fields = ['id', 'name', 'description', 'brand', 'typical_price', 'thumbnail_url', 'thumbnail_write', 'thumbnail_file', 'thumbnail_status', 'flavor_type', 'percentage', 'volumen', 'created_by', 'updated_by', 'created_at', 'updated_at']
+        read_only_fields = ['thumbnail_status', 'created_by', 'updated_by', 'created_at', 'updated_at']
+
+
+class ItemPriceStatsSerializer(serializers.ModelSerializer):
+    """local_price statistics of an item across POIs (api.summaries)"""
+
+    class Meta:
+        model = ItemPriceStats
+        fields = ['price_count', 'min_price', 'median_price', 'max_price']
+        read_only_fields = fields
+
+
+class ItemWithPriceStatsSerializer(ItemSerializer):
+    """Item representation of the items endpoints, plus its price statistics"""
+    price_stats = ItemPriceStatsSerializer(read_only=True)
+
+    class Meta(ItemSerializer.Meta):
+        fields = ItemSerializer.Meta.fields + ['price_stats']
+
+
+class ItemPriceSerializer(serializers.ModelSerializer):
+    """One POI's local price of an item (items/{id}/prices/)"""
+    poi_id = serializers.IntegerField(source='poi.id', read_only=True)
+    poi_name = serializers.CharField(source='poi.name', read_only=True)
+    latitude = serializers.FloatField(source='poi.latitude', read_only=True)
+    longitude = serializers.FloatField(source='poi.longitude', read_only=True)
+
+    class Meta:
+        model = POIItem
+        fields = ['poi_id', 'poi_name', 'latitude', 'longitude', 'local_price']
+        read_only_fields = fields
+
+
+class POISerializer(ThumbnailSerializerMixin, GeoFeatureModelSerializer):
     """Serializer for POI with geographic data"""
+    thumbnail_url_name = 'poi-thumbnail'
     items = ItemSerializer(many=True, read_only=True)
     latitude = serializers.ReadOnlyField()
     longitude = serializers.ReadOnlyField()
-    thumbnail = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     thumbnail_write = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True)
+    thumbnail_file = serializers.FileField(write_only=True, required=False, allow_null=True)
     # Allow latitude/longitude to be written (will be converted to location in view)
     latitude_write = serializers.FloatField(write_only=True, required=False)
     longitude_write = serializers.FloatField(write_only=True, required=False)
@@ -70,51 +144,14 @@ class POISerializer(GeoFeatureModelSerializer):
         geo_field = 'location'
         fields = [
             'id', 'name', 'description', 'location', 'latitude', 'longitude',
-            'latitude_write', 'longitude_write', 'thumbnail', 'thumbnail_write',
+            'latitude_write', 'longitude_write', 'thumbnail_url', 'thumbnail_write', 'thumbnail_file', 'thumbnail_status',
             'created_by', 'last_updated_by', 'created_at', 'updated_at', 'items'
         ]
-        read_only_fields = ['created_by', 'created_at', 'updated_at']
+        read_only_fields = ['thumbnail_status', 'created_by', 'created_at', 'updated_at']
         extra_kwargs = {
             'location': {'required': False}  # Make location optional
         }
     
-    def get_thumbnail(self, obj):
-        """Convert binary thumbnail to base64 string for JSON serialization"""
-        if obj.thumbnail:
-            try:
-                return base64.b64encode(obj.thumbnail).decode('utf-8')
-            except Exception:
-                return None
-        return None
-    
-    def create(self, validated_data):
-        """Create POI and handle thumbnail conversion"""
-        thumbnail_data = validated_data.pop('thumbnail_write', None)
-        
-        if thumbnail_data:
-            try:
-                raw = base64.b64decode(thumbnail_data)
-                validated_data['thumbnail'] = compress_thumbnail(raw)
-            except Exception:
-                validated_data['thumbnail'] = None
-        else:
-            validated_data.pop('thumbnail', None)
-        
-        return super().create(validated_data)
-    
-    def update(self, instance, validated_data):
-        """Update POI and handle thumbnail conversion"""
-        thumbnail_data = validated_data.pop('thumbnail_write', None)
-        
-        if thumbnail_data:
-            try:
-                raw = base64.b64decode(thumbnail_data)
-                validated_data['thumbnail'] = compress_thumbnail(raw)
-            except Exception:
-                validated_data['thumbnail'] = None
-        
-        return super().update(instance, validated_data)
-    
     def validate(self, data):
         # For updates (partial), location is not required if not being changed
         if self.instance is not None:
@@ -137,89 +174,75 @@ class POISerializer(GeoFeatureModelSerializer):
         return data
 
 
-class POIListSerializer(serializers.ModelSerializer):
+class POISummarySerializer(serializers.ModelSerializer):
+    """Item count, local price range, flavor types and brands of a POI (api.summaries)"""
+
+    class Meta:
+        model = POISummary
+        fields = ['item_count', 'min_price', 'max_price', 'flavor_types', 'brands']
+        read_only_fields = fields
+
+
+class POIListSerializer(ThumbnailSerializerMixin, serializers.ModelSerializer):
     """Simplified serializer for POI list (without geographic details)"""
+    thumbnail_url_name = 'poi-thumbnail'
     items = ItemSerializer(many=True, read_only=True)
+    summary = POISummarySerializer(read_only=True)
     latitude = serializers.ReadOnlyField()
     longitude = serializers.ReadOnlyField()
-    thumbnail = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
 
     class Meta:
         model = POI
         fields = [
-            'id', 'name', 'description', 'latitude', 'longitude', 'thumbnail',
-            'created_by', 'last_updated_by', 'created_at', 'updated_at', 'items'
+            'id', 'name', 'description', 'latitude', 'longitude', 'thumbnail_url',
+            'created_by', 'last_updated_by', 'created_at', 'updated_at', 'items', 'summary'
         ]
         read_only_fields = ['created_by', 'created_at', 'updated_at']
-    
-    def get_thumbnail(self, obj):
-        """Convert binary thumbnail to base64 string for JSON serialization"""
-        if obj.thumbnail:
-            try:
-                return base64.b64encode(obj.thumbnail).decode('utf-8')
-            except Exception:
-                return None
-        return None
 
 
-class ItemRequestSerializer(serializers.ModelSerializer):
-    thumbnail = serializers.SerializerMethodField()
+class POIMarkerSerializer(ThumbnailSerializerMixin, serializers.ModelSerializer):
+    """Compact POI representation for map markers (?view=markers): no blobs, no nested items"""
+    thumbnail_url_name = 'poi-thumbnail'
+    latitude = serializers.ReadOnlyField()
+    longitude = serializers.ReadOnlyField()
+    item_count = serializers.IntegerField(read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = POI
+        fields = ['id', 'name', 'latitude', 'longitude', 'item_count', 'thumbnail_hash', 'thumbnail_url']
+        read_only_fields = fields
+
+
+class POINearbySerializer(POIListSerializer):
+    """POI list representation plus the distance from the searched point"""
+    distance_m = serializers.FloatField(read_only=True)
+
+    class Meta(POIListSerializer.Meta):
+        fields = POIListSerializer.Meta.fields + ['distance_m']
+
+
+class ItemRequestSerializer(ThumbnailSerializerMixin, serializers.ModelSerializer):
+    thumbnail_url_name = 'item-request-thumbnail'
+    thumbnail_url = serializers.SerializerMethodField()
     thumbnail_write = serializers.CharField(write_only=True, required=False, allow_blank=True, allow_null=True)
+    thumbnail_file = serializers.FileField(write_only=True, required=False, allow_null=True)
     requested_by_username = serializers.SerializerMethodField()
     
     class Meta:
         model = ItemRequest
         fields = [
-            'id', 'name', 'description', 'brand', 'price', 'percentage', 'thumbnail', 'thumbnail_write', 'flavor_type', 'volumen', 'requested_by',
+            'id', 'name', 'description', 'brand', 'price', 'percentage', 'thumbnail_url', 'thumbnail_write', 'thumbnail_file', 'thumbnail_status', 'flavor_type', 'volumen', 'requested_by',
             'requested_by_username', 'status', 'status_changed_by', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['requested_by', 'requested_by_username', 'status', 'status_changed_by', 'created_at', 'updated_at']
-        extra_kwargs = {
-            'thumbnail': {'write_only': False}  # Allow thumbnail to be written via create/update methods
-        }
+        read_only_fields = ['requested_by', 'requested_by_username', 'status', 'thumbnail_status', 'status_changed_by', 'created_at', 'updated_at']
     
     def get_requested_by_username(self, obj):
         """Return the username of the user who requested the item"""
         if obj.requested_by:
             return obj.requested_by.username
         return None
-    
-    def get_thumbnail(self, obj):
-        """Convert binary thumbnail to base64 string for JSON serialization"""
-        if obj.thumbnail:
-            try:
-                return base64.b64encode(obj.thumbnail).decode('utf-8')
-            except Exception:
-                return None
-        return None
-    
-    def create(self, validated_data):
-        """Create ItemRequest and handle thumbnail conversion"""
-        thumbnail_data = validated_data.pop('thumbnail_write', None)
-        
-        if thumbnail_data:
-            try:
-                raw = base64.b64decode(thumbnail_data)
-                validated_data['thumbnail'] = compress_thumbnail(raw)
-            except Exception:
-                validated_data['thumbnail'] = None
-        else:
-            validated_data.pop('thumbnail', None)
-        
-        return super().create(validated_data)
-    
-    def update(self, instance, validated_data):
-        """Update ItemRequest and handle thumbnail conversion"""
-        thumbnail_data = validated_data.pop('thumbnail_write', None)
-        
-        if thumbnail_data:
-            try:
-                raw = base64.b64decode(thumbnail_data)
-                validated_data['thumbnail'] = compress_thumbnail(raw)
-            except Exception:
-                validated_data['thumbnail'] = None
-        
-        return super().update(instance, validated_data)
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,105 @@
+"""
+Cache invalidation, aggregate and thumbnail reference hooks for POIs and items (connected in ApiConfig.ready).
+
+Aggregates and collection versions are database rows, written in the transaction
+of the change. Cached responses and tiles are evicted once it commits: evicted
+earlier, a concurrent request could rebuild them from the old rows and serve
+that copy until it expires.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import ITEMS, POIS, bump_collection_version, evict_poi_responses
+from .models import POI, Item, ItemRequest, POIItem, ThumbnailBlob
+from .summaries import refresh_item_price_stats, refresh_poi_summaries
+from .tile_views import tile_cache_keys_for_point
+
+
+def invalidate_poi_tiles(*points):
+    """Evict every cached vector tile containing one of the given locations."""
+    keys = set()
+    for point in points:
+        if point is not None:
+            keys.update(tile_cache_keys_for_point(point))
+    if keys:
+        cache.delete_many(list(keys))
+
+
+def after_commit(func, *args):
+    """Run func(*args) once the current transaction commits (at once outside one)."""
+    transaction.on_commit(lambda: func(*args))
+
+
+def _poi_location(poi_item):
+    """Location of the POI of a POIItem without loading the whole POI row."""
+    if POIItem.poi.is_cached(poi_item):
+        return poi_item.poi.location
+    return POI.objects.filter(pk=poi_item.poi_id).values_list('location', flat=True).first()
+
+
+@receiver(pre_save, sender=POI)
+def remember_previous_location(sender, instance, **kwargs):
+    # A moved POI must also disappear from the tiles of its old location
+    instance._previous_location = None
+    if instance.pk:
+        instance._previous_location = (
+            POI.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=POI)
+def poi_saved(sender, instance, created, **kwargs):
+    if created:
+        refresh_poi_summaries(instance.pk)
+    bump_collection_version(POIS)
+    after_commit(evict_poi_responses, instance.pk)
+    after_commit(invalidate_poi_tiles, instance.location, getattr(instance, '_previous_location', None))
+
+
+@receiver(post_delete, sender=POI)
+def poi_deleted(sender, instance, **kwargs):
+    bump_collection_version(POIS)
+    after_commit(evict_poi_responses, instance.pk)
+    after_commit(invalidate_poi_tiles, instance.location)
+
+
+@receiver(post_save, sender=POIItem)
+@receiver(post_delete, sender=POIItem)
+def poi_item_changed(sender, instance, **kwargs):
+    # A deleted POI or item takes its aggregate row with it (cascade); do not recreate it
+    origin = kwargs.get('origin')
+    origin_model = origin.__class__ if isinstance(origin, (POI, Item)) else getattr(origin, 'model', None)
+    if origin_model is not POI:
+        refresh_poi_summaries(instance.poi_id)
+    if origin_model is not Item:
+        refresh_item_price_stats(instance.item_id)
+    # Item representations carry price statistics
+    bump_collection_version(POIS, ITEMS)
+    after_commit(evict_poi_responses, instance.poi_id)
+    # Tiles carry item_count (the location is read now: the POI may be gone after commit)
+    after_commit(invalidate_poi_tiles, _poi_location(instance))
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_changed(sender, instance, **kwargs):
+    # POI representations nest their items. On delete the POIItem rows are
+    # removed first and evict their POIs through poi_item_changed.
+    bump_collection_version(ITEMS, POIS)
+    if kwargs.get('created'):
+        refresh_item_price_stats(instance.pk)
+    if kwargs.get('signal') is post_save:
+        poi_ids = list(POIItem.objects.filter(item=instance).values_list('poi_id', flat=True))
+        # Brand and flavor_type are summarized per POI
+        refresh_poi_summaries(*poi_ids)
+        after_commit(evict_poi_responses, *poi_ids)
+
+
+@receiver(post_delete, sender=POI)
+@receiver(post_delete, sender=Item)
+@receiver(post_delete, sender=ItemRequest)
+def thumbnail_owner_deleted(sender, instance, **kwargs):
+    # The stored file is deleted by `manage.py purge_thumbnails` once unreferenced
+    ThumbnailBlob.objects.release(instance.thumbnail_hash)
@@ -0,0 +1,129 @@
+"""
+Denormalized aggregates, so lists and filters read one narrow row instead of
+every POIItem:
+- POISummary: item count, local price range, flavor types and brands of each POI.
+- ItemPriceStats: min/median/max/count of an item's local prices across POIs.
+
+api.signals refreshes the rows touched by a POIItem, Item or POI write, in the
+same transaction as the write (the views wrap those writes in transaction.atomic).
+A refresh recomputes whole rows from the transaction's snapshot, so concurrent
+writers to one POI or item would each miss the other's row; the views therefore
+take lock_pois / lock_items before any other read of the transaction.
+`manage.py rebuild_poi_summaries` and `manage.py rebuild_item_price_stats`
+recompute every row.
+"""
+from decimal import Decimal
+
+from .models import POI, Item, ItemPriceStats, POIItem, POISummary
+
+SUMMARY_FIELDS = ['item_count', 'min_price', 'max_price', 'flavor_types', 'brands', 'updated_at']
+PRICE_STATS_FIELDS = ['price_count', 'min_price', 'median_price', 'max_price', 'updated_at']
+# Rows recomputed per query (an item edit touches every POI that lists it)
+REFRESH_BATCH_SIZE = 500
+
+
+def _lock(model, ids):
+    valid = set()
+    for value in ids:
+        try:
+            valid.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    # Always in id order, so two transactions locking overlapping rows cannot deadlock
+    return list(model.objects.select_for_update().filter(pk__in=valid).order_by('pk').values_list('pk', flat=True))
+
+
+def lock_pois(*poi_ids):
+    """
+    SELECT ... FOR UPDATE the POI rows, so writers changing the items of a POI run
+    one after the other. Must come before any other read of the transaction: under
+    REPEATABLE READ the snapshot is taken by the first plain read, and a snapshot
+    taken after the lock sees what the previous writer committed.
+    Lock POIs before items (lock_items), the order every writer uses.
+    """
+    return _lock(POI, poi_ids)
+
+
+def lock_items(*item_ids):
+    """SELECT ... FOR UPDATE the Item rows (price statistics), after lock_pois."""
+    return _lock(Item, item_ids)
+
+
+def compute_summaries(poi_ids):
+    """Unsaved POISummary rows for poi_ids from one query over their POIItems."""
+    totals = {poi_id: {'count': 0, 'prices': [], 'flavors': set(), 'brands': set()} for poi_id in poi_ids}
+    rows = POIItem.objects.filter(poi_id__in=poi_ids).values_list(
+        'poi_id', 'local_price', 'item__flavor_type', 'item__brand'
+    )
+    for poi_id, local_price, flavor_type, brand in rows:
+        total = totals[poi_id]
+        total['count'] += 1
+        if local_price is not None:
+            total['prices'].append(local_price)
+        if flavor_type:
+            total['flavors'].add(flavor_type)
+        if brand:
+            total['brands'].add(brand)
+    return [
+        POISummary(
+            poi_id=poi_id,
+            item_count=total['count'],
+            min_price=min(total['prices'], default=None),
+            max_price=max(total['prices'], default=None),
+            flavor_types=sorted(total['flavors']),
+            brands=sorted(total['brands']),
+        )
+        for poi_id, total in totals.items()
+    ]
+
+
+def refresh_poi_summaries(*poi_ids):
+    """Recompute and upsert the summaries of these POIs (one read and one write per batch)."""
+    ids = sorted({poi_id for poi_id in poi_ids if poi_id is not None})
+    for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+        POISummary.objects.bulk_create(
+            compute_summaries(ids[start:start + REFRESH_BATCH_SIZE]),
+            update_conflicts=True,
+            update_fields=SUMMARY_FIELDS,
+        )
+
+
+def median(prices):
+    """Median of sorted Decimals, rounded to cents like local_price."""
+    middle = len(prices) // 2
+    if len(prices) % 2:
+        return prices[middle]
+    return ((prices[middle - 1] + prices[middle]) / 2).quantize(Decimal('0.01'))
+
+
+def compute_price_stats(item_ids):
+    """Unsaved ItemPriceStats rows for item_ids from one query over their priced POIItems."""
+    prices = {item_id: [] for item_id in item_ids}
+    rows = (
+        POIItem.objects.filter(item_id__in=item_ids, local_price__isnull=False)
+        .order_by('item_id', 'local_price')
+        .values_list('item_id', 'local_price')
+    )
+    for item_id, local_price in rows:
+        prices[item_id].append(local_price)
+    return [
+        ItemPriceStats(
+            item_id=item_id,
+            price_count=len(values),
+            min_price=values[0] if values else None,
+            median_price=median(values) if values else None,
+            max_price=values[-1] if values else None,
+        )
+        for item_id, values in prices.items()
+    ]
+
+
+def refresh_item_price_stats(*item_ids):
+    """Recompute and upsert the price statistics of these items (one read and one write per batch)."""
+    ids = sorted({item_id for item_id in item_ids if item_id is not None})
+    for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+        ItemPriceStats.objects.bulk_create(
+            compute_price_stats(ids[start:start + REFRESH_BATCH_SIZE]),
+            update_conflicts=True,
+            update_fields=PRICE_STATS_FIELDS,
+        )
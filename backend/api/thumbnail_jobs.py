@@ -0,0 +1,198 @@
+"""
+Background thumbnail processing.
+
+With THUMBNAIL_ASYNC on, an upload is stored raw in the thumbnail store, a
+ThumbnailJob row is queued and the row's thumbnail_status becomes 'pending'; the
+request returns without decoding the image. `manage.py process_thumbnails`
+claims pending jobs (SELECT ... FOR UPDATE SKIP LOCKED, so several workers can
+share the queue), runs make_thumbnail in a process pool and stores the result
+and its renditions as the row's thumbnail ('ready'), or marks it 'failed' after
+THUMBNAIL_JOB_MAX_ATTEMPTS.
+
+The raw upload holds a ThumbnailBlob reference while its job is open, so
+purge_thumbnails keeps it; a newer upload for the same row supersedes older jobs.
+
+A pool process that dies (e.g. killed for memory) breaks the whole pool: the jobs
+it was running go back to pending without an attempt charged, unless only one job
+was in flight (then that upload is the cause), and process_jobs re-raises
+BrokenProcessPool for the worker to start a new pool.
+"""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import thumbnail_store
+from .models import (
+    POI, Item, ItemRequest, ThumbnailBlob, ThumbnailJob, THUMBNAIL_FAILED, THUMBNAIL_PENDING, THUMBNAIL_READY,
+)
+from .utils import make_thumbnail
+
+TARGET_MODELS = {
+    'item': Item,
+    'poi': POI,
+    'item_request': ItemRequest,
+}
+# A job claimed longer ago than this is assumed lost with its worker and claimed again
+STALE_JOB_TIMEOUT = 600
+
+
+def target_name(instance):
+    for name, model in TARGET_MODELS.items():
+        if isinstance(instance, model):
+            return name
+    raise ValueError(f'{type(instance).__name__} has no thumbnail')
+
+
+def enqueue_thumbnail(instance, raw):
+    """Queue an upload (bytes, or an uploaded file) to become instance's thumbnail; marks it pending."""
+    with transaction.atomic():
+        source_hash = thumbnail_store.put_file(raw) if hasattr(raw, 'read') else thumbnail_store.put(raw)
+        return enqueue_stored_upload(instance, source_hash)
+
+
+def enqueue_stored_upload(instance, source_hash):
+    """Queue an upload already in the thumbnail store for instance; marks it pending."""
+    with transaction.atomic():
+        ThumbnailBlob.objects.acquire(source_hash)
+        job = ThumbnailJob.objects.create(target=target_name(instance), object_id=instance.pk, source_hash=source_hash)
+        if instance.thumbnail_status != THUMBNAIL_PENDING:
+            instance.thumbnail_status = THUMBNAIL_PENDING
+            instance.save(update_fields=['thumbnail_status'])
+    return job
+
+
+def open_job(instance):
+    """The newest pending or processing job of instance (the upload it is waiting for), or None."""
+    return (
+        ThumbnailJob.objects.filter(
+            target=target_name(instance), object_id=instance.pk,
+            status__in=[ThumbnailJob.STATUS_PENDING, ThumbnailJob.STATUS_PROCESSING],
+        )
+        .order_by('-id')
+        .first()
+    )
+
+
+def claim_jobs(limit):
+    """Mark up to limit pending (or stale) jobs as processing and return them."""
+    stale = timezone.now() - timedelta(seconds=STALE_JOB_TIMEOUT)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        pending = list(
+            ThumbnailJob.objects.select_for_update(skip_locked=skip_locked)
+            .filter(status=ThumbnailJob.STATUS_PENDING)
+            .order_by('id')[:limit]
+        )
+        if len(pending) < limit:
+            pending += list(
+                ThumbnailJob.objects.select_for_update(skip_locked=skip_locked)
+                .filter(status=ThumbnailJob.STATUS_PROCESSING, started_at__lt=stale)
+                .order_by('id')[:limit - len(pending)]
+            )
+        now = timezone.now()
+        for job in pending:
+            job.status = ThumbnailJob.STATUS_PROCESSING
+            job.attempts += 1
+            job.started_at = now
+        ThumbnailJob.objects.bulk_update(pending, ['status', 'attempts', 'started_at'])
+    return pending
+
+
+def _close(job, status, error=''):
+    job.status = status
+    job.error = error
+    job.save(update_fields=['status', 'error', 'updated_at'])
+    ThumbnailBlob.objects.release(job.source_hash)
+
+
+def finish_job(job, result=None, error=None, renditions=None, permanent=False):
+    """
+    Store a job's result (and its renditions) as its row's thumbnail, or record the
+    failure: retried until THUMBNAIL_JOB_MAX_ATTEMPTS, or failed at once when permanent.
+    """
+    model = TARGET_MODELS[job.target]
+    with transaction.atomic():
+        superseded = ThumbnailJob.objects.filter(
+            target=job.target, object_id=job.object_id, id__gt=job.id
+        ).exists()
+        instance = model.objects.select_for_update().filter(pk=job.object_id).first()
+        if instance is None or superseded:
+            _close(job, ThumbnailJob.STATUS_DONE, 'Superseded' if instance is not None else 'Row deleted')
+            return
+        if error is not None:
+            if not permanent and job.attempts < settings.THUMBNAIL_JOB_MAX_ATTEMPTS:
+                job.status = ThumbnailJob.STATUS_PENDING
+                job.error = error
+                job.save(update_fields=['status', 'error', 'updated_at'])
+                return
+            _close(job, ThumbnailJob.STATUS_FAILED, error)
+            instance.thumbnail_status = THUMBNAIL_FAILED
+            instance.save(update_fields=['thumbnail_status'])
+            return
+        instance.thumbnail_hash = thumbnail_store.put(result, renditions)
+        instance.thumbnail_status = THUMBNAIL_READY
+        instance.save(update_fields=['thumbnail_hash', 'thumbnail_status'])
+        _close(job, ThumbnailJob.STATUS_DONE)
+
+
+def release_jobs(jobs, error=''):
+    """Return claimed jobs to pending, giving back the attempt claim_jobs charged them."""
+    for job in jobs:
+        job.status = ThumbnailJob.STATUS_PENDING
+        job.attempts = max(job.attempts - 1, 0)
+        job.error = error
+        job.save(update_fields=['status', 'attempts', 'error', 'updated_at'])
+
+
+def _run_inline(fn, *args):
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def process_jobs(jobs, executor=None):
+    """Compress the claimed jobs' uploads (in executor's processes when given) and finish them."""
+    submit = executor.submit if executor is not None else _run_inline
+    # unsubmitted: submit raised (the pool was already broken); crashed: futures that broke
+    running, unsubmitted, crashed = [], [], []
+    for job in jobs:
+        if thumbnail_store.modified_at(job.source_hash) is None:
+            # No retry can bring it back
+            finish_job(job, error='Upload missing from the thumbnail store', permanent=True)
+            continue
+        try:
+            # make_thumbnail only needs PIL, so pool processes never touch Django or the
+            # database; they open the upload from disk instead of receiving its bytes
+            running.append((job, submit(
+                make_thumbnail,
+                thumbnail_store.blob_path(job.source_hash),
+                settings.THUMBNAIL_MAX_PIXELS,
+                settings.THUMBNAIL_MAX_FRAMES,
+            )))
+        except BrokenProcessPool:
+            unsubmitted.append(job)
+    for job, future in running:
+        try:
+            result, renditions = future.result()
+        except BrokenProcessPool:
+            crashed.append(job)
+        except Exception as e:
+            finish_job(job, error=f'{type(e).__name__}: {e}')
+        else:
+            finish_job(job, result=result, renditions=renditions)
+    if unsubmitted or crashed:
+        error = 'Worker process died'
+        if len(running) == 1 and crashed:
+            # The only job in flight broke the pool: charge it, like any other failure
+            finish_job(crashed[0], error=error)
+            crashed = []
+        release_jobs(crashed + unsubmitted, error)
+        raise BrokenProcessPool(f'{error}; {len(crashed) + len(unsubmitted)} other thumbnail jobs requeued')
+    return len(jobs)
@@ -0,0 +1,158 @@
+"""
+Content-addressed thumbnail files.
+
+Every image is written once under THUMBNAIL_STORE_ROOT/<h[:2]>/<h[2:4]>/<h>, where h
+is its SHA-256 (on the media volume in production). Item, POI and ItemRequest rows
+keep only thumbnail_hash, so their queries never carry image bytes, and rows with
+the same image share one file.
+
+ThumbnailBlob (api.models) counts the rows referencing each file; the model save()
+and post_delete hooks move the counts. `manage.py purge_thumbnails` deletes files
+nobody has referenced for a grace period: a file is written before the row that
+references it is saved, so fresh unreferenced files are left alone.
+
+Renditions of a thumbnail (api.utils.make_renditions) sit next to it as
+<h>.<size>.<format> and are deleted with it.
+"""
+import glob
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+
+from .utils import thumbnail_hash
+
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def blob_path(content_hash):
+    """Path of the file holding the image with this SHA-256."""
+    if not HASH_RE.match(content_hash or ''):
+        raise ValueError(f'Invalid thumbnail hash: {content_hash!r}')
+    return os.path.join(settings.THUMBNAIL_STORE_ROOT, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def rendition_path(content_hash, size, fmt):
+    """Path of a rendition (size in px, 'webp' or 'jpeg') of the image with this SHA-256."""
+    return f'{blob_path(content_hash)}.{int(size)}.{fmt}'
+
+
+def _write(path, data):
+    """Write a file atomically (readers never see a partial image)."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def put(data, renditions=None):
+    """Store image bytes (once per content) and their renditions; returns their hash."""
+    data = bytes(data)
+    content_hash = thumbnail_hash(data)
+    path = blob_path(content_hash)
+    for (size, fmt), rendition in (renditions or {}).items():
+        if not os.path.exists(rendition_path(content_hash, size, fmt)):
+            _write(rendition_path(content_hash, size, fmt), rendition)
+    if os.path.exists(path):
+        # Fresh mtime: not purged before the row referencing it is saved
+        os.utime(path)
+    else:
+        _write(path, data)
+    return content_hash
+
+
+def put_file(upload, chunk_size=64 * 1024):
+    """Store an uploaded file (Django UploadedFile or binary file) chunk by chunk; returns its hash."""
+    os.makedirs(settings.THUMBNAIL_STORE_ROOT, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.THUMBNAIL_STORE_ROOT, prefix='.tmp-')
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            upload.seek(0)
+            chunks = upload.chunks(chunk_size) if hasattr(upload, 'chunks') else iter(lambda: upload.read(chunk_size), b'')
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+        content_hash = digest.hexdigest()
+        path = blob_path(content_hash)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return content_hash
+
+
+def put_renditions(content_hash, renditions):
+    """Add renditions of an already stored image."""
+    for (size, fmt), rendition in renditions.items():
+        _write(rendition_path(content_hash, size, fmt), rendition)
+
+
+def read(content_hash):
+    """Image bytes for a hash, or None when the file is missing."""
+    try:
+        with open(blob_path(content_hash), 'rb') as f:
+            return f.read()
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def read_rendition(content_hash, size, fmt):
+    """Rendition bytes, or None when it was never made."""
+    try:
+        with open(rendition_path(content_hash, size, fmt), 'rb') as f:
+            return f.read()
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def size(content_hash):
+    try:
+        return os.path.getsize(blob_path(content_hash))
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def modified_at(content_hash):
+    """mtime of the file (refreshed by put()), or None when it is missing."""
+    try:
+        return os.path.getmtime(blob_path(content_hash))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def delete(content_hash):
+    """Delete an image and its renditions."""
+    try:
+        path = blob_path(content_hash)
+    except ValueError:
+        return
+    for file_path in [path] + glob.glob(glob.escape(path) + '.*'):
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def stored_files():
+    """(hash, mtime) of every stored file."""
+    root = settings.THUMBNAIL_STORE_ROOT
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if HASH_RE.match(name):
+                yield name, os.path.getmtime(os.path.join(directory, name))
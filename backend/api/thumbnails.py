@@ -0,0 +1,141 @@
+"""
+Serving stored thumbnails (api.thumbnail_store) as binary responses with content-hash ETags.
+
+Each thumbnail has renditions (api.utils.RENDITION_SIZES) in WebP and JPEG: ?size=
+picks the smallest one at least that many pixels wide (default the full 400 px),
+and WebP is sent to clients whose Accept header lists image/webp (Vary: Accept).
+"""
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from . import thumbnail_store
+from .utils import FULL_RENDITION, RENDITION_SIZES, image_content_type, make_renditions, webp_supported
+
+# Versioned thumbnail URLs (?v=<hash>) never change content, so caches may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class ThumbnailRenderer(BaseRenderer):
+    """
+    Lets thumbnail actions accept image Accept headers sent by <img> tags.
+    The actions return raw HttpResponses; only error bodies go through render().
+    """
+    media_type = 'image/*'
+    format = 'img'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''
+
+
+THUMBNAIL_RENDERERS = [JSONRenderer, ThumbnailRenderer]
+
+
+def thumbnail_upload_response(view, request):
+    """
+    PUT {id}/thumbnail/: the raw image/* body (or a multipart thumbnail_file part)
+    becomes the object's thumbnail, as a partial update through view's serializer
+    and perform_update. Answers with the updated object.
+    """
+    upload = request.data.get('file') or request.data.get('thumbnail_file')
+    if not upload:
+        raise ValidationError({'thumbnail_file': 'Send the image as an image/* body or a multipart thumbnail_file part.'})
+    serializer = view.get_serializer(view.get_object(), data={'thumbnail_file': upload}, partial=True)
+    serializer.is_valid(raise_exception=True)
+    view.perform_update(serializer)
+    return Response(serializer.data)
+
+
+def thumbnail_url(request, url_name, obj):
+    """Versioned URL of obj's thumbnail endpoint, or None when it has no thumbnail."""
+    if not obj.thumbnail_hash:
+        return None
+    url = f'{reverse(url_name, args=[obj.pk])}?v={obj.thumbnail_hash}'
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def rendition_size(request):
+    """Rendition for ?size= (smallest at least that large, the largest beyond it)."""
+    value = request.GET.get('size')
+    if value in (None, ''):
+        return FULL_RENDITION
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if size <= 0:
+        raise ValidationError({'size': 'Must be a positive integer.'})
+    return next((candidate for candidate in RENDITION_SIZES if candidate >= size), RENDITION_SIZES[-1])
+
+
+def accepts_webp(request):
+    """Whether the Accept header lists image/webp (with a non-zero q)."""
+    for part in request.META.get('HTTP_ACCEPT', '').split(','):
+        media_type, *params = [piece.strip() for piece in part.split(';')]
+        if media_type.lower() != 'image/webp':
+            continue
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def rendition_bytes(content_hash, size, fmt):
+    """
+    Bytes of one rendition. Images stored before renditions existed get theirs made
+    (and stored) on first request; an image that cannot be decoded is served as is.
+    """
+    if size == FULL_RENDITION and fmt == 'jpeg':
+        return thumbnail_store.read(content_hash)
+    data = thumbnail_store.read_rendition(content_hash, size, fmt)
+    if data is None:
+        source = thumbnail_store.read(content_hash)
+        if not source:
+            return None
+        renditions = make_renditions(source)
+        thumbnail_store.put_renditions(content_hash, renditions)
+        data = renditions.get((size, fmt), source)
+    return data
+
+
+def thumbnail_response(request, queryset, pk, public=True):
+    """
+    Raw thumbnail bytes of queryset[pk] with an ETag from thumbnail_hash and the
+    chosen rendition. Conditional requests are answered with 304 before the file is
+    read; URLs carrying the current ?v= hash are marked immutable, unversioned ones
+    must revalidate.
+    """
+    try:
+        content_hash = queryset.filter(pk=pk).values_list('thumbnail_hash', flat=True).first()
+    except (TypeError, ValueError):
+        raise Http404('No thumbnail.')
+    if not content_hash:
+        raise Http404('No thumbnail.')
+    size = rendition_size(request)
+    fmt = 'webp' if webp_supported() and accepts_webp(request) else 'jpeg'
+    # The full-size JPEG is the stored thumbnail and keeps the bare content-hash ETag
+    etag = f'"{content_hash}"' if (size, fmt) == (FULL_RENDITION, 'jpeg') else f'"{content_hash}-{size}.{fmt}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data = rendition_bytes(content_hash, size, fmt)
+        if not data:
+            raise Http404('No thumbnail.')
+        response = HttpResponse(data, content_type=image_content_type(data))
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    visibility = {'public': True} if public else {'private': True}
+    if request.GET.get('v') == content_hash:
+        patch_cache_control(response, max_age=IMMUTABLE_MAX_AGE, immutable=True, **visibility)
+    else:
+        patch_cache_control(response, no_cache=True, **visibility)
+    return response
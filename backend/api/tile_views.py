@@ -0,0 +1,72 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, HttpResponseNotFound
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+
+from .geo import bbox_polygon, lonlat_to_tile, lonlat_to_tile_fraction, tile_bounds
+from .models import POI
+from .mvt import DEFAULT_EXTENT, encode_point_layer, encode_tile
+
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+POI_LAYER = 'pois'
+TILE_MIN_ZOOM = 0
+TILE_MAX_ZOOM = 20
+
+
+def tile_cache_key(z, x, y):
+    return f'mvt:{POI_LAYER}:{z}:{x}:{y}'
+
+
+def tile_cache_keys_for_point(point):
+    """Cache keys of every tile (all served zooms) that contains the point."""
+    keys = []
+    for z in range(TILE_MIN_ZOOM, TILE_MAX_ZOOM + 1):
+        x, y = lonlat_to_tile(point.x, point.y, z)
+        keys.append(tile_cache_key(z, x, y))
+    return keys
+
+
+def build_poi_tile(z, x, y):
+    """Encode the POIs inside tile z/x/y as an MVT layer (id, name, item_count)."""
+    west, south, east, north = tile_bounds(z, x, y)
+    rows = (
+        POI.objects.filter(location__contained=bbox_polygon(west, south, east, north))
+        .annotate(item_count=Coalesce('summary__item_count', 0))
+        .values_list('id', 'name', 'location', 'item_count')
+        .order_by('id')
+    )
+    features = []
+    for poi_id, name, location, item_count in rows:
+        fx, fy = lonlat_to_tile_fraction(location.x, location.y, z)
+        position = ((fx - x) * DEFAULT_EXTENT, (fy - y) * DEFAULT_EXTENT)
+        features.append((poi_id, position, {'name': name, 'item_count': item_count}))
+    return encode_tile([encode_point_layer(POI_LAYER, features)])
+
+
+@require_GET
+def poi_tile(request, z, x, y):
+    """
+    POIs as a Mapbox Vector Tile: GET /api/v1/tiles/pois/{z}/{x}/{y}.mvt
+    Tiles are cached per z/x/y and evicted by api.signals when a POI inside
+    them changes; the ETag is the content hash so proxies can revalidate cheaply.
+    """
+    if not TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return HttpResponseNotFound('Tile out of range.')
+
+    key = tile_cache_key(z, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = build_poi_tile(z, x, y)
+        cache.set(key, tile, settings.POI_TILE_CACHE_TIMEOUT)
+
+    etag = '"%s"' % hashlib.sha256(tile).hexdigest()[:32]
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.POI_TILE_MAX_AGE)
+    return response
@@ -0,0 +1,85 @@
+"""
+Streaming image uploads.
+
+Multipart parts and raw image/* bodies (PUT {id}/thumbnail/) go through
+CappedTemporaryFileUploadHandler (FILE_UPLOAD_HANDLERS): the body is written to a
+temporary file chunk by chunk, never held in memory, and the upload is refused
+with 413 as soon as it passes THUMBNAIL_UPLOAD_MAX_BYTES. The thumbnail store
+copies the file (thumbnail_store.put_file) and the image processor opens it from
+disk. The base64 thumbnail_write field still works but is held in memory.
+
+Before an upload is stored, probe_upload reads its header (format, dimensions,
+frame count) and refuses it with 413 past THUMBNAIL_MAX_PIXELS / THUMBNAIL_MAX_FRAMES,
+or 400 when it is not a supported image, so no pixel is ever decoded for it.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import FileUploadParser, MultiPartParser
+
+from .utils import ImageRejected, probe_image
+
+# Room for the other form fields of a multipart request next to the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded file is too large.'
+    default_code = 'upload_too_large'
+
+
+class CappedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Streams every uploaded file to a temporary file, refusing it past THUMBNAIL_UPLOAD_MAX_BYTES."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Refuse before reading when the declared length already cannot fit
+        max_bytes = settings.THUMBNAIL_UPLOAD_MAX_BYTES
+        if content_length and content_length > max_bytes + MULTIPART_OVERHEAD:
+            raise UploadTooLarge(f'Uploaded file is too large (at most {max_bytes} bytes).')
+        return super().handle_raw_input(input_data, META, content_length, boundary, encoding)
+
+    def receive_data_chunk(self, raw_data, start):
+        max_bytes = settings.THUMBNAIL_UPLOAD_MAX_BYTES
+        if start + len(raw_data) > max_bytes:
+            self.file.close()
+            raise UploadTooLarge(f'Uploaded file is too large (at most {max_bytes} bytes).')
+        return super().receive_data_chunk(raw_data, start)
+
+
+class ImageUploadParser(FileUploadParser):
+    """Raw image/* request body as request.data['file'] (no Content-Disposition needed)."""
+    media_type = 'image/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(stream, media_type, parser_context) or 'thumbnail'
+
+
+THUMBNAIL_PARSERS = [ImageUploadParser, MultiPartParser]
+
+
+def upload_path(upload):
+    """Path of an uploaded file on disk, or the file object when it is kept in memory."""
+    if hasattr(upload, 'temporary_file_path'):
+        return upload.temporary_file_path()
+    upload.seek(0)
+    return upload
+
+
+def probe_upload(upload):
+    """
+    Header-only check of an upload (uploaded file or bytes) against the THUMBNAIL_*
+    budgets: UploadTooLarge (413) past them, ValidationError (400) for non-images.
+    """
+    try:
+        return probe_image(
+            upload if isinstance(upload, bytes) else upload_path(upload),
+            max_bytes=settings.THUMBNAIL_UPLOAD_MAX_BYTES,
+            max_pixels=settings.THUMBNAIL_MAX_PIXELS,
+            max_frames=settings.THUMBNAIL_MAX_FRAMES,
+        )
+    except ImageRejected as e:
+        if e.too_large:
+            raise UploadTooLarge(str(e))
+        raise ValidationError(str(e))
@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import POIViewSet, ItemViewSet, ItemRequestViewSet
 from .auth_views import LoginView, RegisterView, UserProfileView, ChangePasswordView
-from .geocode_views import GeocodeSearchView
+from .geocode_views import GeocodeReverseView, GeocodeSearchView
+from .search_views import SearchView
+from .tile_views import poi_tile
 
 router = DefaultRouter()
 router.register(r'pois', POIViewSet, basename='poi')
@@ -12,6 +14,9 @@ router.register(r'item-requests', ItemRequestViewSet, basename='item-request')
 
 urlpatterns = [
     path('geocode/', GeocodeSearchView.as_view(), name='geocode'),
+    path('geocode/reverse/', GeocodeReverseView.as_view(), name='geocode_reverse'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('tiles/pois/<int:z>/<int:x>/<int:y>.mvt', poi_tile, name='poi_tile'),
     path('auth/login/', LoginView.as_view(), name='token_obtain_pair'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/register/', RegisterView.as_view(), name='register'),
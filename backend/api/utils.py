@@ -1,40 +1,220 @@
 """Utilities for the API app."""
+import hashlib
 import io
-from PIL import Image
+import os
+import warnings
+from collections import namedtuple
+
+from PIL import Image, features
 
 # Thumbnail target: keep under ~150 KB to avoid large blobs (e.g. 4 MB uploads)
 MAX_SIZE = (400, 400)
 JPEG_QUALITY = 75
+MIN_JPEG_QUALITY = 15
+QUALITY_STEP = 5
 MAX_BYTES = 150 * 1024
+# Upload budgets checked from the image header before decoding (probe_image);
+# settings.THUMBNAIL_MAX_PIXELS / THUMBNAIL_MAX_FRAMES override them
+MAX_PIXELS = 50_000_000
+MAX_FRAMES = 100
+# Pillow plugins allowed to parse uploads (JPEG includes camera MPO files); others are refused unread
+UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP', 'BMP')
+
+# Renditions made from the thumbnail at upload time: (48) map markers, (160) list
+# cards, (400) full. The 400 px JPEG is the thumbnail itself.
+RENDITION_SIZES = (48, 160, 400)
+FULL_RENDITION = 400
+RENDITION_FORMATS = ('webp', 'jpeg')
+WEBP_QUALITY = 70
+
+
+def thumbnail_hash(data) -> str:
+    """SHA-256 hex digest of thumbnail bytes ('' when there is no thumbnail)."""
+    if not data:
+        return ''
+    return hashlib.sha256(data).hexdigest()
+
+
+def image_content_type(data) -> str:
+    """MIME type of stored thumbnail bytes (JPEG unless the magic bytes say otherwise)."""
+    head = bytes(data[:12])
+    if head.startswith(b'\x89PNG'):
+        return 'image/png'
+    if head.startswith(b'GIF8'):
+        return 'image/gif'
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def _encode_jpeg(img, quality):
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+ImageInfo = namedtuple('ImageInfo', ['format', 'width', 'height', 'frames'])
 
 
-def compress_thumbnail(image_data: bytes) -> bytes:
+class ImageRejected(ValueError):
+    """An upload refused before decoding; too_large tells budget overruns (413) from invalid images (400)."""
+
+    def __init__(self, message, too_large=False):
+        super().__init__(message)
+        self.too_large = too_large
+
+
+def _open_image(source):
     """
-    Compress image for thumbnail storage. Returns JPEG bytes.
-    Reduces resolution and quality to limit blob size (e.g. 80–150 KB).
+    Image.open limited to UPLOAD_FORMATS; only the header is read. Raises
+    ImageRejected for anything else, including Pillow's decompression bomb check.
+    """
+    fp = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            return Image.open(fp, formats=UPLOAD_FORMATS)
+    except Image.DecompressionBombError:
+        raise ImageRejected('Image has too many pixels.', too_large=True)
+    except Exception:
+        raise ImageRejected('Not a JPEG, PNG, GIF, WebP or BMP image.')
+
+
+def _source_size(source) -> int:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    if hasattr(source, 'seek'):
+        size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+        return size
+    return os.path.getsize(source)
+
+
+def _check_image(img, max_pixels, max_frames):
+    width, height = img.size
+    if width < 1 or height < 1:
+        raise ImageRejected('Image has no pixels.')
+    if width * height > max_pixels:
+        raise ImageRejected(
+            f'Image is {width}x{height} pixels; at most {max_pixels} pixels are accepted.', too_large=True
+        )
+    frames = getattr(img, 'n_frames', 1)
+    if frames > max_frames:
+        raise ImageRejected(f'Image has {frames} frames; at most {max_frames} are accepted.', too_large=True)
+    return ImageInfo(img.format, width, height, frames)
+
+
+def probe_image(source, max_bytes=None, max_pixels=MAX_PIXELS, max_frames=MAX_FRAMES) -> ImageInfo:
+    """
+    Format, size and frame count of an image (bytes, path or binary file) read from
+    its header, without decoding pixel data, checked against the byte, pixel and
+    frame budgets. Raises ImageRejected.
+    """
+    if max_bytes is not None:
+        size = _source_size(source)
+        if size > max_bytes:
+            raise ImageRejected(f'Image is {size} bytes; at most {max_bytes} bytes are accepted.', too_large=True)
+    with _open_image(source) as img:
+        return _check_image(img, max_pixels, max_frames)
+
+
+def _read_source(source) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        source.seek(0)
+        return source.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def compress_thumbnail(image_data, max_pixels=MAX_PIXELS, max_frames=MAX_FRAMES) -> bytes:
+    """
+    Compress image for thumbnail storage. Returns JPEG bytes of at most MAX_SIZE.
+    image_data is the image bytes, or a path or binary file to read it from disk
+    (streamed uploads, see api.uploads).
+    The header is checked against the pixel and frame budgets first (ImageRejected
+    with too_large, nothing decoded); JPEGs are then decoded directly at a reduced
+    scale (draft mode, 1/2 to 1/8). Encodes at JPEG_QUALITY; when that exceeds
+    MAX_BYTES, the highest quality that fits is binary-searched (a few encodes
+    instead of one per quality step).
     On failure (invalid image), returns original bytes unchanged.
     """
     try:
-        img = Image.open(io.BytesIO(image_data))
+        source = _open_image(image_data)
+    except ImageRejected as e:
+        if e.too_large:
+            raise
+        return _read_source(image_data)
+
+    with source:
+        _check_image(source, max_pixels, max_frames)
+        # Decode JPEGs straight to the smallest DCT scale still covering MAX_SIZE
+        # (a no-op for other formats)
+        source.draft('RGB', MAX_SIZE)
+        # Decode before the file is closed: an RGB image within MAX_SIZE is
+        # neither converted nor resized, so img is source itself
+        source.load()
+        img = source.convert('RGB') if source.mode != 'RGB' else source
+        # reducing_gap: cheap integer box reduction before the LANCZOS pass
+        img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    out = _encode_jpeg(img, JPEG_QUALITY)
+    if len(out) <= MAX_BYTES:
+        return out
+
+    # Highest quality in MIN_JPEG_QUALITY..JPEG_QUALITY (steps of 5) that fits MAX_BYTES
+    qualities = list(range(MIN_JPEG_QUALITY, JPEG_QUALITY, QUALITY_STEP))
+    lo, hi = 0, len(qualities) - 1
+    best = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = _encode_jpeg(img, qualities[mid])
+        if len(candidate) <= MAX_BYTES:
+            best = candidate
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    # Nothing fits: smallest output
+    return best if best is not None else _encode_jpeg(img, qualities[0])
+
+
+def webp_supported() -> bool:
+    """Whether Pillow was built with WebP (JPEG renditions only otherwise)."""
+    return features.check('webp')
+
+
+def make_renditions(thumbnail: bytes) -> dict:
+    """
+    Smaller and WebP copies of a thumbnail from compress_thumbnail, keyed by
+    (size, format) for every RENDITION_SIZES x RENDITION_FORMATS pair except the
+    full-size JPEG (the thumbnail itself). Empty when it is not a readable image.
+    """
+    try:
+        source = Image.open(io.BytesIO(thumbnail))
+        source.load()
     except Exception:
-        return image_data
+        return {}
+    if source.mode != 'RGB':
+        source = source.convert('RGB')
+    formats = [fmt for fmt in RENDITION_FORMATS if fmt != 'webp' or webp_supported()]
+    renditions = {}
+    for size in RENDITION_SIZES:
+        img = source.copy()
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            if size == FULL_RENDITION and fmt == 'jpeg':
+                continue
+            buf = io.BytesIO()
+            if fmt == 'webp':
+                img.save(buf, format='WEBP', quality=WEBP_QUALITY, method=4)
+            else:
+                img.save(buf, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+            renditions[(size, fmt)] = buf.getvalue()
+    return renditions
 
-    if img.mode in ('RGBA', 'P'):
-        img = img.convert('RGB')
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
 
-    img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
-    buf = io.BytesIO()
-    img.save(buf, format='JPEG', quality=JPEG_QUALITY, optimize=True)
-    out = buf.getvalue()
-
-    # If still too large, reduce quality further
-    quality = JPEG_QUALITY
-    while len(out) > MAX_BYTES and quality > 20:
-        quality -= 10
-        buf = io.BytesIO()
-        img.save(buf, format='JPEG', quality=quality, optimize=True)
-        out = buf.getvalue()
-
-    return out
+def make_thumbnail(image_data, max_pixels=MAX_PIXELS, max_frames=MAX_FRAMES):
+    """compress_thumbnail (bytes, path or file) plus its renditions: (thumbnail bytes, make_renditions dict)."""
+    thumbnail = compress_thumbnail(image_data, max_pixels, max_frames)
+    return thumbnail, make_renditions(thumbnail)
@@ -3,25 +3,54 @@ from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from django.contrib.gis.geos import Point
-from .models import POI, Item, ItemRequest, POIItem
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min
+from django.db.models.functions import Coalesce, Floor
+from .geo import (
+    parse_bbox, bbox_filter, parse_zoom, parse_lat_lng, parse_number, cluster_cell_size,
+    radius_bbox, distance_expression, PointX, PointY,
+)
+from .caching import (
+    ITEMS, POIS, ConditionalListMixin, cached_response, conditional_collection_response, poi_response_key,
+)
+from .models import POI, Item, ItemRequest, POIItem, THUMBNAIL_PENDING
+from .pagination import OptionalCursorPaginationMixin
+from .summaries import lock_items, lock_pois
+from .thumbnail_jobs import enqueue_stored_upload, open_job
+from .thumbnails import THUMBNAIL_RENDERERS, thumbnail_response, thumbnail_upload_response
+from .uploads import THUMBNAIL_PARSERS
 from .serializers import (
-    POISerializer, POIListSerializer, ItemSerializer, ItemRequestSerializer, POIItemSerializer
+    POISerializer, POIListSerializer, POIMarkerSerializer, POINearbySerializer, ItemSerializer,
+    ItemWithPriceStatsSerializer, ItemPriceStatsSerializer, ItemPriceSerializer, ItemRequestSerializer,
+    POIItemSerializer,
 )
 
+# pois/nearby/ limits: radius in metres, number of results
+NEARBY_DEFAULT_RADIUS = 1000
+NEARBY_MAX_RADIUS = 50000
+NEARBY_DEFAULT_LIMIT = 20
+NEARBY_MAX_LIMIT = 100
+# items/{id}/prices/ number of POIs listed
+PRICES_DEFAULT_LIMIT = 20
+PRICES_MAX_LIMIT = 100
 
-class POIViewSet(viewsets.ModelViewSet):
+
+class POIViewSet(ConditionalListMixin, OptionalCursorPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing POI instances.
     """
     queryset = POI.objects.all()
     serializer_class = POISerializer
+    cursor_ordering = ('-created_at', '-id')
+    collections = (POIS,)
+    response_cache_prefix = 'poi-response:list'
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
-        list, retrieve, poi_items: public (view map and POI details).
+        list, retrieve, poi_items, clusters, nearby, thumbnail: public (view map and POI details).
         """
-        if self.action in ['list', 'retrieve', 'poi_items', 'list_all']:
+        if self.action in ['list', 'retrieve', 'poi_items', 'clusters', 'nearby', 'thumbnail', 'list_all']:
             if self.action == 'list_all':
                 permission_classes = [IsAdminUser]
             else:
@@ -30,10 +59,72 @@ class POIViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    def is_markers_view(self):
+        """?view=markers selects the compact map-marker representation on list"""
+        return self.action == 'list' and self.request.query_params.get('view') == 'markers'
+
     def get_serializer_class(self):
+        if self.is_markers_view():
+            return POIMarkerSerializer
         if self.action in ['list', 'list_all']:
             return POIListSerializer
+        if self.action == 'nearby':
+            return POINearbySerializer
         return POISerializer
+
+    def get_queryset(self):
+        """
+        list accepts an optional viewport (?south=&west=&north=&east=) so the map
+        only loads POIs on screen; the filter is served by the spatial index.
+        ?view=markers loads only the columns the marker representation needs.
+        Actions serializing POIs load nested items with one prefetch query (no
+        per-POI queries). Thumbnails are files in api.thumbnail_store, rows only
+        carry their hash.
+        """
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            bbox = parse_bbox(self.request.query_params)
+            if bbox is not None:
+                queryset = queryset.filter(bbox_filter(bbox))
+            queryset = self.filter_by_summary(queryset)
+        if self.is_markers_view():
+            # Never read description text for markers
+            return queryset.only('id', 'name', 'location', 'thumbnail_hash').annotate(
+                item_count=Coalesce('summary__item_count', 0)
+            )
+        if self.action in ['list', 'list_all', 'nearby']:
+            queryset = queryset.select_related('summary')
+        if self.action in ['list', 'list_all', 'nearby', 'retrieve', 'create', 'update', 'partial_update']:
+            queryset = queryset.prefetch_related('items')
+        return queryset
+
+    def filter_by_summary(self, queryset):
+        """
+        list filters answered from the POISummary row (no join over POIItems):
+        ?flavor_type=, ?brand= (exact), ?min_price= / ?max_price= (POIs with a local
+        price in range) and ?min_items=.
+        """
+        params = self.request.query_params
+        flavor_type = params.get('flavor_type')
+        if flavor_type:
+            queryset = queryset.filter(summary__flavor_types__contains=[flavor_type])
+        brand = params.get('brand')
+        if brand:
+            queryset = queryset.filter(summary__brands__contains=[brand])
+        if params.get('min_price'):
+            queryset = queryset.filter(summary__max_price__gte=parse_number(params, 'min_price', min_value=0))
+        if params.get('max_price'):
+            queryset = queryset.filter(summary__min_price__lte=parse_number(params, 'max_price', min_value=0))
+        if params.get('min_items'):
+            queryset = queryset.filter(
+                summary__item_count__gte=parse_number(params, 'min_items', min_value=0, integer=True)
+            )
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        """Served from the response cache; evicted by api.signals when the POI or its items change"""
+        key = poi_response_key(request, kwargs[self.lookup_field], 'retrieve')
+        return cached_response(request, key, lambda: super(POIViewSet, self).retrieve(request, *args, **kwargs))
     
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def list_all(self, request):
@@ -42,6 +133,65 @@ class POIViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(pois, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Grid clusters for zoomed-out map views (?south=&west=&north=&east=&zoom=).
+        Aggregated in one GROUP BY query, so the payload grows with the number of
+        screen cells, not with the number of POIs in the viewport.
+        Revalidates like list (ETag / Last-Modified from the POI collection version).
+        """
+        bbox = parse_bbox(request.query_params, required=True)
+        zoom = parse_zoom(request.query_params)
+        cell = cluster_cell_size(zoom)
+
+        def build_response():
+            buckets = (
+                POI.objects.filter(bbox_filter(bbox))
+                .annotate(lng=PointX('location'), lat=PointY('location'))
+                .annotate(cell_x=Floor(F('lng') / cell), cell_y=Floor(F('lat') / cell))
+                .values('cell_x', 'cell_y')
+                .annotate(count=Count('id'), latitude=Avg('lat'), longitude=Avg('lng'), poi_id=Min('id'))
+                .order_by('cell_y', 'cell_x')
+            )
+            clusters = [
+                {
+                    'count': b['count'],
+                    'latitude': b['latitude'],
+                    'longitude': b['longitude'],
+                    'poi_id': b['poi_id'],
+                }
+                for b in buckets
+            ]
+            return Response({'zoom': zoom, 'cell_size': cell, 'clusters': clusters})
+
+        return conditional_collection_response(request, self.collections, build_response)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        POIs closest to a point (?lat=&lng=&radius=&limit=), nearest first, with distance_m.
+        The radius box is filtered through the spatial index and only those
+        candidates are ordered by great-circle distance in the database.
+        """
+        lat, lng = parse_lat_lng(request.query_params)
+        radius = parse_number(
+            request.query_params, 'radius', default=NEARBY_DEFAULT_RADIUS, min_value=1, max_value=NEARBY_MAX_RADIUS
+        )
+        limit = parse_number(
+            request.query_params, 'limit', default=NEARBY_DEFAULT_LIMIT, min_value=1, max_value=NEARBY_MAX_LIMIT,
+            integer=True,
+        )
+        pois = (
+            self.get_queryset()
+            .filter(bbox_filter(radius_bbox(lat, lng, radius)))
+            .annotate(distance_m=distance_expression(lat, lng))
+            .filter(distance_m__lte=radius)
+            .order_by('distance_m', 'id')[:limit]
+        )
+        serializer = self.get_serializer(pois, many=True)
+        return Response(serializer.data)
+
     def perform_create(self, serializer):
         # Convert latitude/longitude to Point if provided
         data = self.request.data
@@ -73,10 +223,10 @@ class POIViewSet(viewsets.ModelViewSet):
     def get_object(self):
         """Override to check permissions for update/delete"""
         obj = super().get_object()
-        if self.action in ['update', 'partial_update', 'destroy']:
+        if self.action in ['update', 'partial_update', 'upload_thumbnail', 'destroy']:
             user = self.request.user
             # Only admins or the POI creator can edit/delete
-            if not user.is_staff and obj.created_by != user:
+            if not user.is_staff and obj.created_by_id != user.id:
                 from rest_framework.exceptions import PermissionDenied
                 raise PermissionDenied("You do not have permission to edit this POI.")
         return obj
@@ -98,22 +248,42 @@ class POIViewSet(viewsets.ModelViewSet):
         # Use POIItem directly to get assigned item IDs (more explicit and reliable)
         assigned_item_ids = POIItem.objects.filter(poi=poi).values_list('item_id', flat=True)
         available_items = Item.objects.exclude(id__in=assigned_item_ids)
-        serializer = ItemSerializer(available_items, many=True)
+        serializer = ItemSerializer(available_items, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def poi_items(self, request, pk=None):
-        """Get all items assigned to this POI with full relationship details"""
-        poi = self.get_object()
-        poi_items = POIItem.objects.filter(poi=poi).select_related('item', 'relationship_created_by')
-        serializer = POIItemSerializer(poi_items, many=True)
-        return Response(serializer.data)
+        """Get all items assigned to this POI with full relationship details (response cached like retrieve)"""
+        def build_response():
+            poi = self.get_object()
+            poi_items = (
+                POIItem.objects.filter(poi=poi)
+                .select_related('item', 'relationship_created_by')
+            )
+            serializer = POIItemSerializer(poi_items, many=True, context=self.get_serializer_context())
+            return Response(serializer.data)
+
+        return cached_response(request, poi_response_key(request, pk, 'poi_items'), build_response)
+
+    @action(detail=True, methods=['get'], renderer_classes=THUMBNAIL_RENDERERS, parser_classes=THUMBNAIL_PARSERS)
+    def thumbnail(self, request, pk=None):
+        """Raw thumbnail image with a content-hash ETag (304 on If-None-Match)"""
+        return thumbnail_response(request, POI.objects.all(), pk)
+
+    @thumbnail.mapping.put
+    def upload_thumbnail(self, request, pk=None):
+        """Replace the thumbnail with a raw image/* body (creator or admin, like update)"""
+        return thumbnail_upload_response(self, request)
     
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def assign_item(self, request, pk=None):
-        """Assign an item to a POI with optional local_price"""
-        poi = self.get_object()
+        """Assign an item to a POI with optional local_price (POI summary updated in the same transaction)"""
         item_id = request.data.get('item_id')
+        # Before any read: concurrent assignments to this POI or item refresh its aggregates in turn
+        lock_pois(pk)
+        lock_items(item_id)
+        poi = self.get_object()
         local_price = request.data.get('local_price', None)
         
         if not item_id:
@@ -132,16 +302,19 @@ class POIViewSet(viewsets.ModelViewSet):
                 relationship_created_by=request.user if request.user.is_authenticated else None,
                 local_price=local_price
             )
-            serializer = POIItemSerializer(poi_item)
+            serializer = POIItemSerializer(poi_item, context=self.get_serializer_context())
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Item.DoesNotExist:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
     @action(detail=True, methods=['post'])
+    @transaction.atomic
     def remove_item(self, request, pk=None):
-        """Remove an item from a POI"""
-        poi = self.get_object()
+        """Remove an item from a POI (POI summary updated in the same transaction)"""
         item_id = request.data.get('item_id')
+        lock_pois(pk)
+        lock_items(item_id)
+        poi = self.get_object()
         if item_id:
             try:
                 item = Item.objects.get(pk=item_id)
@@ -152,18 +325,20 @@ class POIViewSet(viewsets.ModelViewSet):
         return Response({'error': 'item_id required'}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(ConditionalListMixin, OptionalCursorPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing Item instances.
     """
     queryset = Item.objects.all()
-    serializer_class = ItemSerializer
+    serializer_class = ItemWithPriceStatsSerializer
+    cursor_ordering = ('name', 'id')
+    collections = (ITEMS,)
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['list', 'retrieve', 'list_all']:
+        if self.action in ['list', 'retrieve', 'thumbnail', 'list_all', 'prices']:
             if self.action == 'list_all':
                 permission_classes = [IsAdminUser]
             else:
@@ -171,6 +346,9 @@ class ItemViewSet(viewsets.ModelViewSet):
         else:
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('price_stats')
     
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def list_all(self, request):
@@ -178,6 +356,41 @@ class ItemViewSet(viewsets.ModelViewSet):
         items = self.get_queryset()
         serializer = self.get_serializer(items, many=True)
         return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def prices(self, request, pk=None):
+        """
+        Where an item is cheapest: its price statistics and the POIs with a local
+        price, cheapest first (?limit=, default 20). Reads the precomputed
+        ItemPriceStats row and the (item, local_price) index.
+        """
+        item = self.get_object()
+        limit = parse_number(
+            request.query_params, 'limit', default=PRICES_DEFAULT_LIMIT, min_value=1, max_value=PRICES_MAX_LIMIT,
+            integer=True,
+        )
+        poi_items = (
+            POIItem.objects.filter(item=item, local_price__isnull=False)
+            .select_related('poi')
+            .only('local_price', 'poi__id', 'poi__name', 'poi__location')
+            .order_by('local_price', 'poi_id')[:limit]
+        )
+        stats = getattr(item, 'price_stats', None)
+        return Response({
+            'item_id': item.id,
+            'stats': ItemPriceStatsSerializer(stats).data if stats is not None else None,
+            'pois': ItemPriceSerializer(poi_items, many=True).data,
+        })
+
+    @action(detail=True, methods=['get'], renderer_classes=THUMBNAIL_RENDERERS, parser_classes=THUMBNAIL_PARSERS)
+    def thumbnail(self, request, pk=None):
+        """Raw thumbnail image with a content-hash ETag (304 on If-None-Match)"""
+        return thumbnail_response(request, Item.objects.all(), pk)
+
+    @thumbnail.mapping.put
+    def upload_thumbnail(self, request, pk=None):
+        """Replace the thumbnail with a raw image/* body (admins)"""
+        return thumbnail_upload_response(self, request)
     
     def perform_create(self, serializer):
         user = self.request.user if self.request.user.is_authenticated else None
@@ -185,24 +398,50 @@ class ItemViewSet(viewsets.ModelViewSet):
     
     def perform_update(self, serializer):
         user = self.request.user if self.request.user.is_authenticated else None
-        serializer.save(updated_by=user)
+        self.locked_write(serializer.instance, lambda: serializer.save(updated_by=user))
+
+    def perform_destroy(self, instance):
+        self.locked_write(instance, instance.delete)
+
+    @staticmethod
+    def locked_write(item, write):
+        """
+        Run write() in a transaction holding the locks of the item and of every POI
+        listing it, whose summaries api.signals refreshes. The POIs are read before
+        the transaction, whose snapshot must follow the locks; a POI that listed the
+        item in between was not locked, so the transaction is retried with it.
+        """
+        poi_ids = set(POIItem.objects.filter(item=item).values_list('poi_id', flat=True))
+        while True:
+            with transaction.atomic():
+                lock_pois(*poi_ids)
+                lock_items(item.pk)
+                # Adding the item to a POI locks the item too, so this set is now final
+                listed = set(POIItem.objects.filter(item=item).values_list('poi_id', flat=True))
+                if listed <= poi_ids:
+                    return write()
+            poi_ids |= listed
 
 
-class ItemRequestViewSet(viewsets.ModelViewSet):
+class ItemRequestViewSet(OptionalCursorPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and creating ItemRequest instances.
     """
     queryset = ItemRequest.objects.all()
     serializer_class = ItemRequestSerializer
+    cursor_ordering = ('-created_at', '-id')
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action == 'update' or self.action == 'partial_update':
+        if self.action in ['update', 'partial_update', 'upload_thumbnail']:
             permission_classes = [IsAdminUser]
         elif self.action == 'list_all':
             permission_classes = [IsAdminUser]
+        elif self.action == 'thumbnail':
+            # <img> tags send no JWT; access is checked against the URL's ?v= hash instead
+            permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -211,8 +450,9 @@ class ItemRequestViewSet(viewsets.ModelViewSet):
         """
         Filter queryset: users always see their own requests (even if admin).
         Admins can see all requests via the list_all action.
+        requested_by is joined for requested_by_username; blobs are never read.
         """
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('requested_by')
         if self.request.user.is_authenticated:
             # For admin actions (approve, reject), don't filter - admins need access to all requests
             if self.action in ['approve', 'reject'] and self.request.user.is_staff:
@@ -242,8 +482,12 @@ class ItemRequestViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
     def list_all(self, request):
-        """Admin-only endpoint to list all item requests"""
-        requests = ItemRequest.objects.all()
+        """Admin-only endpoint to list all item requests (?paging=cursor pages it)"""
+        requests = ItemRequest.objects.select_related('requested_by')
+        if self.use_cursor_pagination():
+            page = self.paginate_queryset(requests)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(requests, many=True)
         return Response(serializer.data)
 
@@ -270,13 +514,21 @@ class ItemRequestViewSet(viewsets.ModelViewSet):
             brand=item_request.brand,
             typical_price=item_request.price,
             percentage=item_request.percentage,
-            thumbnail=item_request.thumbnail,
+            # Shares the stored image file (one more reference, no copy)
+            thumbnail_hash=item_request.thumbnail_hash,
             flavor_type=item_request.flavor_type,
             volumen=item_request.volumen or '',
             created_by=item_request.requested_by,
             updated_by=request.user
         )
         
+        # The request's upload may still be queued: the new Item gets its own job for
+        # it, since the running one only fills the request row
+        if item_request.thumbnail_status == THUMBNAIL_PENDING:
+            job = open_job(item_request)
+            if job is not None:
+                enqueue_stored_upload(new_item, job.source_hash)
+        
         # Update the request status
         item_request.status = 'approved'
         item_request.status_changed_by = request.user
@@ -285,6 +537,32 @@ class ItemRequestViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(item_request)
         return Response(serializer.data)
     
+    @action(
+        detail=True, methods=['get'], permission_classes=[AllowAny], renderer_classes=THUMBNAIL_RENDERERS,
+        parser_classes=THUMBNAIL_PARSERS,
+    )
+    def thumbnail(self, request, pk=None):
+        """
+        Raw thumbnail image of a request. Readable by its owner and admins, or by
+        anyone holding the versioned URL (the SHA-256 in ?v= acts as a capability).
+        """
+        queryset = ItemRequest.objects.all()
+        user = request.user
+        if not user.is_staff:
+            version = request.query_params.get('v')
+            if version:
+                queryset = queryset.filter(thumbnail_hash=version)
+            elif user.is_authenticated:
+                queryset = queryset.filter(requested_by=user)
+            else:
+                queryset = queryset.none()
+        return thumbnail_response(request, queryset, pk, public=False)
+
+    @thumbnail.mapping.put
+    def upload_thumbnail(self, request, pk=None):
+        """Replace the thumbnail with a raw image/* body (admins, like update)"""
+        return thumbnail_upload_response(self, request)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def reject(self, request, pk=None):
         """Admin-only action to reject an item request"""
@@ -6,6 +6,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -128,11 +129,68 @@ NOMINATIM_USER_AGENT = env(
     'NOMINATIM_USER_AGENT',
     default='BeerFinder/1.0 (https://github.com/BeerFinder; geocode proxy)',
 )
+NOMINATIM_BASE_URL = env('NOMINATIM_BASE_URL', default='https://nominatim.openstreetmap.org')
+# Upstream calls per second across all workers (policy: at most 1), how long a request
+# may queue for a free slot before getting 429, and the HTTP timeout (seconds).
+NOMINATIM_RATE = env.float('NOMINATIM_RATE', default=1.0)
+NOMINATIM_MAX_WAIT = env.float('NOMINATIM_MAX_WAIT', default=2.0)
+NOMINATIM_TIMEOUT = env.float('NOMINATIM_TIMEOUT', default=6.0)
+# Geocode answers are stored in the database (GeocodeResult) for this many seconds
+GEOCODE_RESULT_TTL = env.int('GEOCODE_RESULT_TTL', default=30 * 24 * 3600)
+
+# Content-addressed thumbnail files (api/thumbnail_store.py), on the media volume
+THUMBNAIL_STORE_ROOT = env('THUMBNAIL_STORE_ROOT', default=os.path.join(BASE_DIR, 'media', 'thumbnails'))
+
+# Uploaded thumbnails are compressed by `manage.py process_thumbnails` instead of in
+# the request (api/thumbnail_jobs.py); failed jobs are retried this many times
+THUMBNAIL_ASYNC = env.bool('THUMBNAIL_ASYNC', default=True)
+THUMBNAIL_JOB_MAX_ATTEMPTS = env.int('THUMBNAIL_JOB_MAX_ATTEMPTS', default=3)
+
+# Uploaded files (multipart parts, raw image/* thumbnail PUTs) are streamed to a
+# temporary file and refused with 413 past this size (api/uploads.py)
+FILE_UPLOAD_HANDLERS = ['api.uploads.CappedTemporaryFileUploadHandler']
+THUMBNAIL_UPLOAD_MAX_BYTES = env.int('THUMBNAIL_UPLOAD_MAX_BYTES', default=10 * 1024 * 1024)
+# Image header budgets checked before any decode (api.uploads.probe_upload): larger
+# uploads get 413, so a small file claiming 20000x20000 pixels is never expanded
+THUMBNAIL_MAX_PIXELS = env.int('THUMBNAIL_MAX_PIXELS', default=50_000_000)
+THUMBNAIL_MAX_FRAMES = env.int('THUMBNAIL_MAX_FRAMES', default=100)
+
+# search/ uses the MariaDB FULLTEXT indexes when true; otherwise (or on other
+# databases) it falls back to case-insensitive substring matching
+SEARCH_FULLTEXT = env.bool('SEARCH_FULLTEXT', default=True)
+
+# Offline place search index built by `manage.py load_gazetteer`; searches it answers
+# never reach Nominatim. Kept on the media volume so it survives deploys.
+GAZETTEER_PATH = env('GAZETTEER_PATH', default=os.path.join(BASE_DIR, 'media', 'gazetteer', 'gazetteer.idx'))
+
+# POI vector tiles (/api/v1/tiles/pois/{z}/{x}/{y}.mvt): server cache lifetime and
+# client/CDN max-age in seconds. Cached tiles are evicted when a POI inside changes.
+POI_TILE_CACHE_TIMEOUT = env.int('POI_TILE_CACHE_TIMEOUT', default=24 * 3600)
+POI_TILE_MAX_AGE = env.int('POI_TILE_MAX_AGE', default=300)
+
+# Cached public POI list/detail responses (api/caching.py): entries are invalidated by
+# signals on every write, the timeout only bounds how long unused pages are kept.
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=3600)
+
+# Cache backend: 'locmem' (per process, default), 'sqlite' (one file shared by all
+# gunicorn workers, no external service) or 'redis' (CACHE_LOCATION=redis://host:6379/0).
+# See api/cache_backends.py; `manage.py cache_stats` shows the hit rate.
+CACHE_BACKEND = env('CACHE_BACKEND', default='locmem')
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'beerfinder-cache'),
+    'sqlite': ('api.cache_backends.SQLiteCache', os.path.join(BASE_DIR, 'cache', 'beerfinder-cache.sqlite3')),
+    'redis': ('api.cache_backends.RespCache', 'redis://localhost:6379/0'),
+}
+if CACHE_BACKEND not in _CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be one of {', '.join(_CACHE_BACKENDS)}")
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'beerfinder-cache',
+        'BACKEND': _CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': env('CACHE_LOCATION', default=_CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('CACHE_MAX_ENTRIES', default=10000),
+        },
     }
 }
 
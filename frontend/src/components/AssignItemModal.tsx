@@ -5,7 +5,7 @@ import POIService from '../services/poiService';
 import { useToast } from '../contexts/ToastContext';
 import { formatPrice } from '../utils/format';
 import { getFlavorLabel } from '../utils/formatFlavor';
-import { DEFAULT_BEER_LOGO_PATH } from '../utils/constants';
+import { DEFAULT_BEER_LOGO_PATH, THUMBNAIL_CARD_SIZE } from '../utils/constants';
 import './AssignItemModal.css';
 
 interface AssignItemModalProps {
@@ -173,7 +173,7 @@ const AssignItemModal: React.FC<AssignItemModalProps> = ({
 
   const getThumbnailUrl = (thumbnail: string | null | undefined): string => {
     if (thumbnail) {
-      return `data:image/png;base64,${thumbnail}`;
+      return `${thumbnail}&size=${THUMBNAIL_CARD_SIZE}`;
     }
     return DEFAULT_BEER_LOGO_PATH;
   };
@@ -309,7 +309,7 @@ const AssignItemModal: React.FC<AssignItemModalProps> = ({
                   >
                     <div className="assign-item-card-thumbnail">
                       <img
-                        src={getThumbnailUrl(item.thumbnail)}
+                        src={getThumbnailUrl(item.thumbnail_url)}
                         alt={item.name}
                         onError={(e) => {
                           (e.target as HTMLImageElement).src = DEFAULT_BEER_LOGO_PATH;
@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useTranslation } from 'react-i18next';
 import { createPortal } from 'react-dom';
+import api from '../utils/axiosConfig';
 import './CreatePOIModal.css';
 
 interface CreatePOIModalProps {
@@ -24,6 +25,7 @@ const CreatePOIModal: React.FC<CreatePOIModalProps> = ({
   const [thumbnail, setThumbnail] = useState<string | undefined>(undefined);
   const [thumbnailFile, setThumbnailFile] = useState<File | null>(null);
   const [isSubmitting, setIsSubmitting] = useState(false);
+  const [address, setAddress] = useState<string | null>(null);
   const nameInputRef = useRef<HTMLInputElement>(null);
 
   useEffect(() => {
@@ -32,6 +34,26 @@ const CreatePOIModal: React.FC<CreatePOIModalProps> = ({
     }
   }, [isOpen]);
 
+  // Address of the dropped pin (reverse geocoded; cached server-side per ~10 m cell)
+  useEffect(() => {
+    if (!isOpen) return;
+    let cancelled = false;
+    setAddress(null);
+    api
+      .get<{ result: { display_name: string } | null }>('/geocode/reverse/', {
+        params: { lat: latitude, lon: longitude },
+      })
+      .then(({ data }) => {
+        if (!cancelled) setAddress(data.result?.display_name || null);
+      })
+      .catch(() => {
+        /* address is optional */
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [isOpen, latitude, longitude]);
+
   useEffect(() => {
     if (!isOpen) {
       setName('');
@@ -198,6 +220,7 @@ const CreatePOIModal: React.FC<CreatePOIModalProps> = ({
               <span className="form-help">
                 Location: {latitude.toFixed(6)}, {longitude.toFixed(6)}
               </span>
+              {address && <span className="form-help">{address}</span>}
             </div>
           </div>
           <div className="modal-footer">
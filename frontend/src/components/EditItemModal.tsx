@@ -353,11 +353,11 @@ const EditItemModal: React.FC<EditItemModalProps> = ({
                     style={{ maxWidth: '200px', maxHeight: '200px', objectFit: 'contain' }}
                   />
                 </div>
-              ) : item?.thumbnail ? (
+              ) : item?.thumbnail_url ? (
                 <div style={{ marginTop: '8px' }}>
                   <span className="form-help">{t('components.editItemModal.currentThumbnail')}</span>
                   <img
-                    src={`data:image/png;base64,${item.thumbnail}`}
+                    src={item.thumbnail_url}
                     alt={t('common.currentThumbnail')}
                     style={{ maxWidth: '200px', maxHeight: '200px', objectFit: 'contain', marginTop: '4px', display: 'block' }}
                   />
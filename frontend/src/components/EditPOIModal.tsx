@@ -219,11 +219,11 @@ const EditPOIModal: React.FC<EditPOIModalProps> = ({
                     style={{ maxWidth: '200px', maxHeight: '200px', objectFit: 'contain' }}
                   />
                 </div>
-              ) : poi?.thumbnail ? (
+              ) : poi?.thumbnail_url ? (
                 <div style={{ marginTop: '8px' }}>
                   <span className="form-help">{t('components.editItemModal.currentThumbnail')}</span>
                   <img
-                    src={`data:image/png;base64,${poi.thumbnail}`}
+                    src={poi.thumbnail_url}
                     alt={t('common.currentThumbnail')}
                     style={{ maxWidth: '200px', maxHeight: '200px', objectFit: 'contain', marginTop: '4px', display: 'block' }}
                   />
@@ -362,7 +362,7 @@ const MapComponent: React.FC = () => {
         ...selectedPOI,
         name,
         description,
-        thumbnail: updatedPOIResponse.thumbnail || selectedPOI.thumbnail,
+        thumbnail_url: updatedPOIResponse.thumbnail_url || selectedPOI.thumbnail_url,
       };
       setPois(pois.map((p) => (p.id === selectedPOI.id ? updatedPOI : p)));
       setIsEditModalOpen(false);
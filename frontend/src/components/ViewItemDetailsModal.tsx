@@ -66,7 +66,7 @@ const ViewItemDetailsModal: React.FC<ViewItemDetailsModalProps> = ({
 
   const getThumbnailUrl = (thumbnail: string | null | undefined): string => {
     if (thumbnail) {
-      return `data:image/png;base64,${thumbnail}`;
+      return thumbnail;
     }
     return DEFAULT_BEER_LOGO_PATH;
   };
@@ -111,10 +111,10 @@ const ViewItemDetailsModal: React.FC<ViewItemDetailsModalProps> = ({
           </div>
         </div>
         <div className="modal-body">
-          {item.thumbnail && (
+          {item.thumbnail_url && (
             <div className="poi-thumbnail-container">
               <img
-                src={getThumbnailUrl(item.thumbnail)}
+                src={getThumbnailUrl(item.thumbnail_url)}
                 alt={item.name}
                 className="poi-thumbnail"
                 onError={(e) => {
@@ -7,7 +7,7 @@ import { getFlavorLabel } from '../utils/formatFlavor';
 import POIService from '../services/poiService';
 import { useToast } from '../contexts/ToastContext';
 import { useAuth } from '../contexts/AuthContext';
-import { DEFAULT_BEER_LOGO_PATH } from '../utils/constants';
+import { DEFAULT_BEER_LOGO_PATH, THUMBNAIL_CARD_SIZE } from '../utils/constants';
 
 interface POIItem {
   id: number;
@@ -100,7 +100,7 @@ const ViewPOIDetailsModal: React.FC<ViewPOIDetailsModalProps> = ({
 
   const getThumbnailUrl = (thumbnail: string | null | undefined): string => {
     if (thumbnail) {
-      return `data:image/png;base64,${thumbnail}`;
+      return `${thumbnail}&size=${THUMBNAIL_CARD_SIZE}`;
     }
     return DEFAULT_BEER_LOGO_PATH;
   };
@@ -143,10 +143,10 @@ const ViewPOIDetailsModal: React.FC<ViewPOIDetailsModalProps> = ({
           </div>
         </div>
         <div className="modal-body">
-          {poi.thumbnail && (
+          {poi.thumbnail_url && (
             <div className="poi-thumbnail-container">
               <img
-                src={`data:image/png;base64,${poi.thumbnail}`}
+                src={poi.thumbnail_url}
                 alt={poi.name}
                 className="poi-thumbnail"
                 onError={(e) => {
@@ -173,7 +173,7 @@ const ViewPOIDetailsModal: React.FC<ViewPOIDetailsModalProps> = ({
                       <li key={poiItem.id} className="poi-item">
                         <div className="poi-item-thumbnail">
                           <img
-                            src={getThumbnailUrl(poiItem.item.thumbnail)}
+                            src={getThumbnailUrl(poiItem.item.thumbnail_url)}
                             alt={poiItem.item.name}
                             onError={(e) => {
                               (e.target as HTMLImageElement).src = DEFAULT_BEER_LOGO_PATH;
@@ -8,7 +8,7 @@ import { getFlavorLabel } from '../utils/formatFlavor';
 import POIService from '../services/poiService';
 import { useAuth } from '../contexts/AuthContext';
 import { useToast } from '../contexts/ToastContext';
-import { DEFAULT_BEER_LOGO_PATH } from '../utils/constants';
+import { DEFAULT_BEER_LOGO_PATH, THUMBNAIL_CARD_SIZE } from '../utils/constants';
 import { haversineDistanceKm, formatDistanceFromKm } from '../utils/geoUtils';
 import AssignItemModal from './AssignItemModal';
 
@@ -202,7 +202,7 @@ const ViewPOIModal: React.FC<ViewPOIModalProps> = ({
 
   const getThumbnailUrl = (thumbnail: string | null | undefined): string => {
     if (thumbnail) {
-      return `data:image/png;base64,${thumbnail}`;
+      return `${thumbnail}&size=${THUMBNAIL_CARD_SIZE}`;
     }
     return DEFAULT_BEER_LOGO_PATH;
   };
@@ -250,10 +250,10 @@ const ViewPOIModal: React.FC<ViewPOIModalProps> = ({
           </div>
         </div>
         <div className="modal-body">
-          {poi.thumbnail && (
+          {poi.thumbnail_url && (
             <div className="poi-thumbnail-container">
               <img
-                src={`data:image/png;base64,${poi.thumbnail}`}
+                src={poi.thumbnail_url}
                 alt={poi.name}
                 className="poi-thumbnail"
                 onError={(e) => {
@@ -300,7 +300,7 @@ const ViewPOIModal: React.FC<ViewPOIModalProps> = ({
                       <li key={poiItem.id} className="poi-item">
                         <div className="poi-item-thumbnail">
                           <img
-                            src={getThumbnailUrl(poiItem.item.thumbnail)}
+                            src={getThumbnailUrl(poiItem.item.thumbnail_url)}
                             alt={poiItem.item.name}
                             onError={(e) => {
                               (e.target as HTMLImageElement).src = DEFAULT_BEER_LOGO_PATH;
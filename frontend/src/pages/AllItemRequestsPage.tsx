@@ -223,12 +223,12 @@ const AllItemRequestsPage: React.FC = () => {
                           <span className="detail-value">{selectedRequest.requested_by_username}</span>
                         </div>
                       )}
-                      {selectedRequest.thumbnail && (
+                      {selectedRequest.thumbnail_url && (
                         <div className="detail-item">
                           <span className="detail-label">{t('pages.allItemRequests.image')}</span>
                           <div className="item-request-thumbnail-container">
                             <img
-                              src={`data:image/png;base64,${selectedRequest.thumbnail}`}
+                              src={selectedRequest.thumbnail_url}
                               alt={selectedRequest.name}
                               className="item-request-thumbnail"
                               onError={(e) => {
@@ -481,12 +481,12 @@ const ItemRequestPage: React.FC = () => {
                           {t(`enums.status.${selectedRequest.status}`)}
                         </span>
                       </div>
-                    {selectedRequest.thumbnail && (
+                    {selectedRequest.thumbnail_url && (
                       <div className="detail-item">
                         <span className="detail-label">{t('pages.itemRequests.image')}</span>
                         <div className="item-request-thumbnail-container">
                           <img
-                            src={`data:image/png;base64,${selectedRequest.thumbnail}`}
+                            src={selectedRequest.thumbnail_url}
                             alt={selectedRequest.name}
                             className="item-request-thumbnail"
                             onError={(e) => {
@@ -10,7 +10,7 @@ import EditItemModal from '../components/EditItemModal';
 import DeleteItemModal from '../components/DeleteItemModal';
 import ItemService from '../services/itemService';
 import { Item } from '../types/poi';
-import { DEFAULT_BEER_LOGO_PATH } from '../utils/constants';
+import { DEFAULT_BEER_LOGO_PATH, THUMBNAIL_CARD_SIZE } from '../utils/constants';
 import { formatPrice } from '../utils/format';
 import { getFlavorLabel } from '../utils/formatFlavor';
 import './ItemsPage.css';
@@ -129,7 +129,7 @@ const ItemsPage: React.FC = () => {
 
   const getThumbnailUrl = (thumbnail: string | null | undefined): string => {
     if (thumbnail) {
-      return `data:image/png;base64,${thumbnail}`;
+      return `${thumbnail}&size=${THUMBNAIL_CARD_SIZE}`;
     }
     return DEFAULT_BEER_LOGO_PATH;
   };
@@ -208,7 +208,7 @@ const ItemsPage: React.FC = () => {
               >
                 <div className="item-card-thumbnail">
                   <img
-                    src={getThumbnailUrl(item.thumbnail)}
+                    src={getThumbnailUrl(item.thumbnail_url)}
                     alt={item.name}
                     onError={(e) => {
                       (e.target as HTMLImageElement).src = DEFAULT_BEER_LOGO_PATH;
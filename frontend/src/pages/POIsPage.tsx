@@ -10,7 +10,7 @@ import EditPOIModal from '../components/EditPOIModal';
 import DeletePOIModal from '../components/DeletePOIModal';
 import POIService from '../services/poiService';
 import { POI } from '../types/poi';
-import { DEFAULT_BEER_LOGO_PATH } from '../utils/constants';
+import { DEFAULT_BEER_LOGO_PATH, THUMBNAIL_CARD_SIZE } from '../utils/constants';
 import './POIsPage.css';
 
 const POIsPage: React.FC = () => {
@@ -139,7 +139,7 @@ const POIsPage: React.FC = () => {
 
   const getThumbnailUrl = (thumbnail: string | null | undefined): string => {
     if (thumbnail) {
-      return `data:image/png;base64,${thumbnail}`;
+      return `${thumbnail}&size=${THUMBNAIL_CARD_SIZE}`;
     }
     return DEFAULT_BEER_LOGO_PATH;
   };
@@ -216,10 +216,10 @@ const POIsPage: React.FC = () => {
                 className={`poi-card ${viewMode === 'grid' ? 'poi-card-grid' : ''}`}
                 onClick={() => handleViewPOI(poi)}
               >
-                {poi.thumbnail && (
+                {poi.thumbnail_url && (
                   <div className="poi-card-thumbnail">
                     <img
-                      src={getThumbnailUrl(poi.thumbnail)}
+                      src={getThumbnailUrl(poi.thumbnail_url)}
                       alt={poi.name}
                       onError={(e) => {
                         (e.target as HTMLImageElement).src = DEFAULT_BEER_LOGO_PATH;
@@ -8,7 +8,7 @@ export interface ItemRequest {
   brand?: string;
   price?: number | null;
   percentage?: number | null;
-  thumbnail?: string | null;
+  thumbnail_url?: string | null;
   flavor_type?: FlavorType;
   volumen?: string;
   requested_by?: number;
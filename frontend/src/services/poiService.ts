@@ -15,10 +15,10 @@ const POIService = {
             ...item.properties,
             latitude: item.geometry.coordinates[1],
             longitude: item.geometry.coordinates[0],
-            thumbnail: item.properties?.thumbnail || null,
+            thumbnail_url: item.properties?.thumbnail_url || null,
           };
         }
-        return { ...item, thumbnail: item.thumbnail || null };
+        return { ...item, thumbnail_url: item.thumbnail_url || null };
       });
     }
     // Handle regular list format (non-paginated)
@@ -32,10 +32,10 @@ const POIService = {
             ...item.properties,
             latitude: item.geometry.coordinates[1],
             longitude: item.geometry.coordinates[0],
-            thumbnail: item.properties?.thumbnail || null,
+            thumbnail_url: item.properties?.thumbnail_url || null,
           };
         }
-        return { ...item, thumbnail: item.thumbnail || null };
+        return { ...item, thumbnail_url: item.thumbnail_url || null };
       });
     }
     return [];
@@ -52,11 +52,11 @@ const POIService = {
         ...geoData.properties,
         latitude: geoData.geometry.coordinates[1],
         longitude: geoData.geometry.coordinates[0],
-        thumbnail: geoData.properties?.thumbnail || null,
+        thumbnail_url: geoData.properties?.thumbnail_url || null,
       };
     }
     // Handle regular format (non-GeoJSON)
-    return { ...response.data, thumbnail: response.data?.thumbnail || null };
+    return { ...response.data, thumbnail_url: response.data?.thumbnail_url || null };
   },
 
   createPOI: async (poiData: CreatePOIDto): Promise<POI> => {
@@ -85,7 +85,7 @@ const POIService = {
         ...geoData.properties,
         latitude: geoData.geometry.coordinates[1],
         longitude: geoData.geometry.coordinates[0],
-        thumbnail: geoData.properties?.thumbnail || null,
+        thumbnail_url: geoData.properties?.thumbnail_url || null,
       };
       // Ensure id is present
       if (poi.id === undefined || poi.id === null) {
@@ -99,7 +99,7 @@ const POIService = {
       console.error('POI created but missing id in response:', response.data);
       throw new Error('POI created but response missing ID');
     }
-    return { ...response.data, thumbnail: response.data?.thumbnail || null };
+    return { ...response.data, thumbnail_url: response.data?.thumbnail_url || null };
   },
 
   updatePOI: async (id: number, poiData: Partial<CreatePOIDto>): Promise<POI> => {
@@ -125,15 +125,15 @@ const POIService = {
         ...geoData.properties,
         latitude: geoData.geometry.coordinates[1],
         longitude: geoData.geometry.coordinates[0],
-        thumbnail: geoData.properties?.thumbnail || null,
+        thumbnail_url: geoData.properties?.thumbnail_url || null,
       };
     }
     // Handle regular format (non-GeoJSON)
     // Ensure id is present
     if (response.data && (response.data.id === undefined || response.data.id === null)) {
-      return { ...response.data, id, thumbnail: response.data?.thumbnail || null };
+      return { ...response.data, id, thumbnail_url: response.data?.thumbnail_url || null };
     }
-    return { ...response.data, thumbnail: response.data?.thumbnail || null };
+    return { ...response.data, thumbnail_url: response.data?.thumbnail_url || null };
   },
 
   deletePOI: async (id: number): Promise<void> => {
@@ -1,10 +1,14 @@
+/** Processing state of an uploaded thumbnail; poll the detail endpoint while 'pending'. */
+export type ThumbnailStatus = '' | 'pending' | 'ready' | 'failed';
+
 export interface POI {
   id: number;
   name: string;
   description: string;
   latitude: number;
   longitude: number;
-  thumbnail?: string | null;
+  thumbnail_url?: string | null;
+  thumbnail_status?: ThumbnailStatus;
   created_at: string;
   updated_at: string;
   created_by?: number;
@@ -51,7 +55,8 @@ export interface Item {
   description: string;
   brand?: string;
   typical_price?: number;
-  thumbnail?: string | null;
+  thumbnail_url?: string | null;
+  thumbnail_status?: ThumbnailStatus;
   flavor_type?: FlavorType;
   percentage?: number;
   volumen?: string;
@@ -6,3 +6,6 @@ export const APP_VERSION = 'Stage 26-0.1.0';
 // Default beer logo path (from Vecteezy - joko sutrisno)
 // Attribution: Logo by joko sutrisno from Vecteezy.com
 export const DEFAULT_BEER_LOGO_PATH = '/images/beer-logo-default.png';
+
+// Thumbnail rendition (px) requested for list cards; the API serves 48, 160 or 400
+export const THUMBNAIL_CARD_SIZE = 160;
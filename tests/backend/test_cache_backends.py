@@ -0,0 +1,232 @@
+"""
+Backend tests for the shared cache backends (SQLite file and Redis protocol)
+"""
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+from api.cache_backends import RespCache, SQLiteCache
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Just enough of RESP2 for RespCache: strings, expiry, counters."""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            self.wfile.write(b'$-1\r\n')
+        elif isinstance(value, int):
+            self.wfile.write(b':%d\r\n' % value)
+        elif isinstance(value, list):
+            self.wfile.write(b'*%d\r\n' % len(value))
+            for item in value:
+                self.reply(item)
+        elif value == 'OK':
+            self.wfile.write(b'+OK\r\n')
+        else:
+            self.wfile.write(b'$%d\r\n%s\r\n' % (len(value), value))
+
+    def live(self, key):
+        data = self.server.data
+        if key in data and data[key][1] is not None and data[key][1] <= time.time():
+            del data[key]
+        return key in data
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name, keys = args[0].decode().upper(), args[1:]
+            if name == 'GET':
+                self.reply(data[keys[0]][0] if self.live(keys[0]) else None)
+            elif name == 'MGET':
+                self.reply([data[k][0] if self.live(k) else None for k in keys])
+            elif name == 'SET':
+                options = [a.decode().upper() for a in args[3:]]
+                if 'NX' in options and self.live(keys[0]):
+                    self.reply(None)
+                    continue
+                expires = None
+                if 'PX' in options:
+                    expires = time.time() + int(options[options.index('PX') + 1]) / 1000
+                data[keys[0]] = [keys[1], expires]
+                self.reply('OK')
+            elif name == 'DEL':
+                self.reply(sum(1 for k in keys if self.live(k) and data.pop(k)))
+            elif name == 'EXISTS':
+                self.reply(sum(1 for k in keys if self.live(k)))
+            elif name == 'INCRBY':
+                value = int(data[keys[0]][0]) if self.live(keys[0]) else 0
+                value += int(keys[1])
+                expires = data[keys[0]][1] if keys[0] in data else None
+                data[keys[0]] = [str(value).encode(), expires]
+                self.reply(value)
+            elif name == 'EVAL':
+                # Only RespCache's INCR_EXISTING_SCRIPT: INCRBY when the key exists, else nil
+                key, delta = args[3], int(args[4])
+                if self.live(key):
+                    data[key][0] = str(int(data[key][0]) + delta).encode()
+                    self.reply(int(data[key][0]))
+                else:
+                    self.reply(None)
+            elif name == 'PEXPIRE':
+                found = self.live(keys[0])
+                if found:
+                    data[keys[0]][1] = time.time() + int(keys[1]) / 1000
+                self.reply(int(found))
+            elif name == 'DBSIZE':
+                self.reply(sum(1 for k in list(data) if self.live(k)))
+            elif name == 'FLUSHDB':
+                data.clear()
+                self.reply('OK')
+            else:
+                self.wfile.write(b'-ERR unknown command\r\n')
+
+
+class CacheBackendTests:
+    """Behaviour both backends must share (mixed into the concrete test cases)"""
+
+    def test_get_set_delete(self):
+        self.cache.set('a', {'results': [1, 2]})
+        self.assertEqual(self.cache.get('a'), {'results': [1, 2]})
+        self.assertTrue(self.cache.delete('a'))
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_expiry(self):
+        self.cache.set('short', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+
+    def test_add_is_exclusive(self):
+        """Test add only stores a missing key (used as a cross-worker lock)"""
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 1)
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_keeps_expiry(self):
+        """Test a counter incremented near its expiry still expires (never recreated without a TTL)"""
+        self.cache.set('hits', 1, 0.2)
+        self.assertEqual(self.cache.incr('hits'), 2)
+        time.sleep(0.3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('hits')
+        self.assertIsNone(self.cache.get('hits'))
+
+    def test_get_many_and_delete_many(self):
+        self.cache.set_many({'x': 1, 'y': 'two'})
+        self.assertEqual(self.cache.get_many(['x', 'y', 'z']), {'x': 1, 'y': 'two'})
+        self.cache.delete_many(['x', 'y'])
+        self.assertEqual(self.cache.get_many(['x', 'y']), {})
+
+    def test_shared_between_instances(self):
+        """Test a second backend instance (another worker) sees the same entries"""
+        self.cache.set('shared', 'value')
+        self.assertEqual(self.other_cache.get('shared'), 'value')
+
+    def test_stats(self):
+        self.cache.reset_stats()
+        self.cache.set('k', 'v')
+        self.cache.get('k')
+        self.other_cache.get('missing')
+        self.other_cache._flush_stats(force=True)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+
+class SQLiteCacheTestCase(CacheBackendTests, SimpleTestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'cache', 'test.sqlite3')
+        params = {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}}
+        self.cache = SQLiteCache(path, params)
+        self.other_cache = SQLiteCache(path, params)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_bounded_lru_eviction(self):
+        """Test the table stays bounded and recently read entries survive"""
+        self.cache.set('keep', 'value')
+        for i in range(30):
+            self.cache._db().execute("UPDATE cache_entry SET accessed = accessed + 1000 WHERE key = ':1:keep'")
+            self.cache.set(f'key{i}', i)
+        self.assertLessEqual(self.cache.get_stats()['entries'], 10)
+        self.assertEqual(self.cache.get('keep'), 'value')
+
+    def test_entry_count_is_maintained_without_scanning(self):
+        """Test the running count used by culling matches the table through writes, deletes and culls"""
+        def count():
+            db = self.cache._db()
+            return db.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0], self.cache._entries(db)
+
+        for i in range(25):
+            self.cache.set(f'key{i % 15}', i)
+        self.cache.delete('key3')
+        self.cache.add('new', 1)
+        actual, counted = count()
+        self.assertEqual(counted, actual)
+        self.cache.clear()
+        self.assertEqual(count(), (0, 0))
+
+    def test_count_seeded_for_existing_file(self):
+        db = self.cache._db()
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        db.executescript('DROP TRIGGER cache_entry_inserted; DROP TRIGGER cache_entry_deleted; DROP TABLE cache_count;')
+        path = os.path.join(self.directory, 'cache', 'test.sqlite3')
+        reopened = SQLiteCache(path, {'OPTIONS': {'MAX_ENTRIES': 10}})
+        self.assertEqual(reopened.get_stats()['entries'], 2)
+
+
+class RespCacheTestCase(CacheBackendTests, SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeRedisHandler)
+        cls.server.daemon_threads = True
+        cls.server.data = {}
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        """Set up test data"""
+        self.server.data.clear()
+        host, port = self.server.server_address
+        self.cache = RespCache(f'redis://{host}:{port}/0', {})
+        self.other_cache = RespCache(f'redis://{host}:{port}/0', {})
+
+    def test_reconnects_after_server_drops_connection(self):
+        self.cache.set('a', 1)
+        self.cache._socket.shutdown(socket.SHUT_RDWR)
+        with self.assertRaises(OSError):
+            self.cache.get('a')
+        self.assertEqual(self.cache.get('a'), 1)
@@ -0,0 +1,69 @@
+"""
+Backend API tests for conditional GET (ETag / Last-Modified) on collections
+"""
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item, POIItem
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), created_by=self.user)
+        self.item = Item.objects.create(name='Beer')
+
+    def test_poi_list_not_modified(self):
+        """Test a matching If-None-Match is answered with 304 and a single query"""
+        response = self.client.get('/api/v1/pois/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/pois/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/v1/items/')
+        response = self.client.get('/api/v1/items/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_query(self):
+        """Test each page / filter has its own ETag"""
+        first = self.client.get('/api/v1/pois/')['ETag']
+        markers = self.client.get('/api/v1/pois/', {'view': 'markers'})['ETag']
+        self.assertNotEqual(first, markers)
+
+    def test_etag_changes_on_write(self):
+        """Test POI, POIItem and Item changes produce a new POI list ETag"""
+        etag = self.client.get('/api/v1/pois/')['ETag']
+        for change in (
+            lambda: POIItem.objects.create(poi=self.poi, item=self.item),
+            lambda: Item.objects.filter(pk=self.item.pk).first().save(),
+            lambda: self.poi.delete(),
+        ):
+            change()
+            response = self.client.get('/api/v1/pois/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+    def test_item_list_ignores_poi_changes(self):
+        etag = self.client.get('/api/v1/items/')['ETag']
+        POI.objects.create(name='Other', location=Point(2.18, 41.39), created_by=self.user)
+        response = self.client.get('/api/v1/items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_clusters_not_modified(self):
+        params = {'south': 41, 'west': 2, 'north': 42, 'east': 3, 'zoom': 10}
+        etag = self.client.get('/api/v1/pois/clusters/', params)['ETag']
+        response = self.client.get('/api/v1/pois/clusters/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
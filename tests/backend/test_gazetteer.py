@@ -0,0 +1,88 @@
+"""
+Backend tests for the offline gazetteer (load_gazetteer command and local search)
+"""
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from api import gazetteer
+
+# geonameid, name, asciiname, alternatenames, lat, lon, feature class, feature code, country,
+# cc2, admin1, admin2, admin3, admin4, population, elevation, dem, timezone, modified
+ROWS = [
+    ('3128760', 'Barcelona', 'Barcelona', 'BCN,Barna', '41.38879', '2.15899', 'P', 'PPLA', 'ES', '', '56', 'B', '', '', '1620343'),
+    ('3648559', 'Barcelona', 'Barcelona', '', '10.13625', '-64.68618', 'P', 'PPLA', 'VE', '', '02', '', '', '', '424795'),
+    ('3128759', 'Barcelonnette', 'Barcelonnette', '', '44.38717', '6.65205', 'P', 'PPLA3', 'FR', '', '93', '', '', '', '2766'),
+    ('3117735', 'Madrid', 'Madrid', '', '40.4165', '-3.70256', 'P', 'PPLC', 'ES', '', '29', 'M', '', '', '3255944'),
+    ('3105976', 'Zaragoza', 'Zaragoza', 'Saragossa', '41.65606', '-0.87734', 'P', 'PPLA2', 'ES', '', '52', 'Z', '', '', '674317'),
+    ('2510769', 'Sevilla', 'Sevilla', 'Seville', '37.38283', '-5.97317', 'P', 'PPLA2', 'ES', '', '51', 'SE', '', '', '703206'),
+    ('6255148', 'Montserrat', 'Montserrat', '', '41.6', '1.8', 'T', 'MT', 'ES', '', '56', '', '', '', '0'),
+    ('3119841', 'A Coruña', 'A Coruna', '', '43.37135', '-8.396', 'P', 'PPLA2', 'ES', '', '58', 'C', '', '', '246056'),
+]
+
+
+class GazetteerTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+        self.directory = tempfile.mkdtemp()
+        source = os.path.join(self.directory, 'cities.txt')
+        with open(source, 'w', encoding='utf-8') as f:
+            for row in ROWS:
+                f.write('\t'.join(row + ('', '', 'Europe/Madrid', '2024-01-01')) + '\n')
+        countries = os.path.join(self.directory, 'countryInfo.txt')
+        with open(countries, 'w', encoding='utf-8') as f:
+            f.write('#ISO\tISO3\tISO-Numeric\tfips\tCountry\n')
+            f.write('ES\tESP\t724\tSP\tSpain\nVE\tVEN\t862\tVE\tVenezuela\nFR\tFRA\t250\tFR\tFrance\n')
+        admin1 = os.path.join(self.directory, 'admin1CodesASCII.txt')
+        with open(admin1, 'w', encoding='utf-8') as f:
+            f.write('ES.56\tCatalonia\tCatalonia\t3336901\n')
+        self.index = os.path.join(self.directory, 'gazetteer', 'test.idx')
+        self.settings_override = override_settings(GAZETTEER_PATH=self.index)
+        self.settings_override.enable()
+        call_command(
+            'load_gazetteer', source, countries=countries, admin1=admin1, alternate_names=True,
+            stdout=open(os.devnull, 'w'),
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory)
+
+    def test_prefix_ranked_by_population(self):
+        results = gazetteer.search('barc')
+        self.assertEqual(
+            [r['display_name'] for r in results],
+            ['Barcelona, Catalonia, Spain', 'Barcelona, Venezuela', 'Barcelonnette, France'],
+        )
+        self.assertAlmostEqual(results[0]['lat'], 41.38879, places=5)
+        self.assertAlmostEqual(results[0]['lon'], 2.15899, places=5)
+
+    def test_accents_alternate_names_and_feature_classes(self):
+        self.assertEqual(gazetteer.search('a coruna')[0]['display_name'], 'A Coruña, Spain')
+        self.assertEqual(gazetteer.search('saragossa')[0]['display_name'], 'Zaragoza, Spain')
+        # Mountains (feature class T) are not indexed
+        self.assertEqual(gazetteer.search('montserrat'), [])
+
+    def test_extra_words_filter_on_region_and_country(self):
+        results = gazetteer.search('barcelona venez')
+        self.assertEqual([r['display_name'] for r in results], ['Barcelona, Venezuela'])
+
+    @patch('api.geocoder.urllib.request.urlopen')
+    def test_view_answers_locally(self, mock_urlopen):
+        """Test a gazetteer hit never calls Nominatim"""
+        response = self.client.get('/api/v1/geocode/', {'q': 'Sevilla'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['display_name'], 'Sevilla, Spain')
+        mock_urlopen.assert_not_called()
+
+    @patch('api.geocode_views.lookup', return_value={'results': [], 'complete': True})
+    def test_view_falls_back_to_nominatim(self, mock_lookup):
+        self.client.get('/api/v1/geocode/', {'q': 'Carrer de Mallorca 401'})
+        mock_lookup.assert_called_once()
@@ -1,14 +1,44 @@
 """Tests for Nominatim geocode proxy."""
+import http.server
 import io
 import json
+import threading
+import time
+import urllib.parse
 from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
 from rest_framework.test import APIClient
 
 
+class FakeNominatimHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append((time.monotonic(), self.path))
+        time.sleep(self.server.delay)
+        if self.path.startswith('/reverse'):
+            params = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            payload = {
+                'lat': params['lat'][0], 'lon': params['lon'][0],
+                'display_name': 'Carrer de Mallorca, Eixample, Barcelona',
+            }
+        else:
+            payload = [{'lat': '41.3874', 'lon': '2.1686', 'display_name': 'Barcelona, Catalunya, España'}]
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
 class GeocodeAPITests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_short_query_returns_empty(self):
@@ -16,7 +46,7 @@ class GeocodeAPITests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data['results'], [])
 
-    @patch('api.geocode_views.urllib.request.urlopen')
+    @patch('api.geocoder.urllib.request.urlopen')
     def test_proxies_nominatim_json(self, mock_urlopen):
         body = json.dumps(
             [{'lat': '40.4168', 'lon': '-3.7038', 'display_name': 'Madrid, Spain'}]
@@ -32,3 +62,115 @@ class GeocodeAPITests(TestCase):
         self.assertAlmostEqual(response.data['results'][0]['lat'], 40.4168, places=4)
         self.assertAlmostEqual(response.data['results'][0]['lon'], -3.7038, places=4)
         self.assertIn('Madrid', response.data['results'][0]['display_name'])
+
+
+class GeocodeUpstreamProtectionTests(TransactionTestCase):
+    """
+    Caching, coalescing and rate limiting against a local fake Nominatim server.
+    Requests run in threads with their own connections, so stored results are
+    committed and flushed between tests (TransactionTestCase).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FakeNominatimHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host, port = cls.server.server_address
+        cls.settings_override = override_settings(NOMINATIM_BASE_URL=f'http://{host}:{port}')
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.hits = []
+        self.server.delay = 0
+
+    def get(self, q):
+        return APIClient().get('/api/v1/geocode/', {'q': q})
+
+    def get_concurrently(self, queries):
+        responses = []
+
+        def get(q):
+            try:
+                responses.append(APIClient().get('/api/v1/geocode/', {'q': q}))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=get, args=(q,)) for q in queries]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    @override_settings(NOMINATIM_RATE=10)
+    def test_identical_misses_share_one_upstream_call(self):
+        self.server.delay = 0.3
+        responses = self.get_concurrently(['Barcelona'] * 6)
+        self.assertEqual([r.status_code for r in responses], [200] * 6)
+        self.assertEqual(len(self.server.hits), 1)
+        self.assertEqual(responses[0].data['results'][0]['display_name'], 'Barcelona, Catalunya, España')
+
+    @override_settings(NOMINATIM_RATE=5, NOMINATIM_MAX_WAIT=2)
+    def test_upstream_calls_are_spaced(self):
+        """Test distinct queries queue for slots at most NOMINATIM_RATE per second"""
+        responses = self.get_concurrently(['Girona', 'Tarragona', 'Lleida'])
+        self.assertEqual([r.status_code for r in responses], [200] * 3)
+        times = sorted(t for t, _ in self.server.hits)
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        self.assertTrue(all(gap >= 0.15 for gap in gaps), gaps)
+
+    @override_settings(NOMINATIM_RATE=1, NOMINATIM_MAX_WAIT=0)
+    def test_sheds_with_429_when_queue_is_full(self):
+        responses = self.get_concurrently(['Sabadell', 'Terrassa', 'Badalona'])
+        statuses = sorted(r.status_code for r in responses)
+        self.assertEqual(statuses, [200, 429, 429])
+        shed = [r for r in responses if r.status_code == 429][0]
+        self.assertIn('Retry-After', shed)
+        self.assertEqual(len(self.server.hits), 1)
+
+    @override_settings(NOMINATIM_RATE=20)
+    def test_normalized_queries_share_cache(self):
+        """Test case, accents and whitespace variants are one cache entry"""
+        for q in ('Barcelona', 'barcelona ', 'BARCELÓNA', '  barcelona'):
+            self.assertEqual(self.get(q).status_code, 200)
+        self.assertEqual(len(self.server.hits), 1)
+
+    @override_settings(NOMINATIM_RATE=20)
+    def test_longer_query_answered_from_complete_prefix(self):
+        """Test added words filter a cached complete result set without an upstream call"""
+        self.get('Barcelona')
+        response = self.get('barcelona catal')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(len(self.server.hits), 1)
+
+        # Nothing cached matches: ask upstream rather than answer with an empty list
+        self.get('barcelona gracia')
+        self.assertEqual(len(self.server.hits), 2)
+
+    @override_settings(NOMINATIM_RATE=20)
+    def test_reverse_buckets_nearby_clicks(self):
+        """Test clicks a few metres apart share one upstream call, distant ones do not"""
+        first = APIClient().get('/api/v1/geocode/reverse/', {'lat': 41.39500, 'lon': 2.16100})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['result']['display_name'], 'Carrer de Mallorca, Eixample, Barcelona')
+        near = APIClient().get('/api/v1/geocode/reverse/', {'lat': 41.39502, 'lon': 2.16101})
+        self.assertEqual(near.data, first.data)
+        self.assertEqual(len(self.server.hits), 1)
+
+        APIClient().get('/api/v1/geocode/reverse/', {'lat': 41.39550, 'lon': 2.16100})
+        self.assertEqual(len(self.server.hits), 2)
+
+    def test_reverse_requires_valid_coordinates(self):
+        response = APIClient().get('/api/v1/geocode/reverse/', {'lat': 95, 'lon': 2.16})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.hits, [])
@@ -0,0 +1,75 @@
+"""
+Backend tests for the persistent geocode result store and cache warm-up
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from api.geocoder import HIT_FLUSH_EVERY, result_cache_key
+from api.models import GeocodeResult
+
+MADRID = {'results': [{'lat': 40.4168, 'lon': -3.7038, 'display_name': 'Madrid, España'}], 'complete': True}
+
+
+class GeocodeStoreTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+
+    def store(self, key, payload=MADRID, hits=0, expires_in=3600):
+        return GeocodeResult.objects.create(
+            kind=GeocodeResult.KIND_SEARCH,
+            key=key,
+            payload=payload,
+            hits=hits,
+            expires_at=timezone.now() + timedelta(seconds=expires_in),
+        )
+
+    @patch('api.geocode_views.search', return_value=MADRID)
+    def test_result_is_stored_and_survives_cache_loss(self, mock_search):
+        """Test a stored result is served without upstream after the cache is cleared"""
+        response = self.client.get('/api/v1/geocode/', {'q': 'Madrid'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stored = GeocodeResult.objects.get(kind=GeocodeResult.KIND_SEARCH, key='madrid')
+        self.assertEqual(stored.payload, MADRID)
+        self.assertGreater(stored.expires_at, timezone.now())
+
+        cache.clear()
+        response = self.client.get('/api/v1/geocode/', {'q': 'madrid'})
+        self.assertEqual(response.data['results'], MADRID['results'])
+        mock_search.assert_called_once()
+
+    @patch('api.geocode_views.search', return_value=MADRID)
+    def test_expired_result_is_refetched(self, mock_search):
+        self.store('madrid', payload={'results': [], 'complete': True}, expires_in=-1)
+        response = self.client.get('/api/v1/geocode/', {'q': 'Madrid'})
+        self.assertEqual(response.data['results'], MADRID['results'])
+        mock_search.assert_called_once()
+        self.assertEqual(GeocodeResult.objects.get(key='madrid').payload, MADRID)
+
+    def test_hits_are_counted_in_batches(self):
+        self.store('madrid')
+        for _ in range(HIT_FLUSH_EVERY):
+            self.client.get('/api/v1/geocode/', {'q': 'Madrid'})
+        self.assertEqual(GeocodeResult.objects.get(key='madrid').hits, HIT_FLUSH_EVERY)
+
+    def test_warm_command_preloads_most_requested(self):
+        self.store('madrid', hits=50)
+        self.store('girona', hits=5)
+        self.store('lleida', hits=1)
+        self.store('expired', hits=100, expires_in=-1)
+        out = StringIO()
+        call_command('warm_geocode_cache', '--top', '2', '--purge-expired', stdout=out)
+
+        self.assertEqual(cache.get(result_cache_key(GeocodeResult.KIND_SEARCH, 'madrid')), MADRID)
+        self.assertIsNotNone(cache.get(result_cache_key(GeocodeResult.KIND_SEARCH, 'girona')))
+        self.assertIsNone(cache.get(result_cache_key(GeocodeResult.KIND_SEARCH, 'lleida')))
+        self.assertFalse(GeocodeResult.objects.filter(key='expired').exists())
+        self.assertIn('Preloaded 2', out.getvalue())
@@ -0,0 +1,96 @@
+"""
+Backend API tests for per-item price statistics across POIs
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item, ItemPriceStats, POIItem
+
+
+class ItemPriceStatsTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.item = Item.objects.create(name='IPA', brand='Moritz')
+        self.pois = [
+            POI.objects.create(name=f'Bar {i}', location=Point(2.17 + i * 0.01, 41.38)) for i in range(4)
+        ]
+
+    def stats(self):
+        return ItemPriceStats.objects.get(item=self.item)
+
+    def price(self, poi, local_price):
+        return POIItem.objects.create(poi=poi, item=self.item, local_price=local_price)
+
+    def test_new_item_has_empty_stats(self):
+        stats = self.stats()
+        self.assertEqual(stats.price_count, 0)
+        self.assertIsNone(stats.median_price)
+
+    def test_stats_follow_poi_item_writes(self):
+        self.price(self.pois[0], Decimal('4.00'))
+        self.price(self.pois[1], Decimal('2.50'))
+        self.price(self.pois[2], Decimal('3.00'))
+        POIItem.objects.create(poi=self.pois[3], item=self.item)  # no local price
+        stats = self.stats()
+        self.assertEqual(stats.price_count, 3)
+        self.assertEqual(
+            (stats.min_price, stats.median_price, stats.max_price),
+            (Decimal('2.50'), Decimal('3.00'), Decimal('4.00')),
+        )
+
+        POIItem.objects.filter(poi=self.pois[2]).delete()
+        stats = self.stats()
+        self.assertEqual(stats.price_count, 2)
+        self.assertEqual(stats.median_price, Decimal('3.25'))
+
+        # Deleting a POI removes its prices
+        self.pois[1].delete()
+        self.assertEqual(self.stats().min_price, Decimal('4.00'))
+
+    def test_item_delete_removes_stats(self):
+        self.price(self.pois[0], Decimal('4.00'))
+        self.item.delete()
+        self.assertFalse(ItemPriceStats.objects.exists())
+
+    def test_prices_endpoint_lists_cheapest_first(self):
+        self.price(self.pois[0], Decimal('4.00'))
+        self.price(self.pois[1], Decimal('2.50'))
+        self.price(self.pois[2], Decimal('3.00'))
+        response = self.client.get(f'/api/v1/items/{self.item.id}/prices/', {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stats']['price_count'], 3)
+        self.assertEqual([poi['poi_name'] for poi in response.data['pois']], ['Bar 1', 'Bar 2'])
+        self.assertEqual(response.data['pois'][0]['local_price'], '2.50')
+        self.assertAlmostEqual(response.data['pois'][0]['longitude'], 2.18)
+
+        response = self.client.get(f'/api/v1/items/{self.item.id}/prices/', {'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_item_list_includes_stats(self):
+        self.price(self.pois[0], Decimal('4.00'))
+        response = self.client.get('/api/v1/items/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['price_stats']['max_price'], '4.00')
+
+        # A new price changes the item list's ETag (served from the response cache otherwise)
+        self.price(self.pois[1], Decimal('1.00'))
+        response = self.client.get('/api/v1/items/')
+        self.assertEqual(response.data['results'][0]['price_stats']['min_price'], '1.00')
+
+    def test_rebuild_command(self):
+        self.price(self.pois[0], Decimal('4.00'))
+        ItemPriceStats.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_item_price_stats', stdout=out)
+        self.assertEqual(self.stats().price_count, 1)
+        self.assertIn('1 items', out.getvalue())
@@ -0,0 +1,101 @@
+"""
+Backend API tests for keyset (cursor) pagination
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item, ItemRequest
+
+
+class CursorPaginationTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='adminpass123',
+            is_staff=True
+        )
+        for i in range(12):
+            POI.objects.create(name=f'Bar {i}', location=Point(2.17, 41.38), created_by=self.user)
+            # Duplicate names exercise the id tiebreak
+            Item.objects.create(name=f'Beer {i // 3}')
+            ItemRequest.objects.create(name=f'Request {i}', requested_by=self.user)
+        # Identical timestamps exercise the id tiebreak
+        POI.objects.update(created_at=POI.objects.first().created_at)
+
+    def walk(self, url):
+        """Follow next links and return the ids seen, in order"""
+        ids, url = [], f'{url}?paging=cursor&page_size=5'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            results = response.data['results']
+            if 'features' in results:
+                results = results['features']
+            self.assertLessEqual(len(results), 5)
+            ids.extend(row['id'] for row in results)
+            url = response.data['next']
+        return ids
+
+    def test_poi_cursor_pages(self):
+        """Test every POI is returned exactly once in (-created_at, -id) order"""
+        ids = self.walk('/api/v1/pois/')
+        self.assertEqual(ids, list(POI.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_item_cursor_pages(self):
+        ids = self.walk('/api/v1/items/')
+        self.assertEqual(ids, list(Item.objects.order_by('name', 'id').values_list('id', flat=True)))
+
+    def test_item_request_list_all_cursor_pages(self):
+        self.client.force_authenticate(user=self.admin)
+        ids = self.walk('/api/v1/item-requests/list_all/')
+        self.assertEqual(ids, list(ItemRequest.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_page_number_is_default(self):
+        """Test listings keep page-number pagination unless a cursor is requested"""
+        response = self.client.get('/api/v1/items/')
+        self.assertEqual(response.data['count'], 12)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/v1/item-requests/list_all/')
+        self.assertEqual(len(response.data), 12)
+
+    def test_deep_page_has_no_count_query(self):
+        """Test a later page costs the collection version lookup plus one query, like the first"""
+        first = self.client.get('/api/v1/items/?paging=cursor&page_size=5')
+        second = first.data['next']
+        with self.assertNumQueries(2):
+            self.client.get(second)
+
+    def test_identical_names_page_by_id(self):
+        """Test runs of equal keys longer than a page are sought by (name, id), never skipped with OFFSET"""
+        for _ in range(12):
+            Item.objects.create(name='Beer 1')
+        expected = list(Item.objects.order_by('name', 'id').values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            ids = self.walk('/api/v1/items/')
+        self.assertEqual(ids, expected)
+        self.assertFalse([q['sql'] for q in queries if 'OFFSET' in q['sql'].upper()])
+
+    def test_previous_link_returns_the_previous_page(self):
+        first = self.client.get('/api/v1/items/?paging=cursor&page_size=5')
+        second = self.client.get(first.data['next'])
+        self.assertIsNone(first.data['previous'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual([row['id'] for row in back.data['results']], [row['id'] for row in first.data['results']])
+        self.assertEqual(back.data['next'], first.data['next'])
+
+    def test_invalid_cursor_is_not_found(self):
+        # 'r=x', and 'p=Beer': one value for a two-field ordering
+        for cursor in ('cj14', 'cD1CZWVy'):
+            response = self.client.get(f'/api/v1/items/?cursor={cursor}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
@@ -6,7 +6,7 @@ from django.contrib.auth.models import User
 from django.contrib.gis.geos import Point
 from rest_framework.test import APIClient
 from rest_framework import status
-from api.models import POI, Item
+from api.models import POI, Item, POIItem
 
 
 class POIAPITestCase(TestCase):
@@ -85,3 +85,83 @@ class POIAPITestCase(TestCase):
         response = self.client.delete(f'/api/v1/pois/{poi.id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(POI.objects.count(), 0)
+
+    def test_list_pois_in_bbox(self):
+        """Test listing only POIs inside the map viewport"""
+        POI.objects.create(name='Inside', location=Point(2.17, 41.38), created_by=self.user)
+        POI.objects.create(name='Outside', location=Point(-3.70, 40.41), created_by=self.user)
+        response = self.client.get('/api/v1/pois/', {
+            'south': 41.0, 'west': 2.0, 'north': 41.5, 'east': 2.5,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['name'] for p in response.data['results']], ['Inside'])
+
+    def test_list_pois_invalid_bbox(self):
+        """Test partial or out-of-range viewports are rejected"""
+        response = self.client.get('/api/v1/pois/', {'south': 41.0, 'west': 2.0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('north', response.data)
+        response = self.client.get('/api/v1/pois/', {
+            'south': 41.0, 'west': 2.0, 'north': 95, 'east': 'abc',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('east', response.data)
+
+    def test_clusters(self):
+        """Test POIs are aggregated into grid clusters for zoomed-out views"""
+        bar1 = POI.objects.create(name='Bar 1', location=Point(2.17, 41.38), created_by=self.user)
+        POI.objects.create(name='Bar 2', location=Point(2.18, 41.39), created_by=self.user)
+        POI.objects.create(name='Madrid', location=Point(-3.70, 40.41), created_by=self.user)
+        response = self.client.get('/api/v1/pois/clusters/', {
+            'south': 35, 'west': -10, 'north': 45, 'east': 10, 'zoom': 5,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        clusters = sorted(response.data['clusters'], key=lambda c: c['count'])
+        self.assertEqual([c['count'] for c in clusters], [1, 2])
+        self.assertEqual(clusters[1]['poi_id'], bar1.id)
+        self.assertAlmostEqual(clusters[1]['latitude'], 41.385, places=3)
+
+    def test_clusters_requires_zoom(self):
+        """Test clusters endpoint validates its zoom parameter"""
+        response = self.client.get('/api/v1/pois/clusters/', {
+            'south': 35, 'west': -10, 'north': 45, 'east': 10,
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('zoom', response.data)
+
+    def test_nearby_pois(self):
+        """Test nearby search returns POIs within the radius ordered by distance"""
+        POI.objects.create(name='Far', location=Point(2.1800, 41.3800), created_by=self.user)
+        POI.objects.create(name='Near', location=Point(2.1705, 41.3800), created_by=self.user)
+        POI.objects.create(name='Madrid', location=Point(-3.70, 40.41), created_by=self.user)
+        response = self.client.get('/api/v1/pois/nearby/', {
+            'lat': 41.38, 'lng': 2.17, 'radius': 2000,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['name'] for p in response.data], ['Near', 'Far'])
+        self.assertAlmostEqual(response.data[0]['distance_m'], 42, delta=2)
+
+        response = self.client.get('/api/v1/pois/nearby/', {'lat': 41.38, 'lng': 2.17, 'limit': 1})
+        self.assertEqual([p['name'] for p in response.data], ['Near'])
+
+    def test_nearby_requires_coordinates(self):
+        """Test nearby search validates lat/lng"""
+        response = self.client.get('/api/v1/pois/nearby/', {'lat': 120, 'lng': 2.17})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('lat', response.data)
+
+    def test_list_pois_markers_view(self):
+        """Test the compact marker representation has no blobs or nested items"""
+        poi = POI.objects.create(
+            name='Bar', location=Point(2.17, 41.38), thumbnail=b'jpeg-bytes', created_by=self.user
+        )
+        POIItem.objects.create(poi=poi, item=Item.objects.create(name='Beer'))
+        response = self.client.get('/api/v1/pois/', {'view': 'markers'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        marker = response.data['results'][0]
+        self.assertEqual(
+            set(marker),
+            {'id', 'name', 'latitude', 'longitude', 'item_count', 'thumbnail_hash', 'thumbnail_url'},
+        )
+        self.assertEqual(marker['item_count'], 1)
+        self.assertEqual(len(marker['thumbnail_hash']), 64)
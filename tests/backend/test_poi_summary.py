@@ -0,0 +1,187 @@
+"""
+Backend API tests for the denormalized POI summaries (item count, prices, flavors, brands)
+"""
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item, ItemPriceStats, POIItem, POISummary
+from api.summaries import compute_price_stats, compute_summaries, lock_pois
+
+
+class POISummaryTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        self.poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), created_by=self.user)
+        self.ipa = Item.objects.create(name='IPA', brand='Moritz', flavor_type='hoppy')
+        self.stout = Item.objects.create(name='Stout', brand='Guinness', flavor_type='roasty')
+
+    def summary(self, poi=None):
+        return POISummary.objects.get(poi=poi or self.poi)
+
+    def assign(self, item, price):
+        self.client.force_authenticate(user=self.user)
+        return self.client.post(
+            f'/api/v1/pois/{self.poi.id}/assign_item/', {'item_id': item.id, 'local_price': price}, format='json'
+        )
+
+    def test_new_poi_has_empty_summary(self):
+        summary = self.summary()
+        self.assertEqual(summary.item_count, 0)
+        self.assertIsNone(summary.min_price)
+        self.assertEqual(summary.flavor_types, [])
+
+    def test_assign_and_remove_update_summary(self):
+        self.assertEqual(self.assign(self.ipa, '3.50').status_code, status.HTTP_201_CREATED)
+        self.assign(self.stout, '5.00')
+        summary = self.summary()
+        self.assertEqual(summary.item_count, 2)
+        self.assertEqual((summary.min_price, summary.max_price), (Decimal('3.50'), Decimal('5.00')))
+        self.assertEqual(summary.flavor_types, ['hoppy', 'roasty'])
+        self.assertEqual(summary.brands, ['Guinness', 'Moritz'])
+
+        response = self.client.post(f'/api/v1/pois/{self.poi.id}/remove_item/', {'item_id': self.stout.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = self.summary()
+        self.assertEqual(summary.item_count, 1)
+        self.assertEqual(summary.max_price, Decimal('3.50'))
+        self.assertEqual(summary.brands, ['Moritz'])
+
+    def test_item_edit_and_delete_update_summary(self):
+        POIItem.objects.create(poi=self.poi, item=self.ipa, local_price=Decimal('4.00'))
+        self.client.force_authenticate(user=self.admin)
+        self.client.patch(f'/api/v1/items/{self.ipa.id}/', {'flavor_type': 'fruity'}, format='json')
+        self.assertEqual(self.summary().flavor_types, ['fruity'])
+
+        self.client.delete(f'/api/v1/items/{self.ipa.id}/')
+        self.assertEqual(self.summary().item_count, 0)
+
+    def test_item_write_locks_a_poi_that_listed_the_item_meanwhile(self):
+        """Test a POI gaining the item between the read and the locks is locked on a retry"""
+        other = POI.objects.create(name='Pub', location=Point(2.18, 41.39), created_by=self.user)
+        POIItem.objects.create(poi=self.poi, item=self.ipa, local_price=Decimal('4.00'))
+
+        def assign_then_lock(*poi_ids):
+            # A concurrent assign_item commits right after the item's POIs were read
+            if not POIItem.objects.filter(poi=other).exists():
+                POIItem.objects.create(poi=other, item=self.ipa, local_price=Decimal('5.00'))
+            return lock_pois(*poi_ids)
+
+        self.client.force_authenticate(user=self.admin)
+        with mock.patch('api.views.lock_pois', side_effect=assign_then_lock) as locked:
+            self.client.patch(f'/api/v1/items/{self.ipa.id}/', {'flavor_type': 'fruity'}, format='json')
+        self.assertEqual([set(call.args) for call in locked.call_args_list], [{self.poi.id}, {self.poi.id, other.id}])
+        self.assertEqual(self.summary(other).flavor_types, ['fruity'])
+
+        POIItem.objects.filter(poi=other).delete()
+        with mock.patch('api.views.lock_pois', side_effect=assign_then_lock) as locked:
+            self.client.delete(f'/api/v1/items/{self.ipa.id}/')
+        self.assertEqual([set(call.args) for call in locked.call_args_list], [{self.poi.id}, {self.poi.id, other.id}])
+        self.assertEqual(self.summary(other).item_count, 0)
+
+    def test_poi_delete_removes_summary(self):
+        POIItem.objects.create(poi=self.poi, item=self.ipa)
+        self.poi.delete()
+        self.assertFalse(POISummary.objects.exists())
+
+    def test_list_exposes_summary_and_filters(self):
+        POIItem.objects.create(poi=self.poi, item=self.ipa, local_price=Decimal('3.00'))
+        other = POI.objects.create(name='Pub', location=Point(2.18, 41.39))
+        POIItem.objects.create(poi=other, item=self.stout, local_price=Decimal('6.00'))
+
+        response = self.client.get('/api/v1/pois/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_name = {poi['name']: poi['summary'] for poi in response.data['results']}
+        self.assertEqual(by_name['Bar']['item_count'], 1)
+        self.assertEqual(by_name['Pub']['flavor_types'], ['roasty'])
+
+        def names(params):
+            return [poi['name'] for poi in self.client.get('/api/v1/pois/', params).data['results']]
+
+        self.assertEqual(names({'flavor_type': 'hoppy'}), ['Bar'])
+        self.assertEqual(names({'brand': 'Guinness'}), ['Pub'])
+        self.assertEqual(names({'max_price': 4}), ['Bar'])
+        self.assertEqual(names({'min_price': 5}), ['Pub'])
+        self.assertEqual(self.client.get('/api/v1/pois/', {'min_price': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command_repairs_summaries(self):
+        POIItem.objects.create(poi=self.poi, item=self.ipa)
+        POISummary.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_poi_summaries', stdout=out)
+        self.assertEqual(self.summary().item_count, 1)
+        self.assertIn('1 POIs', out.getvalue())
+
+
+def slowly(compute):
+    """compute after a pause, so a concurrent request inserts its row before this one reads"""
+    def slow(ids):
+        time.sleep(0.3)
+        return compute(ids)
+    return slow
+
+
+class ConcurrentAssignmentTestCase(TransactionTestCase):
+    """
+    assign_item requests in threads with their own connections: without the POI and
+    item locks, each would recompute the aggregates without the other's row.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), created_by=self.user)
+        self.ipa = Item.objects.create(name='IPA', brand='Moritz')
+        self.stout = Item.objects.create(name='Stout', brand='Guinness')
+
+    def assign_concurrently(self, assignments):
+        barrier = threading.Barrier(len(assignments))
+        statuses = []
+
+        def assign(poi, item, price):
+            try:
+                client = APIClient()
+                client.force_authenticate(user=self.user)
+                barrier.wait()
+                statuses.append(client.post(
+                    f'/api/v1/pois/{poi.id}/assign_item/', {'item_id': item.id, 'local_price': price}, format='json'
+                ).status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=assign, args=args) for args in assignments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * len(assignments))
+
+    def test_concurrent_assignments_to_one_poi(self):
+        with mock.patch('api.summaries.compute_summaries', side_effect=slowly(compute_summaries)):
+            self.assign_concurrently([(self.poi, self.ipa, '3.00'), (self.poi, self.stout, '5.00')])
+        summary = POISummary.objects.get(poi=self.poi)
+        self.assertEqual(summary.item_count, 2)
+        self.assertEqual((summary.min_price, summary.max_price), (Decimal('3.00'), Decimal('5.00')))
+        self.assertEqual(summary.brands, ['Guinness', 'Moritz'])
+
+    def test_concurrent_assignments_of_one_item(self):
+        other = POI.objects.create(name='Pub', location=Point(2.18, 41.39), created_by=self.user)
+        with mock.patch('api.summaries.compute_price_stats', side_effect=slowly(compute_price_stats)):
+            self.assign_concurrently([(self.poi, self.ipa, '3.00'), (other, self.ipa, '5.00')])
+        stats = ItemPriceStats.objects.get(item=self.ipa)
+        self.assertEqual(stats.price_count, 2)
+        self.assertEqual((stats.min_price, stats.max_price), (Decimal('3.00'), Decimal('5.00')))
@@ -0,0 +1,153 @@
+"""
+Backend API tests for POI vector tiles (MVT)
+"""
+import struct
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.geo import lonlat_to_tile
+from api.models import POI, Item, POIItem
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_fields(buf):
+    """Yield (field number, value) pairs of a protobuf message."""
+    pos = 0
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        else:
+            raise ValueError(f'Unexpected wire type {wire_type}')
+        yield field, value
+
+
+def _read_packed(buf):
+    values, pos = [], 0
+    while pos < len(buf):
+        value, pos = _read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_tile(data):
+    """Decode a tile into {layer name: [{'id', 'x', 'y', 'properties'}]} (points only)."""
+    layers = {}
+    for field, layer_buf in _read_fields(data):
+        if field != 3:
+            continue
+        name, keys, values, raw_features = None, [], [], []
+        for lfield, lvalue in _read_fields(layer_buf):
+            if lfield == 1:
+                name = lvalue.decode('utf-8')
+            elif lfield == 2:
+                raw_features.append(lvalue)
+            elif lfield == 3:
+                keys.append(lvalue.decode('utf-8'))
+            elif lfield == 4:
+                for vfield, v in _read_fields(lvalue):
+                    if vfield == 1:
+                        values.append(v.decode('utf-8'))
+                    elif vfield == 3:
+                        values.append(struct.unpack('<d', v)[0])
+                    elif vfield == 6:
+                        values.append(_unzigzag(v))
+                    elif vfield == 7:
+                        values.append(bool(v))
+                    else:
+                        values.append(v)
+        features = []
+        for raw in raw_features:
+            feature = {'properties': {}}
+            for ffield, fvalue in _read_fields(raw):
+                if ffield == 1:
+                    feature['id'] = fvalue
+                elif ffield == 2:
+                    tags = _read_packed(fvalue)
+                    for k, v in zip(tags[::2], tags[1::2]):
+                        feature['properties'][keys[k]] = values[v]
+                elif ffield == 4:
+                    _, dx, dy = _read_packed(fvalue)
+                    feature['x'], feature['y'] = _unzigzag(dx), _unzigzag(dy)
+            features.append(feature)
+        layers[name] = features
+    return layers
+
+
+class POITileTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), created_by=self.user)
+        item = Item.objects.create(name='Beer')
+        POIItem.objects.create(poi=self.poi, item=item)
+        self.z = 14
+        self.x, self.y = lonlat_to_tile(2.17, 41.38, self.z)
+
+    def tile_url(self):
+        return f'/api/v1/tiles/pois/{self.z}/{self.x}/{self.y}.mvt'
+
+    def test_tile_contains_poi(self):
+        """Test the tile encodes POI id, name and item count"""
+        response = self.client.get(self.tile_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        features = decode_tile(response.content)['pois']
+        self.assertEqual(len(features), 1)
+        self.assertEqual(features[0]['id'], self.poi.id)
+        self.assertEqual(features[0]['properties'], {'name': 'Bar', 'item_count': 1})
+        self.assertTrue(0 <= features[0]['x'] <= 4096 and 0 <= features[0]['y'] <= 4096)
+
+    def test_tile_not_modified(self):
+        """Test a matching If-None-Match returns 304"""
+        response = self.client.get(self.tile_url())
+        response = self.client.get(self.tile_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_tile_invalidated_on_poi_change(self):
+        """Test editing or moving a POI evicts the cached tiles"""
+        self.client.get(self.tile_url())
+        self.poi.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poi.save()
+        features = decode_tile(self.client.get(self.tile_url()).content)['pois']
+        self.assertEqual(features[0]['properties']['name'], 'Renamed')
+
+        self.poi.location = Point(-3.70, 40.41)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poi.save()
+        self.assertEqual(decode_tile(self.client.get(self.tile_url()).content)['pois'], [])
+
+    def test_tile_out_of_range(self):
+        """Test tile coordinates outside the zoom level return 404"""
+        response = self.client.get('/api/v1/tiles/pois/2/4/0.mvt')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,77 @@
+"""
+Query-count budgets for list/detail endpoints: the number of queries must not
+grow with the number of rows (no N+1 on nested items or related users).
+"""
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item, ItemRequest, POIItem
+
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.admin = User.objects.create_user(
+            username='admin',
+            password='adminpass123',
+            is_staff=True
+        )
+
+    def create_rows(self, count):
+        items = [Item.objects.create(name=f'Beer {i}', created_by=self.user) for i in range(3)]
+        for i in range(count):
+            poi = POI.objects.create(
+                name=f'Bar {i}', location=Point(2.17 + i * 0.001, 41.38), created_by=self.user
+            )
+            for item in items:
+                POIItem.objects.create(poi=poi, item=item, relationship_created_by=self.user)
+            ItemRequest.objects.create(name=f'Request {i}', requested_by=self.user)
+        return poi
+
+    def assert_budget(self, budget, url, params=None):
+        """The endpoint stays within budget queries for 2 rows and for 20 rows"""
+        for count in (2, 18):
+            self.create_rows(count)
+            with self.assertNumQueries(budget):
+                response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_poi_list(self):
+        """Collection version + COUNT + POIs + one prefetch for all nested items"""
+        self.assert_budget(4, '/api/v1/pois/')
+
+    def test_poi_list_in_bbox(self):
+        self.assert_budget(4, '/api/v1/pois/', {'south': 41, 'west': 2, 'north': 42, 'east': 3})
+
+    def test_poi_markers(self):
+        """Collection version + COUNT + one aggregated query"""
+        self.assert_budget(3, '/api/v1/pois/', {'view': 'markers'})
+
+    def test_poi_nearby(self):
+        """POIs + one prefetch"""
+        self.assert_budget(2, '/api/v1/pois/nearby/', {'lat': 41.38, 'lng': 2.17, 'radius': 5000})
+
+    def test_poi_detail_and_items(self):
+        poi = self.create_rows(5)
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/v1/pois/{poi.id}/')
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/v1/pois/{poi.id}/poi_items/')
+
+    def test_item_list(self):
+        """Collection version + COUNT + items"""
+        self.assert_budget(3, '/api/v1/items/')
+
+    def test_item_request_lists(self):
+        self.client.force_authenticate(user=self.user)
+        self.assert_budget(2, '/api/v1/item-requests/')
+        self.client.force_authenticate(user=self.admin)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/item-requests/list_all/')
@@ -0,0 +1,114 @@
+"""
+Backend API tests for cached public POI responses and their invalidation
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.caching import cached_response
+from api.models import POI, Item, POIItem
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), created_by=self.user)
+        self.item = Item.objects.create(name='Beer')
+        POIItem.objects.create(poi=self.poi, item=self.item)
+        self.other = POI.objects.create(name='Other', location=Point(2.18, 41.39), created_by=self.user)
+
+    def test_detail_served_from_cache(self):
+        """Test a repeated detail / poi_items request runs no queries"""
+        for url in (f'/api/v1/pois/{self.poi.id}/', f'/api/v1/pois/{self.poi.id}/poi_items/'):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second.json(), first.json())
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request only reads the collection version"""
+        first = self.client.get('/api/v1/pois/')
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/v1/pois/')
+        self.assertEqual(second.json(), first.json())
+
+    def test_item_edit_evicts_pois_listing_it(self):
+        """Test editing an Item refreshes the POIs that list it, and only those"""
+        url = f'/api/v1/pois/{self.poi.id}/poi_items/'
+        self.client.get(url)
+        self.client.get(f'/api/v1/pois/{self.other.id}/')
+        self.item.name = 'Renamed beer'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.save()
+        self.assertEqual(self.client.get(url).json()[0]['item']['name'], 'Renamed beer')
+        with self.assertNumQueries(0):
+            self.client.get(f'/api/v1/pois/{self.other.id}/')
+
+    def test_poi_item_change_evicts_poi(self):
+        url = f'/api/v1/pois/{self.poi.id}/poi_items/'
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            POIItem.objects.filter(poi=self.poi).delete()
+        self.assertEqual(self.client.get(url).json(), [])
+
+    def test_poi_edit_evicts_detail_and_list(self):
+        self.client.get(f'/api/v1/pois/{self.poi.id}/')
+        self.client.get('/api/v1/pois/')
+        self.poi.name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poi.save()
+        response = self.client.get(f'/api/v1/pois/{self.poi.id}/')
+        self.assertEqual(response.json()['properties']['name'], 'Renamed')
+        names = [poi['name'] for poi in self.client.get('/api/v1/pois/').json()['results']]
+        self.assertIn('Renamed', names)
+
+    def test_eviction_waits_for_commit(self):
+        """Test a response rebuilt before the write commits is still evicted by the commit"""
+        url = f'/api/v1/pois/{self.poi.id}/'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.poi.name = 'Renamed'
+            self.poi.save()
+            # Not evicted yet: a concurrent request would rebuild from the old rows
+            with self.assertNumQueries(0):
+                self.client.get(url)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(url).json()['properties']['name'], 'Renamed')
+
+    def test_concurrent_misses_build_once(self):
+        """Test the stampede guard: concurrent misses for one key share a single build"""
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            return Response({'ok': True})
+
+        request = SimpleNamespace(accepted_renderer=JSONRenderer())
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cached_response(request, 'stampede-test', build).data))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(results, [{'ok': True}] * 5)
@@ -0,0 +1,78 @@
+"""
+Backend API tests for ranked item and POI search
+"""
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item
+
+
+def create_catalog():
+    Item.objects.create(name='Moritz', brand='Moritz', description='Barcelona lager')
+    Item.objects.create(name='Moritz Epidor', brand='Moritz', description='Strong lager')
+    Item.objects.create(name='Punk IPA', brand='BrewDog', description='Hoppy India pale ale')
+    Item.objects.create(name='Estrella Damm', brand='Damm', description='Mediterranean lager')
+    POI.objects.create(name='Fábrica Moritz', description='Brewery bar', location=Point(2.16, 41.38))
+    POI.objects.create(name='La Cervecita', description='Craft IPA bar', location=Point(2.15, 41.40))
+
+
+@override_settings(SEARCH_FULLTEXT=False)
+class SearchAPITestCase(TestCase):
+    """Substring fallback (the FULLTEXT path needs committed rows, see SearchFullTextTestCase)"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        create_catalog()
+
+    def test_search_ranks_items_and_pois(self):
+        response = self.client.get('/api/v1/search/', {'q': 'moritz'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['items']], ['Moritz', 'Moritz Epidor'])
+        self.assertEqual([poi['name'] for poi in response.data['pois']], ['Fábrica Moritz'])
+
+    def test_every_word_must_match_some_field(self):
+        response = self.client.get('/api/v1/search/', {'q': 'moritz strong'})
+        self.assertEqual([item['name'] for item in response.data['items']], ['Moritz Epidor'])
+        response = self.client.get('/api/v1/search/', {'q': 'ipa'})
+        self.assertEqual([item['name'] for item in response.data['items']], ['Punk IPA'])
+        self.assertEqual([poi['name'] for poi in response.data['pois']], ['La Cervecita'])
+
+    def test_paginated_by_type(self):
+        response = self.client.get('/api/v1/search/', {'q': 'lager', 'type': 'items'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertIn('price_stats', response.data['results'][0])
+
+    def test_limit(self):
+        response = self.client.get('/api/v1/search/', {'q': 'lager', 'limit': 1})
+        self.assertEqual(len(response.data['items']), 1)
+
+    def test_invalid_parameters(self):
+        for params in ({}, {'q': 'a'}, {'q': 'x' * 201}, {'q': 'lager', 'type': 'users'}, {'q': 'lager', 'limit': 0}):
+            response = self.client.get('/api/v1/search/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_operators_only_query_matches_nothing(self):
+        response = self.client.get('/api/v1/search/', {'q': '+*"'})
+        self.assertEqual(response.data, {'items': [], 'pois': []})
+
+
+@skipUnless(connection.vendor == 'mysql', 'FULLTEXT indexes are MariaDB/MySQL only')
+class SearchFullTextTestCase(TransactionTestCase):
+    """InnoDB indexes FULLTEXT rows on commit, so rows are committed here"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.client = APIClient()
+        create_catalog()
+
+    def test_fulltext_prefix_search(self):
+        response = self.client.get('/api/v1/search/', {'q': 'morit lag'})
+        self.assertEqual([item['name'] for item in response.data['items']], ['Moritz', 'Moritz Epidor'])
+        response = self.client.get('/api/v1/search/', {'q': 'brewdog', 'type': 'items'})
+        self.assertEqual(response.data['count'], 1)
@@ -0,0 +1,232 @@
+"""
+Backend tests for thumbnail compression (bounded decoding, quality search), the
+header-only upload probe with synthetic bomb images, and the compression benchmark
+"""
+import io
+import os
+import pickle
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+from PIL import Image, ImageFile
+from api import utils
+from api.utils import MAX_BYTES, MAX_SIZE, ImageRejected, compress_thumbnail, make_thumbnail, probe_image
+
+
+def noise_image(size, fmt, seed=0, quality=95):
+    """Random pixels: the worst case for JPEG size, so the quality search has to run."""
+    rng = random.Random(seed)
+    img = Image.frombytes('RGB', size, rng.randbytes(size[0] * size[1] * 3))
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **({'quality': quality} if fmt == 'JPEG' else {}))
+    return buf.getvalue()
+
+
+def gradient_image(size, fmt):
+    """Smooth content that compresses well at full quality."""
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def png_bomb(width, height):
+    """A few hundred bytes of PNG declaring width x height pixels (IDAT holds one row)"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (
+        b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+        + chunk(b'IDAT', zlib.compress(b'\0' * (width * 3 + 1))) + chunk(b'IEND', b'')
+    )
+
+
+def jpeg_bomb(width, height):
+    """A 16x16 JPEG whose frame header (SOF0) claims width x height pixels"""
+    data = bytearray(gradient_image((16, 16), 'JPEG'))
+    sof = data.index(b'\xff\xc0')
+    data[sof + 5:sof + 9] = struct.pack('>HH', height, width)
+    return bytes(data)
+
+
+def gif_frames(count):
+    """Animated 2x2 GIF with count distinct frames"""
+    frames = [Image.new('RGB', (2, 2), (i % 256, 255 - i % 256, 0)) for i in range(count)]
+    buf = io.BytesIO()
+    frames[0].save(buf, format='GIF', save_all=True, append_images=frames[1:], duration=10)
+    return buf.getvalue()
+
+
+# (label, generator) pairs for the benchmark corpus
+CORPUS = [
+    ('jpeg 640x480 noise', lambda: noise_image((640, 480), 'JPEG')),
+    ('jpeg 4000x3000 noise', lambda: noise_image((4000, 3000), 'JPEG', seed=1)),
+    ('jpeg 8000x6000 gradient', lambda: gradient_image((8000, 6000), 'JPEG')),
+    ('png 400x400 noise', lambda: noise_image((400, 400), 'PNG', seed=2)),
+    ('png 2000x1500 noise', lambda: noise_image((2000, 1500), 'PNG', seed=3)),
+    ('webp 3000x2000 gradient', lambda: gradient_image((3000, 2000), 'WEBP')),
+]
+
+
+def measure(fn, *args):
+    """
+    Run fn(*args) in a forked child; returns (seconds, peak RSS in KiB) of that child
+    alone, so one image's decode buffers never count towards the next one's peak.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Never return into the test runner from the child, even when fn raises
+        exit_code = 1
+        try:
+            os.close(read_fd)
+            start = time.perf_counter()
+            try:
+                fn(*args)
+                result = ('ok', time.perf_counter() - start)
+            except BaseException as e:
+                result = ('error', f'{type(e).__name__}: {e}')
+            with os.fdopen(write_fd, 'wb') as pipe:
+                pickle.dump(result, pipe)
+            exit_code = 0
+        finally:
+            os._exit(exit_code)
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as pipe:
+        data = pipe.read()
+    _, exit_status, usage = os.wait4(pid, 0)
+    if exit_status != 0 or not data:
+        raise RuntimeError(f'Benchmark child exited with status {exit_status}')
+    outcome, value = pickle.loads(data)
+    if outcome == 'error':
+        raise RuntimeError(f'Benchmark child raised {value}')
+    return value, usage.ru_maxrss
+
+
+class CompressThumbnailTestCase(SimpleTestCase):
+    def test_large_jpeg_is_decoded_in_draft_mode(self):
+        data = noise_image((4000, 3000), 'JPEG')
+        with mock.patch.object(ImageFile.ImageFile, 'load', autospec=True, side_effect=ImageFile.ImageFile.load) as load:
+            out = compress_thumbnail(data)
+        # Decoded at 1/8 scale (500x375), never at full size
+        decoded_sizes = {call.args[0].size for call in load.call_args_list}
+        self.assertNotIn((4000, 3000), decoded_sizes)
+        self.assertEqual(Image.open(io.BytesIO(out)).size, (400, 300))
+
+    def test_quality_search_fits_max_bytes(self):
+        out = compress_thumbnail(noise_image((800, 800), 'PNG'))
+        self.assertLessEqual(len(out), MAX_BYTES)
+        self.assertEqual(Image.open(io.BytesIO(out)).size, MAX_SIZE)
+
+    def test_quality_search_limits_encodes(self):
+        with mock.patch.object(utils, '_encode_jpeg', wraps=utils._encode_jpeg) as encode:
+            compress_thumbnail(noise_image((800, 800), 'PNG'))
+        # Full quality plus a binary search over 15..70: at most 1 + 4 encodes
+        self.assertLessEqual(encode.call_count, 5)
+
+    def test_image_within_max_size_keeps_its_size(self):
+        for size in ((400, 400), (300, 200)):
+            out = compress_thumbnail(noise_image(size, 'PNG'))
+            self.assertEqual(Image.open(io.BytesIO(out)).size, size)
+
+    def test_small_output_is_encoded_once(self):
+        with mock.patch.object(utils, '_encode_jpeg', wraps=utils._encode_jpeg) as encode:
+            compress_thumbnail(gradient_image((1200, 900), 'PNG'))
+        self.assertEqual(encode.call_count, 1)
+
+    def test_oversized_image_is_rejected_before_decoding(self):
+        for fmt in ('PNG', 'JPEG'):
+            with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+                with self.assertRaises(ImageRejected) as raised:
+                    compress_thumbnail(gradient_image((800, 600), fmt), max_pixels=100_000)
+            load.assert_not_called()
+            self.assertTrue(raised.exception.too_large)
+
+    def test_small_rgb_inputs_from_bytes_and_paths(self):
+        """RGB images within MAX_SIZE are neither converted nor resized; their pixels must still be read"""
+        for size, fmt in (((300, 200), 'PNG'), ((400, 300), 'JPEG'), ((40, 40), 'BMP')):
+            data = gradient_image(size, fmt)
+            with tempfile.NamedTemporaryFile(suffix='.' + fmt.lower()) as f:
+                f.write(data)
+                f.flush()
+                for source in (data, f.name, io.BytesIO(data)):
+                    out = compress_thumbnail(source)
+                    self.assertEqual(Image.open(io.BytesIO(out)).size, size, (fmt, type(source)))
+                    self.assertEqual(make_thumbnail(source)[0], out)
+
+    def test_invalid_image_returned_unchanged(self):
+        self.assertEqual(compress_thumbnail(b'not an image'), b'not an image')
+
+
+class ProbeImageTestCase(SimpleTestCase):
+    def assertRejected(self, data, too_large=True, **budgets):
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            with self.assertRaises(ImageRejected) as raised:
+                probe_image(data, **budgets)
+        load.assert_not_called()
+        self.assertEqual(raised.exception.too_large, too_large)
+        return str(raised.exception)
+
+    def test_reads_header_only(self):
+        data = gradient_image((800, 600), 'PNG')
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            info = probe_image(data, max_bytes=len(data))
+        load.assert_not_called()
+        self.assertEqual(info, ('PNG', 800, 600, 1))
+
+    def test_pixel_bombs_are_rejected(self):
+        # Past Pillow's own decompression bomb limit
+        self.assertRejected(png_bomb(20000, 20000))
+        self.assertRejected(jpeg_bomb(20000, 20000))
+        # Past the configured budget only
+        message = self.assertRejected(png_bomb(10000, 6000), max_pixels=50_000_000)
+        self.assertIn('10000x6000', message)
+        self.assertRejected(jpeg_bomb(8000, 8000), max_pixels=50_000_000)
+        self.assertEqual(probe_image(jpeg_bomb(4000, 3000)).width, 4000)
+
+    def test_frame_bomb_is_rejected(self):
+        data = gif_frames(150)
+        message = self.assertRejected(data, max_frames=100)
+        self.assertIn('150 frames', message)
+        self.assertEqual(probe_image(data, max_frames=150).frames, 150)
+
+    def test_byte_budget(self):
+        data = gradient_image((800, 600), 'PNG')
+        self.assertRejected(data, max_bytes=len(data) - 1)
+        self.assertRejected(io.BytesIO(data), max_bytes=100)
+
+    def test_unsupported_input_is_invalid(self):
+        buf = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(buf, format='TIFF')
+        self.assertRejected(buf.getvalue(), too_large=False)
+        self.assertRejected(b'not an image', too_large=False)
+        self.assertRejected(png_bomb(20000, 20000)[:20], too_large=False)
+
+
+@skipUnless(os.environ.get('BEERFINDER_BENCH'), 'set BEERFINDER_BENCH=1 to run the thumbnail benchmark')
+@skipUnless(hasattr(os, 'fork'), 'benchmark forks one process per image')
+class CompressThumbnailBenchmark(SimpleTestCase):
+    """Time and peak RSS of compress_thumbnail per corpus image (printed to stderr)"""
+
+    def test_benchmark(self):
+        baseline_time, baseline_rss = measure(lambda: None)
+        rows = []
+        for label, generate in CORPUS:
+            data = generate()
+            seconds, peak_rss = measure(compress_thumbnail, data)
+            rows.append((label, len(data), seconds - baseline_time, peak_rss - baseline_rss))
+
+        lines = [f"{'image':<26}{'input KiB':>11}{'ms':>9}{'peak RSS +KiB':>15}"]
+        lines += [f'{label:<26}{size / 1024:>11.0f}{seconds * 1000:>9.1f}{rss:>15}' for label, size, seconds, rss in rows]
+        sys.stderr.write('\n' + '\n'.join(lines) + '\n')
+
+        # An 8000x6000 JPEG decodes to 144 MB of RGB; draft mode keeps it far below that
+        peak_by_label = {label: rss for label, _, _, rss in rows}
+        self.assertLess(peak_by_label['jpeg 8000x6000 gradient'], 64 * 1024)
@@ -0,0 +1,195 @@
+"""
+Backend tests for background thumbnail processing (THUMBNAIL_ASYNC)
+"""
+import base64
+import io
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import Item, ItemRequest, ThumbnailBlob, ThumbnailJob
+from api import thumbnail_store
+from api.thumbnail_jobs import claim_jobs, process_jobs
+
+from .test_thumbnails import make_image, use_temporary_store
+
+
+class BrokenPool:
+    """A process pool after one of its processes died: every future fails"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool('A process in the process pool was terminated abruptly'))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class InlinePool(BrokenPool):
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class DyingPool(BrokenPool):
+    """The first job's process dies; the pool is already broken when the next is submitted"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        if self.submitted > 1:
+            raise BrokenProcessPool('A child process terminated abruptly, the process pool is not usable anymore')
+        return super().submit(fn, *args)
+
+
+@override_settings(THUMBNAIL_ASYNC=True, THUMBNAIL_JOB_MAX_ATTEMPTS=2)
+class ThumbnailJobTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        use_temporary_store(self)
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.upload = make_image(size=(1600, 1200))
+
+    def create_item(self):
+        response = self.client.post('/api/v1/items/', {
+            'name': 'Beer',
+            'thumbnail_write': base64.b64encode(self.upload).decode('ascii'),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response
+
+    def drain(self):
+        call_command('process_thumbnails', '--once', '--workers', '0', stdout=StringIO())
+
+    def test_upload_is_queued_and_processed(self):
+        """Test the request returns before compression and the worker fills the thumbnail"""
+        with patch('api.serializers.make_thumbnail') as inline:
+            response = self.create_item()
+        inline.assert_not_called()
+        self.assertEqual(response.data['thumbnail_status'], 'pending')
+        self.assertIsNone(response.data['thumbnail_url'])
+        job = ThumbnailJob.objects.get()
+        self.assertEqual(ThumbnailBlob.objects.get(hash=job.source_hash).ref_count, 1)
+
+        self.drain()
+        item = Item.objects.get()
+        self.assertEqual(item.thumbnail_status, 'ready')
+        self.assertEqual(Image.open(io.BytesIO(item.thumbnail)).size, (400, 300))
+        self.assertEqual(self.client.get(f'/api/v1/items/{item.id}/').data['thumbnail_status'], 'ready')
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.STATUS_DONE)
+        # The raw upload is no longer referenced and can be purged
+        self.assertEqual(ThumbnailBlob.objects.get(hash=job.source_hash).ref_count, 0)
+
+    def test_newer_upload_supersedes_older_job(self):
+        item_id = self.create_item().data['id']
+        self.upload = make_image(size=(300, 200))
+        self.client.patch(f'/api/v1/items/{item_id}/', {
+            'thumbnail_write': base64.b64encode(self.upload).decode('ascii'),
+        }, format='json')
+        self.drain()
+        first, second = ThumbnailJob.objects.order_by('id')
+        self.assertEqual(first.error, 'Superseded')
+        self.assertEqual(second.status, ThumbnailJob.STATUS_DONE)
+        self.assertEqual(Item.objects.get().thumbnail_status, 'ready')
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        self.create_item()
+        with patch('api.thumbnail_jobs.make_thumbnail', side_effect=OSError('decoder crashed')):
+            process_jobs(claim_jobs(10))
+            job = ThumbnailJob.objects.get()
+            self.assertEqual(job.status, ThumbnailJob.STATUS_PENDING)
+            process_jobs(claim_jobs(10))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.STATUS_FAILED)
+        self.assertIn('decoder crashed', job.error)
+        self.assertEqual(Item.objects.get().thumbnail_status, 'failed')
+
+    def test_broken_pool_requeues_jobs_without_charging_attempts(self):
+        self.create_item()
+        self.create_item()
+        with self.assertRaises(BrokenProcessPool):
+            process_jobs(claim_jobs(10), BrokenPool())
+        for job in ThumbnailJob.objects.all():
+            self.assertEqual((job.status, job.attempts), (ThumbnailJob.STATUS_PENDING, 0))
+
+    def test_broken_pool_charges_a_lone_job(self):
+        """Test the only job in flight when the pool broke is the cause and uses up an attempt"""
+        self.create_item()
+        with self.assertRaises(BrokenProcessPool):
+            process_jobs(claim_jobs(10), BrokenPool())
+        job = ThumbnailJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ThumbnailJob.STATUS_PENDING, 1))
+        self.assertEqual(job.error, 'Worker process died')
+
+    def test_broken_pool_charges_the_job_in_flight_not_the_unsubmitted_one(self):
+        self.create_item()
+        self.create_item()
+        first, second = claim_jobs(10)
+        with self.assertRaises(BrokenProcessPool):
+            process_jobs([first, second], DyingPool())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (ThumbnailJob.STATUS_PENDING, 1))
+        self.assertEqual(first.error, 'Worker process died')
+        self.assertEqual((second.status, second.attempts), (ThumbnailJob.STATUS_PENDING, 0))
+
+    def test_missing_upload_fails_without_retry(self):
+        self.create_item()
+        job = ThumbnailJob.objects.get()
+        thumbnail_store.delete(job.source_hash)
+        process_jobs(claim_jobs(10))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ThumbnailJob.STATUS_FAILED, 1))
+        self.assertEqual(job.error, 'Upload missing from the thumbnail store')
+        self.assertEqual(Item.objects.get().thumbnail_status, 'failed')
+
+    def test_worker_replaces_a_broken_pool(self):
+        self.create_item()
+        self.create_item()
+        with patch('api.management.commands.process_thumbnails.connections'), \
+                patch('api.management.commands.process_thumbnails.ProcessPoolExecutor',
+                      side_effect=[BrokenPool(), InlinePool()]) as pools:
+            call_command('process_thumbnails', '--once', '--workers', '2', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(pools.call_count, 2)
+        for job in ThumbnailJob.objects.all():
+            self.assertEqual((job.status, job.attempts), (ThumbnailJob.STATUS_DONE, 1))
+        self.assertEqual(set(Item.objects.values_list('thumbnail_status', flat=True)), {'ready'})
+
+    def test_approving_a_pending_request_queues_the_new_item(self):
+        """Test an Item approved before the request's upload was processed still gets the image"""
+        response = self.client.post('/api/v1/item-requests/', {
+            'name': 'New beer',
+            'thumbnail_write': base64.b64encode(self.upload).decode('ascii'),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        request_id = response.data['id']
+        self.client.post(f'/api/v1/item-requests/{request_id}/approve/')
+        item = Item.objects.get()
+        self.assertEqual(item.thumbnail_status, 'pending')
+
+        self.drain()
+        item.refresh_from_db()
+        self.assertEqual(item.thumbnail_status, 'ready')
+        self.assertEqual(Image.open(io.BytesIO(item.thumbnail)).size, (400, 300))
+        self.assertEqual(ItemRequest.objects.get(pk=request_id).thumbnail_hash, item.thumbnail_hash)
+        self.assertFalse(ThumbnailJob.objects.exclude(status=ThumbnailJob.STATUS_DONE).exists())
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_synchronous_mode(self):
+        response = self.create_item()
+        self.assertEqual(response.data['thumbnail_status'], 'ready')
+        self.assertFalse(ThumbnailJob.objects.exists())
@@ -0,0 +1,94 @@
+"""
+Backend tests for the content-addressed thumbnail store and its reference counts
+"""
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from rest_framework.test import APIClient
+from rest_framework import status
+from api import thumbnail_store
+from api.models import POI, Item, ItemRequest, ThumbnailBlob
+
+from .test_thumbnails import make_image, use_temporary_store
+
+
+class ThumbnailStoreTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.root = use_temporary_store(self)
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        self.image = make_image(fmt='JPEG')
+
+    def refs(self, content_hash):
+        return ThumbnailBlob.objects.filter(hash=content_hash).values_list('ref_count', flat=True).first()
+
+    def age(self, content_hash):
+        """Make a stored file and its row look older than the purge grace period"""
+        past = time.time() - 7200
+        os.utime(thumbnail_store.blob_path(content_hash), (past, past))
+        ThumbnailBlob.objects.filter(hash=content_hash).update(updated_at=timezone.now() - timedelta(hours=2))
+
+    def test_rows_keep_only_the_hash_and_share_files(self):
+        item = Item.objects.create(name='Beer', thumbnail=self.image)
+        poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), thumbnail=self.image)
+        self.assertEqual(item.thumbnail_hash, poi.thumbnail_hash)
+        self.assertEqual(self.refs(item.thumbnail_hash), 2)
+        self.assertEqual(Item.objects.get(pk=item.pk).thumbnail, self.image)
+        files = [name for _, _, names in os.walk(self.root) for name in names]
+        self.assertEqual(files, [item.thumbnail_hash])
+
+    def test_replacing_and_deleting_move_references(self):
+        item = Item.objects.create(name='Beer', thumbnail=self.image)
+        old_hash = item.thumbnail_hash
+        item = Item.objects.get(pk=item.pk)
+        item.thumbnail = make_image(size=(50, 50), fmt='JPEG')
+        item.save()
+        self.assertEqual(self.refs(old_hash), 0)
+        self.assertEqual(self.refs(item.thumbnail_hash), 1)
+
+        Item.objects.filter(pk=item.pk).delete()
+        self.assertEqual(self.refs(item.thumbnail_hash), 0)
+
+    def test_approve_shares_the_request_image(self):
+        item_request = ItemRequest.objects.create(name='New beer', thumbnail=self.image)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(f'/api/v1/item-requests/{item_request.id}/approve/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = Item.objects.get(name='New beer')
+        self.assertEqual(item.thumbnail_hash, item_request.thumbnail_hash)
+        self.assertEqual(self.refs(item.thumbnail_hash), 2)
+
+    def test_purge_deletes_only_old_unreferenced_files(self):
+        kept = Item.objects.create(name='Kept', thumbnail=self.image)
+        dropped = Item.objects.create(name='Dropped', thumbnail=make_image(size=(60, 60), fmt='JPEG'))
+        dropped_hash = dropped.thumbnail_hash
+        dropped.delete()
+        fresh_orphan = thumbnail_store.put(make_image(size=(70, 70), fmt='JPEG'))
+        old_orphan = thumbnail_store.put(make_image(size=(80, 80), fmt='JPEG'))
+        self.age(dropped_hash)
+        self.age(kept.thumbnail_hash)
+        os.utime(thumbnail_store.blob_path(old_orphan), (time.time() - 7200,) * 2)
+
+        out = StringIO()
+        call_command('purge_thumbnails', stdout=out)
+        self.assertIsNone(thumbnail_store.read(dropped_hash))
+        self.assertIsNone(thumbnail_store.read(old_orphan))
+        self.assertIsNotNone(thumbnail_store.read(fresh_orphan))
+        self.assertEqual(thumbnail_store.read(kept.thumbnail_hash), self.image)
+        self.assertFalse(ThumbnailBlob.objects.filter(hash=dropped_hash).exists())
+        self.assertIn('Deleted 1 unreferenced and 1 orphaned', out.getvalue())
+
+    def test_renditions_are_stored_and_deleted_with_the_image(self):
+        content_hash = thumbnail_store.put(self.image, {(48, 'webp'): b'small', (160, 'jpeg'): b'card'})
+        self.assertEqual(thumbnail_store.read_rendition(content_hash, 48, 'webp'), b'small')
+        self.assertIsNone(thumbnail_store.read_rendition(content_hash, 48, 'jpeg'))
+        thumbnail_store.delete(content_hash)
+        self.assertEqual([name for _, _, names in os.walk(self.root) for name in names], [])
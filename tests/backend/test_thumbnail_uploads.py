@@ -0,0 +1,149 @@
+"""
+Backend API tests for streamed thumbnail uploads (multipart thumbnail_file, raw image/* PUT)
+and the header probe refusing oversized images before decoding
+"""
+import base64
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.models import POI, Item, ThumbnailJob
+
+from .test_thumbnail_compression import gif_frames, jpeg_bomb, png_bomb
+from .test_thumbnails import make_image, use_temporary_store
+
+
+class ThumbnailUploadTestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        use_temporary_store(self)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='otherpass123')
+        self.admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        self.poi = POI.objects.create(name='Bar', location=Point(2.17, 41.38), created_by=self.user)
+        self.upload = make_image()
+
+    def drain(self):
+        call_command('process_thumbnails', '--once', '--workers', '0', stdout=io.StringIO())
+
+    def thumbnail_size(self, instance):
+        instance.refresh_from_db()
+        return Image.open(io.BytesIO(instance.thumbnail)).size
+
+    def test_multipart_thumbnail_file(self):
+        """Test a multipart file part is queued and processed like thumbnail_write"""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/v1/items/', {
+            'name': 'Beer',
+            'thumbnail_file': SimpleUploadedFile('beer.png', self.upload, content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['thumbnail_status'], 'pending')
+        self.assertNotIn('thumbnail_file', response.data)
+
+        self.drain()
+        item = Item.objects.get()
+        self.assertEqual(item.thumbnail_status, 'ready')
+        self.assertEqual(self.thumbnail_size(item), (400, 300))
+
+    @override_settings(THUMBNAIL_ASYNC=False)
+    def test_multipart_thumbnail_file_synchronous(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(f'/api/v1/pois/{self.poi.id}/', {
+            'thumbnail_file': SimpleUploadedFile('bar.png', self.upload, content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['properties']['thumbnail_status'], 'ready')
+        self.assertEqual(self.thumbnail_size(self.poi), (400, 300))
+
+    def test_raw_image_put(self):
+        """Test PUT of an image/* body to the thumbnail endpoint replaces the thumbnail"""
+        url = f'/api/v1/pois/{self.poi.id}/thumbnail/'
+        self.client.force_authenticate(user=self.user)
+        response = self.client.put(url, self.upload, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['properties']['thumbnail_status'], 'pending')
+        self.assertEqual(ThumbnailJob.objects.get().object_id, self.poi.id)
+
+        self.drain()
+        self.assertEqual(self.thumbnail_size(self.poi), (400, 300))
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_raw_image_put_permissions(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.put(f'/api/v1/pois/{self.poi.id}/thumbnail/', self.upload, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        item = Item.objects.create(name='Beer')
+        response = self.client.put(f'/api/v1/items/{item.id}/thumbnail/', self.upload, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.put(f'/api/v1/items/{item.id}/thumbnail/', self.upload, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_put_requires_an_image_body(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.put(f'/api/v1/pois/{self.poi.id}/thumbnail/', {'name': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    @override_settings(THUMBNAIL_UPLOAD_MAX_BYTES=1024)
+    def test_oversized_upload_is_refused(self):
+        """Test uploads past THUMBNAIL_UPLOAD_MAX_BYTES get 413 and nothing is queued"""
+        self.client.force_authenticate(user=self.user)
+        # Refused from Content-Length before reading, then while streaming
+        large = make_image(size=(300, 300), fmt='BMP')
+        response = self.client.put(f'/api/v1/pois/{self.poi.id}/thumbnail/', large, content_type='image/bmp')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        small = make_image(size=(40, 40), fmt='BMP')
+        response = self.client.patch(f'/api/v1/pois/{self.poi.id}/', {
+            'thumbnail_file': SimpleUploadedFile('bar.bmp', small, content_type='image/bmp'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_pixel_bombs_are_refused_before_queueing(self):
+        """Test images whose header exceeds the pixel budget get 413 whatever the upload path"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(f'/api/v1/pois/{self.poi.id}/', {
+            'thumbnail_write': base64.b64encode(png_bomb(20000, 20000)).decode('ascii'),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        response = self.client.put(
+            f'/api/v1/pois/{self.poi.id}/thumbnail/', jpeg_bomb(20000, 20000), content_type='image/jpeg'
+        )
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        with override_settings(THUMBNAIL_MAX_PIXELS=100_000):
+            response = self.client.patch(f'/api/v1/pois/{self.poi.id}/', {
+                'thumbnail_file': SimpleUploadedFile('bar.png', self.upload, content_type='image/png'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertIn('800x600', response.data['detail'])
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.poi.refresh_from_db()
+        self.assertEqual(self.poi.thumbnail_hash, '')
+
+    @override_settings(THUMBNAIL_MAX_FRAMES=10)
+    def test_frame_budget(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.put(f'/api/v1/pois/{self.poi.id}/thumbnail/', gif_frames(20), content_type='image/gif')
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_invalid_images_are_bad_requests(self):
+        self.client.force_authenticate(user=self.user)
+        for payload in ('bm90IGFuIGltYWdl', '%%%'):
+            response = self.client.patch(
+                f'/api/v1/pois/{self.poi.id}/', {'thumbnail_write': payload}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, payload)
+            self.assertIn('thumbnail_write', response.data)
+        response = self.client.put(f'/api/v1/pois/{self.poi.id}/thumbnail/', b'not an image', content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ThumbnailJob.objects.exists())
@@ -0,0 +1,136 @@
+"""
+Backend API tests for thumbnail endpoints
+"""
+import base64
+import io
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework import status
+from api import thumbnail_store
+from api.models import POI, Item, ItemRequest
+
+
+def make_image(size=(800, 600), fmt='PNG'):
+    buf = io.BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def use_temporary_store(test):
+    """Point THUMBNAIL_STORE_ROOT at a directory removed after the test"""
+    root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, root, ignore_errors=True)
+    override = override_settings(THUMBNAIL_STORE_ROOT=root)
+    override.enable()
+    test.addCleanup(override.disable)
+    return root
+
+
+class ThumbnailAPITestCase(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        use_temporary_store(self)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+
+    def test_poi_thumbnail_url_and_endpoint(self):
+        """Test POIs expose a versioned thumbnail URL serving the raw JPEG"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/v1/pois/', {
+            'name': 'Bar',
+            'latitude': 41.38,
+            'longitude': 2.17,
+            'thumbnail_write': base64.b64encode(make_image()).decode('ascii'),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        call_command('process_thumbnails', '--once', '--workers', '0', stdout=io.StringIO())
+        poi = POI.objects.get()
+        self.assertEqual(len(poi.thumbnail_hash), 64)
+
+        self.client.force_authenticate(user=None)
+        url = self.client.get(f'/api/v1/pois/{poi.id}/').data['properties']['thumbnail_url']
+        self.assertIn(f'/api/v1/pois/{poi.id}/thumbnail/?v={poi.thumbnail_hash}', url)
+
+        response = self.client.get(f'/api/v1/pois/{poi.id}/thumbnail/', {'v': poi.thumbnail_hash},
+                                   HTTP_ACCEPT='image/jpeg,image/*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['ETag'], f'"{poi.thumbnail_hash}"')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(response.content, bytes(poi.thumbnail))
+
+    def test_thumbnail_not_modified(self):
+        """Test a matching If-None-Match returns 304 without the image"""
+        item = Item.objects.create(name='Beer', thumbnail=make_image(fmt='JPEG'))
+        response = self.client.get(f'/api/v1/items/{item.id}/thumbnail/',
+                                   HTTP_IF_NONE_MATCH=f'"{item.thumbnail_hash}"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+    def test_missing_thumbnail(self):
+        """Test objects without thumbnail return 404 and a null URL"""
+        item = Item.objects.create(name='Beer')
+        self.assertIsNone(self.client.get(f'/api/v1/items/{item.id}/').data['thumbnail_url'])
+        response = self.client.get(f'/api/v1/items/{item.id}/thumbnail/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_item_request_thumbnail_requires_hash_or_owner(self):
+        """Test request thumbnails are only served to the owner or with the versioned URL"""
+        item_request = ItemRequest.objects.create(
+            name='New beer', thumbnail=make_image(fmt='JPEG'), requested_by=self.user
+        )
+        url = f'/api/v1/item-requests/{item_request.id}/thumbnail/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url, {'v': 'bad'}).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url, {'v': item_request.thumbnail_hash})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('private', response['Cache-Control'])
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_renditions_by_size_and_accept(self):
+        """Test ?size= picks the smallest rendition covering it and WebP follows Accept"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/v1/items/', {
+            'name': 'Beer',
+            'thumbnail_write': base64.b64encode(make_image()).decode('ascii'),
+        }, format='json')
+        call_command('process_thumbnails', '--once', '--workers', '0', stdout=io.StringIO())
+        item = Item.objects.get(pk=response.data['id'])
+        url = f'/api/v1/items/{item.id}/thumbnail/'
+
+        response = self.client.get(url, {'size': 32}, HTTP_ACCEPT='image/webp,image/*')
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['ETag'], f'"{item.thumbnail_hash}-48.webp"')
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (48, 36))
+        marker_bytes = len(response.content)
+
+        response = self.client.get(url, {'size': 100}, HTTP_ACCEPT='image/*')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (160, 120))
+
+        full = self.client.get(url, HTTP_ACCEPT='image/webp;q=0,image/*')
+        self.assertEqual(full.content, bytes(item.thumbnail))
+        self.assertLess(marker_bytes, len(full.content))
+
+        response = self.client.get(url, {'size': 5000}, HTTP_ACCEPT='image/webp')
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (400, 300))
+        self.assertEqual(self.client.get(url, {'size': 'big'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_renditions_made_on_first_request_for_older_images(self):
+        """Test images stored before renditions get them on demand"""
+        item = Item.objects.create(name='Beer', thumbnail=make_image(fmt='JPEG'))
+        response = self.client.get(f'/api/v1/items/{item.id}/thumbnail/', {'size': 160})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (160, 120))
+        self.assertIsNotNone(thumbnail_store.read_rendition(item.thumbnail_hash, 160, 'jpeg'))